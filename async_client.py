@@ -0,0 +1,367 @@
+import asyncio
+import logging
+import socket
+import ssl
+from typing import Any, Callable, Dict, List, Optional
+
+from codec import JSON_CODEC, decode_message, get_codec
+from framing import FrameDecoder, get_framing
+from protocol import ClientProtocol, resolve
+from tls import client_context
+
+class AsyncTCPClient(ClientProtocol):
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, enable_ssl: bool = False,
+                 verify_ssl: bool = True, timeout: int = 30, framing: str = "length",
+                 buffer_size: int = 4096, codec: str = "json", max_in_flight: int = 1024,
+                 on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 incoming_queue_size: int = 1000):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.enable_ssl = enable_ssl
+        self.verify_ssl = verify_ssl
+        self.timeout = timeout
+        self.framing = get_framing(framing)
+        if self.framing is None:
+            raise ValueError("Client framing must be 'length' or 'newline'")
+        self.buffer_size = buffer_size
+        self.preferred_codec = get_codec(codec)
+        self.max_in_flight = max_in_flight
+        self.on_message = on_message
+        self.incoming_queue_size = incoming_queue_size
+
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.reader_task: Optional[asyncio.Task] = None
+        self.connected = False
+        self.decoder: Optional[FrameDecoder] = None
+        self.in_flight: Optional[asyncio.Semaphore] = None
+        self.incoming: Optional[asyncio.Queue] = None
+        self.logger = logging.getLogger(__name__)
+
+    def create_ssl_context(self) -> Optional[ssl.SSLContext]:
+        if not self.enable_ssl:
+            return None
+
+        return client_context(self.verify_ssl)
+
+    async def connect(self) -> bool:
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=self.create_ssl_context(),
+                                        ssl_handshake_timeout=self.timeout if self.enable_ssl else None),
+                self.timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            self.logger.error("Failed to connect to server: %s", e)
+            return False
+
+        sock = self.writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.decoder = FrameDecoder(buffer_size=self.buffer_size)
+        self.codec = JSON_CODEC
+        self.in_flight = asyncio.Semaphore(self.max_in_flight)
+        if self.incoming is None:
+            self.incoming = asyncio.Queue(maxsize=self.incoming_queue_size)
+        self.connected = True
+        self.reader_task = asyncio.create_task(self.read_loop())
+        self.logger.info("Connected to server %s:%s", self.host, self.port)
+        return True
+
+    async def disconnect(self):
+        was_connected = self.connected
+        self.connected = False
+        self.authenticated = False
+        if self.writer:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+        if self.reader_task and self.reader_task is not asyncio.current_task():
+            self.reader_task.cancel()
+        self.fail_pending(ConnectionError("Disconnected from server"))
+        if was_connected:
+            self.logger.info("Disconnected from server")
+
+    async def send_request(self, message: Dict[str, Any]) -> asyncio.Future:
+        if not self.connected:
+            raise ConnectionError("Not connected to server")
+
+        await self.in_flight.acquire()
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda _: self.in_flight.release())
+        request_id = None
+        try:
+            request_id, data = self.track(message, future)
+            self.writer.write(data)
+            await self.writer.drain()
+        except Exception as e:
+            self.forget(request_id)
+            resolve(future, error=e)
+            raise
+        return future
+
+    async def send_message(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not self.connected:
+            self.logger.error("Not connected to server")
+            return None
+
+        try:
+            future = await self.send_request(message)
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.logger.error("Timed out waiting for response to %s", message.get('type', 'message'))
+        except Exception as e:
+            self.logger.error("Failed to send/receive message: %s", e)
+            await self.disconnect()
+        return None
+
+    async def pipeline(self, messages: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        return list(await asyncio.gather(*(self.send_message(message) for message in messages)))
+
+    async def read_loop(self):
+        try:
+            while self.connected:
+                data = await self.reader.read(self.buffer_size)
+                if not data:
+                    break
+                for frame in self.decoder.feed(data):
+                    self.dispatch(decode_message(frame))
+        except (ConnectionError, OSError):
+            pass
+        except Exception as e:
+            self.logger.error("Connection lost: %s", e)
+        finally:
+            if self.connected:
+                self.connected = False
+                self.authenticated = False
+                self.writer.close()
+                self.fail_pending(ConnectionError("Connection closed by server"))
+                self.logger.info("Disconnected from server")
+
+    def answer_keepalive(self):
+        self.writer.write(self.keepalive_reply())
+
+    def queue_push(self, message: Any):
+        if self.incoming.full():
+            self.incoming.get_nowait()
+        self.incoming.put_nowait(message)
+
+    async def receive_push(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        if self.incoming is None:
+            return None
+        try:
+            return await asyncio.wait_for(self.incoming.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def authenticate(self, username: str, password: str) -> bool:
+        if await self.resume_session(username):
+            return True
+        return await self.send_auth({"username": username, "password": password})
+
+    async def resume_session(self, username: Optional[str] = None) -> bool:
+        credentials = self.resume_credentials(username)
+        return credentials is not None and await self.send_auth(credentials)
+
+    async def send_auth(self, credentials: Dict[str, str]) -> bool:
+        return self.accept_auth(await self.send_message(self.auth_message(credentials)), credentials)
+
+    async def send_broadcast_message(self, content: str) -> bool:
+        if not self.authenticated:
+            self.logger.error("Authentication required")
+            return False
+
+        response = await self.send_message({"type": "message", "target": "broadcast", "content": content})
+        if response and response.get('type') == 'message_response':
+            success = response.get('success', False)
+            if not success:
+                self.logger.error("Failed to send broadcast: %s", response.get('message', ''))
+            return success
+        return False
+
+    async def send_private_message(self, target_username: str, content: str) -> bool:
+        if not self.authenticated:
+            self.logger.error("Authentication required")
+            return False
+
+        response = await self.send_message({"type": "message", "target": target_username, "content": content})
+        if response and response.get('type') == 'message_response':
+            success = response.get('success', False)
+            if not success:
+                self.logger.error("Failed to send private message: %s", response.get('message', ''))
+            return success
+        return False
+
+    async def subscribe(self, channel: str) -> bool:
+        return await self.send_channel_request({"type": "subscribe", "channel": channel}, 'subscribe_response')
+
+    async def unsubscribe(self, channel: str) -> bool:
+        return await self.send_channel_request({"type": "unsubscribe", "channel": channel}, 'unsubscribe_response')
+
+    async def publish(self, channel: str, content: str) -> bool:
+        return await self.send_channel_request(
+            {"type": "publish", "channel": channel, "content": content}, 'message_response'
+        )
+
+    async def send_channel_request(self, message: Dict[str, Any], response_type: str) -> bool:
+        if not self.authenticated:
+            self.logger.error("Authentication required")
+            return False
+
+        return self.channel_result(message, await self.send_message(message), response_type)
+
+    async def execute_command(self, command: str) -> Optional[Any]:
+        if not self.authenticated:
+            self.logger.error("Authentication required")
+            return None
+
+        response = await self.send_message({"type": "command", "command": command})
+        if response and response.get('type') == 'command_response':
+            return response.get('data')
+        elif response and response.get('type') == 'error':
+            self.logger.error("Command error: %s", response.get('message', ''))
+        return None
+
+    async def send_batch(self, messages: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        response = await self.send_message({"type": "batch", "messages": messages})
+        if response and response.get('type') == 'batch_response':
+            if response.get('failed'):
+                self.logger.error("%s of %s batched messages failed", response['failed'], response.get('processed', 0))
+            return response.get('responses', [])
+        elif response and response.get('type') == 'error':
+            self.logger.error("Batch error: %s", response.get('message', ''))
+        return None
+
+    async def ping_server(self) -> bool:
+        response = await self.send_message({"type": "ping"})
+        return bool(response and response.get('type') == 'pong')
+
+class AsyncClientPool:
+    # Authentication is per connection, so a pool serves one identity; callers
+    # share its connections and each request goes to the least loaded one.
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, username: str = "admin",
+                 password: str = "admin123", size: int = 4,
+                 on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 incoming_queue_size: int = 1000, **client_kwargs):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.session_token: Optional[str] = None
+        self.size = size
+        self.on_message = on_message
+        self.incoming_queue_size = incoming_queue_size
+        self.client_kwargs = client_kwargs
+        self.clients: List[AsyncTCPClient] = []
+        self.lock: Optional[asyncio.Lock] = None
+        self.incoming: Optional[asyncio.Queue] = None
+        self.closed = False
+        self.logger = logging.getLogger(__name__)
+
+    async def start(self) -> int:
+        self.lock = asyncio.Lock()
+        self.incoming = asyncio.Queue(maxsize=self.incoming_queue_size)
+        self.closed = False
+        await self.fill()
+        return len(self.clients)
+
+    async def open_client(self) -> Optional[AsyncTCPClient]:
+        client = AsyncTCPClient(self.host, self.port, **self.client_kwargs)
+        client.on_message = lambda message: self.handle_push(client, message)
+        client.session_token, client.session_username = self.session_token, self.username
+        if await client.connect() and await client.authenticate(self.username, self.password):
+            self.session_token = client.session_token
+            return client
+        await client.disconnect()
+        return None
+
+    async def fill(self):
+        async with self.lock:
+            self.clients = [client for client in self.clients if client.authenticated]
+            missing = self.size - len(self.clients)
+            if missing <= 0 or self.closed:
+                return
+            if self.session_token is None:
+                # The first login yields a session token the rest of the pool
+                # resumes with, so only one connection pays for password hashing.
+                client = await self.open_client()
+                if client is None:
+                    return
+                self.clients.append(client)
+                missing -= 1
+            opened = await asyncio.gather(*(self.open_client() for _ in range(missing)))
+            self.clients.extend(client for client in opened if client is not None)
+
+    def handle_push(self, client: AsyncTCPClient, message: Any):
+        # Every pooled connection is the same user, so each push arrives once per
+        # connection; only the first live connection forwards it.
+        primary = next((c for c in self.clients if c.authenticated), None)
+        if client is not primary:
+            return
+
+        if self.on_message:
+            try:
+                self.on_message(message)
+            except Exception as e:
+                self.logger.error("Message callback failed: %s", e)
+            return
+
+        if self.incoming.full():
+            self.incoming.get_nowait()
+        self.incoming.put_nowait(message)
+
+    async def receive_push(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.incoming.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def acquire(self) -> AsyncTCPClient:
+        if self.closed:
+            raise ConnectionError("Pool is closed")
+
+        live = [client for client in self.clients if client.authenticated]
+        if len(live) < self.size:
+            await self.fill()
+            live = [client for client in self.clients if client.authenticated]
+        if not live:
+            raise ConnectionError("No pooled connections available")
+        return min(live, key=lambda client: len(client.pending))
+
+    async def send_message(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await (await self.acquire()).send_message(message)
+
+    async def send_broadcast_message(self, content: str) -> bool:
+        return await (await self.acquire()).send_broadcast_message(content)
+
+    async def send_private_message(self, target_username: str, content: str) -> bool:
+        return await (await self.acquire()).send_private_message(target_username, content)
+
+    async def publish(self, channel: str, content: str) -> bool:
+        return await (await self.acquire()).publish(channel, content)
+
+    async def execute_command(self, command: str) -> Optional[Any]:
+        return await (await self.acquire()).execute_command(command)
+
+    async def send_batch(self, messages: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        return await (await self.acquire()).send_batch(messages)
+
+    async def ping_server(self) -> bool:
+        return await (await self.acquire()).ping_server()
+
+    async def close(self):
+        self.closed = True
+        clients, self.clients = self.clients, []
+        await asyncio.gather(*(client.disconnect() for client in clients))
+
+    async def __aenter__(self) -> 'AsyncClientPool':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,259 @@
+import asyncio
+import json
+import socket
+import ssl
+import time
+from typing import Dict, Optional
+
+from framing import FRAMINGS, FramingError
+from outbound import DISCONNECT, OutboundQueue, SlowConsumerError
+from server import ClientInfo, TCPServer
+
+class AsyncTCPServer(TCPServer):
+    # Waiting for the group commit would stall the event loop, so offline
+    # messages are acknowledged once written; the committer fsyncs them
+    # within message_log_flush_interval.
+    SYNC_OFFLINE_WRITES = False
+    # File transfer relies on TCPServer's writer threads owning their sockets.
+    FILE_TRANSFER = False
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.throttle_delays: Dict[str, float] = {}
+        self.ssl_context: Optional[ssl.SSLContext] = None
+        
+    def create_outbound_queue(self) -> Optional[OutboundQueue]:
+        return None
+        
+    def send_frame(self, client: ClientInfo, frame: bytes) -> bool:
+        if client.writer is None:
+            return super().send_frame(client, frame)
+            
+        if client.writer.is_closing():
+            raise ConnectionError(f"Connection to {client.id} is closing")
+            
+        # The transport write buffer is the outbound queue in asyncio mode; frames
+        # already handed to it cannot be evicted, so drop_oldest sheds new frames.
+        buffered = client.writer.transport.get_write_buffer_size()
+        if buffered + len(frame) > self.outbound_high_watermark:
+            if self.slow_consumer_policy == DISCONNECT:
+                self.logger.warning("Disconnecting slow consumer %s: write buffer exceeded %s bytes",
+                                    client.id, self.outbound_high_watermark)
+                self.disconnect_client(client.id)
+                raise SlowConsumerError(f"Write buffer exceeded {self.outbound_high_watermark} bytes")
+            return False
+            
+        client.writer.write(frame)
+        client.record_sent(len(frame))
+        return True
+        
+    def handle_cluster_event(self, event: dict):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(super().handle_cluster_event, event)
+            
+    def replay_offline(self, client: ClientInfo) -> int:
+        # Auth runs on the executor, but transports may only be written from
+        # the loop.
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(super().replay_offline, client)
+            return 0
+        return super().replay_offline(client)
+        
+    def evict_idle_client(self, client: ClientInfo):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(super().evict_idle_client, client)
+            
+    def ping_idle_client(self, client: ClientInfo):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(super().ping_idle_client, client)
+            
+    def throttle(self, client_id: str, seconds: float):
+        if self.loop is None or not self.loop.is_running():
+            super().throttle(client_id, seconds)
+            return
+        # Sleeping would stall the event loop; the connection handler waits instead.
+        self.throttle_delays[client_id] = self.throttle_delays.get(client_id, 0.0) + seconds
+        
+    def close_client(self, client: ClientInfo):
+        if client.writer is None:
+            super().close_client(client)
+            return
+            
+        client.writer.close()
+        
+    async def reject_client(self, writer: asyncio.StreamWriter):
+        self.connections_rejected.inc()
+        try:
+            writer.write(FRAMINGS["newline"].encode(json.dumps({
+                "type": "error",
+                "message": "Server is at maximum capacity"
+            }).encode('utf-8')))
+            await writer.drain()
+        finally:
+            writer.close()
+            
+    async def process_frame(self, client_id: str, frame: bytes) -> dict:
+        message, error = self.decode_frame(frame, self.clients[client_id].decompressor)
+        if error:
+            return error
+        if message.get('type') == 'auth':
+            # Password checks wait on the KDF pool, which must not block the loop.
+            return await self.loop.run_in_executor(None, self.respond, client_id, message)
+        if message.get('type') == 'batch' and self.batch_has_auth(message.get('messages')):
+            return await self.respond_batch(client_id, message)
+        return self.respond(client_id, message)
+        
+    def batch_has_auth(self, messages) -> bool:
+        return isinstance(messages, list) and any(
+            isinstance(item, dict) and item.get('type') == 'auth' for item in messages
+        )
+        
+    async def respond_batch(self, client_id: str, message: dict) -> dict:
+        # respond() for a batch, except that auth items go to the executor like
+        # top-level ones; everything else still runs on the loop, in order.
+        started = time.perf_counter()
+        response = self.check_rate_limit(client_id, message) if self.rate_limiter else None
+        messages = message.get('messages')
+        response = response or self.check_batch(messages)
+        if response is None:
+            responses = []
+            for item in messages:
+                if isinstance(item, dict) and item.get('type') == 'auth':
+                    responses.append(await self.loop.run_in_executor(None, self.respond, client_id, item))
+                else:
+                    responses.append(self.respond_batched(client_id, item))
+            response = self.batch_response(responses)
+        return self.finish_response(message, response, started)
+        
+    async def accept_tls(self, writer: asyncio.StreamWriter) -> bool:
+        started = time.perf_counter()
+        try:
+            await writer.start_tls(self.ssl_context, ssl_handshake_timeout=self.handshake_timeout)
+        except (ssl.SSLError, OSError, asyncio.TimeoutError) as e:
+            self.tls_stats.record_failure()
+            self.logger.warning("TLS handshake failed: %s", e)
+            writer.close()
+            return False
+        ssl_object = writer.get_extra_info('ssl_object')
+        self.tls_stats.record(time.perf_counter() - started, ssl_object.session_reused)
+        return True
+        
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if self.ssl_context and not await self.accept_tls(writer):
+            return
+        if len(self.clients) >= self.max_clients:
+            await self.reject_client(writer)
+            return
+            
+        client_info = self.register_client(
+            writer.get_extra_info('socket'),
+            writer.get_extra_info('peername'),
+            writer=writer
+        )
+        client_id = client_info.id
+        decoder = self.create_decoder()
+        writer.transport.set_write_buffer_limits(
+            high=self.outbound_high_watermark,
+            low=self.outbound_low_watermark
+        )
+        
+        try:
+            while self.running:
+                data = await reader.read(self.buffer_size)
+                if not data:
+                    break
+                    
+                frames = decoder.feed(data)
+                client_info.framing = decoder.framing
+                client_info.touch(decoder.received, len(frames))
+                for frame in frames:
+                    response = await self.process_frame(client_id, frame)
+                    delay = self.throttle_delays.pop(client_id, 0.0)
+                    if delay:
+                        await writer.drain()
+                        await asyncio.sleep(delay)
+                    self.send_to_client(client_info, response)
+                await writer.drain()
+                
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except FramingError as e:
+            self.logger.warning("Framing error from client %s: %s", client_id, e)
+        except Exception as e:
+            self.logger.error("Error handling client %s: %s", client_id, e)
+        finally:
+            self.throttle_delays.pop(client_id, None)
+            self.disconnect_client(client_id)
+            
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        # TLS is started per connection rather than by the listener so each
+        # handshake can be timed.
+        self.ssl_context = self.create_ssl_context()
+        self.server = await asyncio.start_server(
+            self.handle_connection,
+            self.host,
+            self.port,
+            backlog=self.backlog,
+            reuse_address=True,
+            reuse_port=hasattr(socket, 'SO_REUSEPORT')
+        )
+        self.running = True
+        
+        self.logger.info("Async TCP Server started on %s:%s", self.host, self.port)
+        self.logger.info("SSL enabled: %s", self.enable_ssl)
+        self.logger.info("Max clients: %s", self.max_clients)
+        self.start_message_log()
+        self.start_reaper()
+        self.start_metrics()
+        
+        try:
+            await self.server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+            
+    def start(self):
+        try:
+            asyncio.run(self.serve())
+        except Exception as e:
+            self.logger.error("Failed to start server: %s", e)
+            self.stop()
+            
+    def shutdown(self):
+        self.running = False
+        self.stop_reaper()
+        self.stop_metrics()
+        
+        for client_id in list(self.clients.keys()):
+            self.disconnect_client(client_id)
+        self.stop_message_log()
+        self.authenticator.close()
+            
+        if self.server:
+            self.server.close()
+            
+        self.logger.info("Server stopped")
+        
+    def stop(self):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.shutdown)
+        else:
+            self.running = False
+            self.authenticator.close()
+            self.logger.info("Server stopped")
+
+def main():
+    from config.settings import ConfigManager
+    
+    # Users come from the configured store, so settings are read like server.py does.
+    server = AsyncTCPServer.from_config(ConfigManager().get_server_config())
+    
+    try:
+        server.start()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
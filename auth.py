@@ -0,0 +1,267 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from utils import generate_token, hash_secret, verify_secret
+
+class UserStore(ABC):
+    @abstractmethod
+    def get_hash(self, username: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def set_hash(self, username: str, password_hash: str):
+        pass
+
+    @abstractmethod
+    def delete(self, username: str) -> bool:
+        pass
+
+    def add_user(self, username: str, password: str):
+        self.set_hash(username, hash_secret(password))
+
+    def ensure_user(self, username: str, password: str) -> bool:
+        # Bootstrap accounts are created once; a password changed since is kept.
+        if self.get_hash(username) is not None:
+            return False
+        self.add_user(username, password)
+        return True
+
+class MemoryUserStore(UserStore):
+    def __init__(self, users: Optional[Dict[str, str]] = None):
+        self.hashes: Dict[str, str] = {}
+        for username, password in (users or {}).items():
+            self.add_user(username, password)
+
+    def get_hash(self, username: str) -> Optional[str]:
+        return self.hashes.get(username)
+
+    def set_hash(self, username: str, password_hash: str):
+        self.hashes[username] = password_hash
+
+    def delete(self, username: str) -> bool:
+        return self.hashes.pop(username, None) is not None
+
+class JsonUserStore(UserStore):
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.hashes: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.hashes = json.load(f).get("users", {})
+
+    def get_hash(self, username: str) -> Optional[str]:
+        return self.hashes.get(username)
+
+    def set_hash(self, username: str, password_hash: str):
+        with self.lock:
+            self.hashes[username] = password_hash
+            self.save()
+
+    def delete(self, username: str) -> bool:
+        with self.lock:
+            if self.hashes.pop(username, None) is None:
+                return False
+            self.save()
+            return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({"users": self.hashes}, f, indent=2)
+        os.replace(temp_path, self.path)
+
+class SqliteUserStore(UserStore):
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, password_hash TEXT NOT NULL)"
+            )
+
+    def get_hash(self, username: str) -> Optional[str]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT password_hash FROM users WHERE username = ?", (username,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_hash(self, username: str, password_hash: str):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO users (username, password_hash) VALUES (?, ?)", (username, password_hash)
+            )
+
+    def delete(self, username: str) -> bool:
+        with self.lock, self.connection:
+            cursor = self.connection.execute("DELETE FROM users WHERE username = ?", (username,))
+        return cursor.rowcount > 0
+
+    def close(self):
+        self.connection.close()
+
+def create_user_store(spec: Any = None) -> UserStore:
+    # Accepts a store instance, "memory", "json:<path>" or "sqlite:<path>". A
+    # memory store starts empty.
+    if isinstance(spec, UserStore):
+        return spec
+    if spec is None or spec == "memory":
+        return MemoryUserStore()
+    scheme, _, path = spec.partition(':')
+    if scheme == "json" and path:
+        return JsonUserStore(path)
+    if scheme == "sqlite" and path:
+        return SqliteUserStore(path)
+    raise ValueError(f"Unknown user store: {spec}")
+
+class SessionCache:
+    # Resumable sessions let a reconnecting client skip the password KDF. Tokens
+    # expire after `ttl` seconds and the least recently used are dropped first.
+    def __init__(self, ttl: float = 3600.0, max_size: int = 10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.sessions: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    def issue(self, username: str, now: Optional[float] = None) -> str:
+        token = generate_token()
+        self.add(token, username, now)
+        return token
+
+    def add(self, token: str, username: str, now: Optional[float] = None):
+        # Also used for tokens issued by another cluster worker.
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self.sessions[token] = (username, now + self.ttl)
+            while len(self.sessions) > self.max_size:
+                self.sessions.popitem(last=False)
+
+    def resume(self, token: str, now: Optional[float] = None) -> Optional[str]:
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            session = self.sessions.get(token)
+            if session is None:
+                return None
+            username, expires_at = session
+            if expires_at <= now:
+                del self.sessions[token]
+                return None
+            self.sessions.move_to_end(token)
+            return username
+
+    def revoke(self, token: str) -> bool:
+        with self.lock:
+            return self.sessions.pop(token, None) is not None
+
+    def revoke_user(self, username: str) -> int:
+        with self.lock:
+            tokens = [token for token, (owner, _) in self.sessions.items() if owner == username]
+            for token in tokens:
+                del self.sessions[token]
+        return len(tokens)
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+class Authenticator:
+    # Password checks run on a small dedicated pool: the KDF is slow on purpose,
+    # and bounding its concurrency keeps a reconnect storm from starving I/O.
+    def __init__(self, store: Optional[UserStore] = None, workers: int = 4,
+                 session_ttl: float = 3600.0, session_cache_size: int = 10000):
+        self.store = store if store is not None else MemoryUserStore()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth")
+        self.sessions = SessionCache(ttl=session_ttl, max_size=session_cache_size)
+        # Unknown users are checked against a throwaway hash so they take as
+        # long to reject as a wrong password.
+        self.dummy_hash = hash_secret(generate_token())
+        self.lock = threading.Lock()
+        self.verified = 0
+        self.failed = 0
+        self.resumed = 0
+        self.logger = logging.getLogger(__name__)
+
+    def verify(self, username: str, password: str) -> bool:
+        try:
+            password_hash = self.store.get_hash(username)
+        except Exception as e:
+            self.logger.error("User store lookup failed for %s: %s", username, e)
+            password_hash = None
+        valid = verify_secret(password, password_hash or self.dummy_hash) and password_hash is not None
+        with self.lock:
+            if valid:
+                self.verified += 1
+            else:
+                self.failed += 1
+        return valid
+
+    def submit(self, username: str, password: str) -> Future:
+        return self.executor.submit(self.verify, username, password)
+
+    def authenticate(self, username: str, password: str) -> bool:
+        return self.submit(username, password).result()
+
+    def user_exists(self, username: str) -> bool:
+        try:
+            return self.store.get_hash(username) is not None
+        except Exception as e:
+            self.logger.error("User store lookup failed for %s: %s", username, e)
+            return False
+
+    def issue_session(self, username: str) -> str:
+        return self.sessions.issue(username)
+
+    def resume_session(self, token: str) -> Optional[str]:
+        username = self.sessions.resume(token)
+        if username is not None:
+            with self.lock:
+                self.resumed += 1
+        return username
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "verified": self.verified,
+                "failed": self.failed,
+                "resumed": self.resumed,
+                "sessions": len(self.sessions)
+            }
+
+def main():
+    import argparse
+    import getpass
+
+    parser = argparse.ArgumentParser(description='Manage server users')
+    parser.add_argument('--store', required=True, help='User store, e.g. json:users.json or sqlite:users.db')
+    parser.add_argument('action', choices=['add', 'remove'])
+    parser.add_argument('username')
+
+    args = parser.parse_args()
+    store = create_user_store(args.store)
+
+    if args.action == 'add':
+        password = getpass.getpass(f"Password for {args.username}: ")
+        if password != getpass.getpass("Repeat password: "):
+            parser.error("Passwords do not match")
+        store.add_user(args.username, password)
+        print(f"Saved user {args.username}")
+    elif store.delete(args.username):
+        print(f"Removed user {args.username}")
+    else:
+        print(f"No such user {args.username}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from protocol import KEEPALIVE_TYPE, PUSH_TYPES
+from codec import JSON_CODEC, decode_message, get_codec
+from framing import FrameDecoder, get_framing
+
+ENGINES = ("threaded", "async", "selector")
+OPERATIONS = ("ping", "broadcast", "private")
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(int(fraction * len(ordered)), len(ordered) - 1)
+    return ordered[index]
+
+def summarize_latencies(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+        "p999_ms": percentile(ordered, 0.999) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0
+    }
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation in mix: {name}")
+        mix[name] = float(weight) if weight else 1.0
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("Operation mix needs at least one positive weight")
+    return mix
+
+def process_usage(pid: int) -> Optional[Dict[str, float]]:
+    # Reads /proc directly so the benchmark needs no third-party dependencies.
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            status = dict(line.split(':', 1) for line in f if ':' in line)
+    except OSError:
+        return None
+
+    ticks = os.sysconf('SC_CLK_TCK')
+    return {
+        "cpu_seconds": (int(fields[11]) + int(fields[12])) / ticks,
+        "rss_bytes": int(status.get('VmRSS', '0 kB').split()[0]) * 1024,
+        "peak_rss_bytes": int(status.get('VmHWM', '0 kB').split()[0]) * 1024
+    }
+
+def self_usage() -> Dict[str, float]:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS.
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return {
+        "cpu_seconds": usage.ru_utime + usage.ru_stime,
+        "peak_rss_bytes": usage.ru_maxrss * scale
+    }
+
+def run_server(engine: str, server_kwargs: dict):
+    if engine == "async":
+        from async_server import AsyncTCPServer as server_class
+    elif engine == "selector":
+        from selector_server import SelectorTCPServer as server_class
+    else:
+        from server import TCPServer as server_class
+    server_class(**server_kwargs).start()
+
+class LocalServer:
+    def __init__(self, engine: str = "threaded", host: str = "127.0.0.1", port: int = 8090,
+                 max_clients: int = 1000, **server_kwargs):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.server_kwargs = dict(server_kwargs, host=host, port=port, max_clients=max_clients)
+        self.process: Optional[multiprocessing.Process] = None
+
+    def start(self, timeout: float = 10.0):
+        context = multiprocessing.get_context("fork")
+        self.process = context.Process(target=run_server, args=(self.engine, self.server_kwargs),
+                                       name=f"bench-{self.engine}-server", daemon=True)
+        self.process.start()
+
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                socket.create_connection((self.host, self.port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.05)
+        self.stop()
+        raise RuntimeError(f"Server did not start on {self.host}:{self.port} within {timeout} seconds")
+
+    def usage(self) -> Optional[Dict[str, float]]:
+        if self.process is None or not self.process.is_alive():
+            return None
+        return process_usage(self.process.pid)
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.process = None
+
+class BenchStats:
+    def __init__(self):
+        self.connect_latencies: List[float] = []
+        self.latencies: Dict[str, List[float]] = {}
+        self.sent = 0
+        self.responses = 0
+        self.errors = 0
+        self.pushes = 0
+        self.failed_connections = 0
+        self.dropped_connections = 0
+
+    def merge(self, other: 'BenchStats'):
+        self.connect_latencies.extend(other.connect_latencies)
+        for operation, samples in other.latencies.items():
+            self.latencies.setdefault(operation, []).extend(samples)
+        self.sent += other.sent
+        self.responses += other.responses
+        self.errors += other.errors
+        self.pushes += other.pushes
+        self.failed_connections += other.failed_connections
+        self.dropped_connections += other.dropped_connections
+
+class BenchConnection:
+    def __init__(self, host: str, port: int, framing: str = "length", codec: str = "json",
+                 timeout: float = 10.0, buffer_size: int = 4096):
+        self.host = host
+        self.port = port
+        self.framing = get_framing(framing)
+        if self.framing is None:
+            raise ValueError("Benchmark framing must be 'length' or 'newline'")
+        self.preferred_codec = get_codec(codec)
+        self.codec = JSON_CODEC
+        self.timeout = timeout
+        self.buffer_size = buffer_size
+        self.socket: Optional[socket.socket] = None
+        self.decoder: Optional[FrameDecoder] = None
+        self.stats = BenchStats()
+
+    def connect(self, username: str, password: str):
+        started = time.perf_counter()
+        self.socket = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.decoder = FrameDecoder(buffer_size=self.buffer_size)
+
+        message = {"type": "auth", "credentials": {"username": username, "password": password}}
+        if self.preferred_codec is not JSON_CODEC:
+            message["codecs"] = [self.preferred_codec.name, JSON_CODEC.name]
+        response, _ = self.exchange(message)
+        if not response.get('success'):
+            raise ConnectionError(f"Authentication failed: {response.get('message', '')}")
+        self.codec = get_codec(response.get('codec', JSON_CODEC.name))
+        self.stats.connect_latencies.append(time.perf_counter() - started)
+
+    def exchange(self, message: dict) -> Tuple[dict, float]:
+        started = time.perf_counter()
+        self.socket.sendall(self.framing.encode(self.codec.encode(message)))
+
+        response = None
+        while response is None:
+            for received in self.receive(self.timeout):
+                if received.get('type') in PUSH_TYPES:
+                    self.stats.pushes += 1
+                elif received.get('type') == KEEPALIVE_TYPE:
+                    continue
+                elif response is None:
+                    response = received
+        return response, time.perf_counter() - started
+
+    def request(self, operation: str, message: dict) -> dict:
+        self.stats.sent += 1
+        response, seconds = self.exchange(message)
+        self.stats.latencies.setdefault(operation, []).append(seconds)
+        self.stats.responses += 1
+        if response.get('type') == 'error' or response.get('success') is False:
+            self.stats.errors += 1
+        return response
+
+    def receive(self, timeout: float) -> List[dict]:
+        self.socket.settimeout(timeout)
+        frames = self.decoder.recv_from(self.socket)
+        if frames is None:
+            raise ConnectionError("Server closed the connection")
+        return [decode_message(frame) for frame in frames]
+
+    def drain_until(self, deadline: float):
+        # Pushed broadcasts must be read while idle or the server sees a slow consumer.
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return
+            try:
+                for message in self.receive(remaining):
+                    if message.get('type') in PUSH_TYPES:
+                        self.stats.pushes += 1
+            except socket.timeout:
+                return
+
+    def close(self):
+        if self.socket:
+            try:
+                self.socket.close()
+            except OSError:
+                pass
+
+class LoadGenerator:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8090, connections: int = 10,
+                 duration: float = 10.0, rate: float = 0.0, mix: Optional[Dict[str, float]] = None,
+                 username: str = "admin", password: str = "admin123", framing: str = "length",
+                 codec: str = "json", payload_size: int = 64, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.connections = connections
+        self.duration = duration
+        self.rate = rate
+        self.mix = mix or {"ping": 1.0}
+        self.username = username
+        self.password = password
+        self.framing = framing
+        self.codec = codec
+        self.content = "x" * payload_size
+        self.timeout = timeout
+        self.stats = BenchStats()
+        self.stats_lock = threading.Lock()
+        self.connected = threading.Barrier(connections + 1, action=self.begin_load)
+        self.load_started = 0.0
+        self.deadline = 0.0
+
+    def begin_load(self):
+        self.load_started = time.perf_counter()
+        self.deadline = self.load_started + self.duration
+
+    def next_message(self, chooser: random.Random) -> Tuple[str, dict]:
+        operation = chooser.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        if operation == "ping":
+            return operation, {"type": "ping"}
+        target = "broadcast" if operation == "broadcast" else self.username
+        return operation, {"type": "message", "target": target, "content": self.content}
+
+    def run_connection(self, index: int):
+        connection = BenchConnection(self.host, self.port, framing=self.framing, codec=self.codec,
+                                     timeout=self.timeout)
+        chooser = random.Random(index)
+        try:
+            try:
+                connection.connect(self.username, self.password)
+            except (OSError, ConnectionError):
+                connection.stats.failed_connections += 1
+                connection.close()
+                return
+            finally:
+                self.connected.wait()
+
+            interval = 1.0 / self.rate if self.rate > 0 else 0.0
+            # Spread the first send so rate-limited connections do not fire in lockstep.
+            next_send = time.perf_counter() + chooser.random() * interval
+            while True:
+                connection.drain_until(min(next_send, self.deadline))
+                if time.perf_counter() >= self.deadline:
+                    break
+                connection.request(*self.next_message(chooser))
+                next_send += interval
+        except (OSError, ConnectionError):
+            connection.stats.dropped_connections += 1
+        finally:
+            connection.close()
+            with self.stats_lock:
+                self.stats.merge(connection.stats)
+
+    def run(self, server: Optional[LocalServer] = None) -> Dict[str, Any]:
+        threads = [
+            threading.Thread(target=self.run_connection, args=(index,), name=f"bench-{index}", daemon=True)
+            for index in range(self.connections)
+        ]
+        client_before = self_usage()
+        server_before = server.usage() if server else None
+
+        connect_started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        self.connected.wait()
+        connect_seconds = self.load_started - connect_started
+
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - self.load_started
+
+        server_after = server.usage() if server else None
+        client_after = self_usage()
+        return self.report(connect_seconds, elapsed, server_before, server_after, client_before, client_after)
+
+    def report(self, connect_seconds: float, elapsed: float, server_before: Optional[dict],
+               server_after: Optional[dict], client_before: dict, client_after: dict) -> Dict[str, Any]:
+        stats = self.stats
+        established = self.connections - stats.failed_connections
+        all_latencies = [sample for samples in stats.latencies.values() for sample in samples]
+
+        server_resources = None
+        if server_before and server_after:
+            cpu_seconds = server_after["cpu_seconds"] - server_before["cpu_seconds"]
+            server_resources = dict(server_after, cpu_seconds=cpu_seconds,
+                                    cpu_percent=cpu_seconds / elapsed * 100 if elapsed else 0.0)
+        client_cpu = client_after["cpu_seconds"] - client_before["cpu_seconds"]
+
+        return {
+            "meta": {
+                "timestamp": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "implementation": platform.python_implementation(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count()
+            },
+            "config": {
+                "host": self.host,
+                "port": self.port,
+                "connections": self.connections,
+                "duration": self.duration,
+                "rate": self.rate,
+                "mix": self.mix,
+                "framing": self.framing,
+                "codec": self.codec,
+                "payload_size": len(self.content)
+            },
+            "connections": {
+                "attempted": self.connections,
+                "established": established,
+                "failed": stats.failed_connections,
+                "dropped": stats.dropped_connections,
+                "seconds": connect_seconds,
+                "per_sec": established / connect_seconds if connect_seconds else 0.0,
+                "latency": summarize_latencies(stats.connect_latencies)
+            },
+            "messages": {
+                "sent": stats.sent,
+                "responses": stats.responses,
+                "errors": stats.errors,
+                "pushes_received": stats.pushes,
+                "seconds": elapsed,
+                "per_sec": stats.responses / elapsed if elapsed else 0.0,
+                "pushes_per_sec": stats.pushes / elapsed if elapsed else 0.0
+            },
+            "latency": summarize_latencies(all_latencies),
+            "latency_by_operation": {
+                operation: summarize_latencies(samples) for operation, samples in stats.latencies.items()
+            },
+            "resources": {
+                "server": server_resources,
+                "loadgen": {
+                    "cpu_seconds": client_cpu,
+                    "cpu_percent": client_cpu / elapsed * 100 if elapsed else 0.0,
+                    "peak_rss_bytes": client_after["peak_rss_bytes"]
+                }
+            }
+        }
+
+COMPARED_METRICS = (
+    ("connections", "per_sec", True),
+    ("messages", "per_sec", True),
+    ("latency", "p50_ms", False),
+    ("latency", "p99_ms", False),
+    ("latency", "p999_ms", False)
+)
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.10) -> List[dict]:
+    rows = []
+    for section, key, higher_is_better in COMPARED_METRICS:
+        before = baseline.get(section, {}).get(key)
+        after = current.get(section, {}).get(key)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        rows.append({"metric": f"{section}.{key}", "baseline": before, "current": after,
+                     "change": change, "regressed": regressed})
+    return rows
+
+def format_report(report: Dict[str, Any]) -> str:
+    connections = report["connections"]
+    messages = report["messages"]
+    lines = [
+        f"Connections: {connections['established']}/{connections['attempted']} established "
+        f"({connections['failed']} failed, {connections['dropped']} dropped), "
+        f"{connections['per_sec']:.1f} conn/s",
+        f"Messages: {messages['responses']} responses, {messages['errors']} errors, "
+        f"{messages['per_sec']:.1f} msg/s, {messages['pushes_per_sec']:.1f} pushes/s"
+    ]
+    for name, latency in [("all", report["latency"])] + sorted(report["latency_by_operation"].items()):
+        lines.append(f"Latency {name:>9}: p50 {latency['p50_ms']:.3f} ms, p99 {latency['p99_ms']:.3f} ms, "
+                     f"p999 {latency['p999_ms']:.3f} ms, max {latency['max_ms']:.3f} ms")
+    for name, usage in report["resources"].items():
+        if usage:
+            rss = usage.get("rss_bytes", usage["peak_rss_bytes"])
+            lines.append(f"Resources {name}: {usage['cpu_percent']:.1f}% CPU, "
+                         f"{rss / (1024 * 1024):.1f} MB RSS")
+    return "\n".join(lines)
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='TCP server load generator')
+    parser.add_argument('--engine', choices=ENGINES, default='threaded', help='Server engine to start locally')
+    parser.add_argument('--target', help='Benchmark an already running server at host:port instead')
+    parser.add_argument('--host', default='127.0.0.1', help='Bind address of the local server')
+    parser.add_argument('--port', type=int, default=8090, help='Port of the local server')
+    parser.add_argument('--connections', type=int, default=10, help='Concurrent connections')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load after connecting')
+    parser.add_argument('--rate', type=float, default=0.0, help='Messages per second per connection (0 = unlimited)')
+    parser.add_argument('--mix', default='ping=1', help='Operation weights, e.g. ping=8,broadcast=1,private=1')
+    parser.add_argument('--framing', choices=('length', 'newline'), default='length', help='Client framing')
+    parser.add_argument('--codec', choices=('json', 'binary'), default='json', help='Preferred codec')
+    parser.add_argument('--payload-size', type=int, default=64, help='Message content size in bytes')
+    parser.add_argument('--username', default='admin', help='Username to authenticate with')
+    parser.add_argument('--password', default='admin123', help='Password to authenticate with')
+    parser.add_argument('--json', dest='json_path', help='Write the JSON report to this path (- for stdout)')
+    parser.add_argument('--compare', help='Baseline JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed relative regression')
+
+    args = parser.parse_args()
+
+    server = None
+    host, port = args.host, args.port
+    if args.target:
+        host, _, target_port = args.target.rpartition(':')
+        port = int(target_port)
+    else:
+        server = LocalServer(args.engine, host=host, port=port, max_clients=args.connections + 10,
+                             admin_username=args.username, admin_password=args.password)
+        server.start()
+
+    generator = LoadGenerator(
+        host=host,
+        port=port,
+        connections=args.connections,
+        duration=args.duration,
+        rate=args.rate,
+        mix=parse_mix(args.mix),
+        username=args.username,
+        password=args.password,
+        framing=args.framing,
+        codec=args.codec,
+        payload_size=args.payload_size
+    )
+
+    try:
+        report = generator.run(server)
+    finally:
+        if server:
+            server.stop()
+    report["config"]["engine"] = None if args.target else args.engine
+
+    if args.json_path == '-':
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+        if args.json_path:
+            with open(args.json_path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            rows = compare_reports(json.load(f), report, args.tolerance)
+        for row in rows:
+            flag = "REGRESSION" if row["regressed"] else "ok"
+            print(f"{row['metric']:>20}: {row['baseline']:.3f} -> {row['current']:.3f} "
+                  f"({row['change'] * 100:+.1f}%) {flag}", file=sys.stderr)
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import threading
+from typing import Any, Dict, List, Tuple
+from registry import SnapshotSet
+
+MAX_CHANNEL_LENGTH = 128
+
+def valid_channel(channel: Any) -> bool:
+    return isinstance(channel, str) and 0 < len(channel) <= MAX_CHANNEL_LENGTH
+
+class ChannelIndex:
+    # Maps each channel to a SnapshotSet of its subscribers, guarded by one of
+    # a few striped locks. Joining or leaving is O(1), and publishers iterate
+    # a snapshot without locking, so only subscribe/unsubscribe contend.
+    def __init__(self, stripe_count: int = 64):
+        self.stripe_count = stripe_count
+        self.locks = [threading.Lock() for _ in range(stripe_count)]
+        self.subscribers_by_channel: Dict[str, SnapshotSet] = {}
+
+    def lock_for(self, channel: str) -> threading.Lock:
+        return self.locks[hash(channel) % self.stripe_count]
+
+    def subscribe(self, channel: str, client) -> bool:
+        lock = self.lock_for(channel)
+        with lock:
+            subscribers = self.subscribers_by_channel.get(channel)
+            if subscribers is None:
+                subscribers = self.subscribers_by_channel[channel] = SnapshotSet(lock)
+            if not subscribers.add(client):
+                return False
+            client.channels.add(channel)
+        return True
+
+    def unsubscribe(self, channel: str, client) -> bool:
+        with self.lock_for(channel):
+            subscribers = self.subscribers_by_channel.get(channel)
+            if subscribers is None or not subscribers.discard(client):
+                return False
+            if not subscribers:
+                self.subscribers_by_channel.pop(channel, None)
+            client.channels.discard(channel)
+        return True
+
+    def remove_client(self, client) -> List[str]:
+        channels = list(client.channels)
+        for channel in channels:
+            self.unsubscribe(channel, client)
+        return channels
+
+    def subscribers(self, channel: str) -> Tuple[Any, ...]:
+        subscribers = self.subscribers_by_channel.get(channel)
+        return subscribers.snapshot() if subscribers is not None else ()
+
+    def __len__(self) -> int:
+        return len(self.subscribers_by_channel)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {channel: len(subscribers) for channel, subscribers in list(self.subscribers_by_channel.items())}
@@ -5,41 +5,89 @@ import threading
 import logging
 import signal
 import sys
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, List
 from datetime import datetime
+from dataclasses import fields
 import ssl
 import getpass
+import itertools
+import os
+import queue
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from framing import FrameDecoder, get_framing
+from codec import JSON_CODEC, decode_message, get_codec
+from compression import COMPRESSIONS, Compressor, Decompressor
+from tls import HandshakeStats, client_context
+from transfer import DEFAULT_CHUNK_SIZE, IncomingFile, TransferError, is_chunk, parse_chunk, send_chunk
+from utils import file_checksum, format_checksum
+from logpipe import SAMPLED, configure_logging
+from protocol import PUSH_TYPES, ClientProtocol
 
-class TCPClient:
+class TCPClient(ClientProtocol):
+    CONFIG_FIELDS = (
+        "host", "port", "enable_ssl", "verify_ssl", "timeout", "framing", "buffer_size", "codec",
+        "max_in_flight", "incoming_queue_size", "tcp_nodelay", "socket_recv_buffer",
+        "socket_send_buffer", "compression", "compression_level", "compression_threshold", "log_level", "log_file"
+    )
+    
     def __init__(self, host: str = "127.0.0.1", port: int = 8080, enable_ssl: bool = False, 
-                 verify_ssl: bool = True, timeout: int = 30):
+                 verify_ssl: bool = True, timeout: int = 30, framing: str = "length",
+                 buffer_size: int = 4096, codec: str = "json", max_in_flight: int = 1024,
+                 on_message: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 incoming_queue_size: int = 1000, tcp_nodelay: bool = True,
+                 socket_recv_buffer: Optional[int] = None, socket_send_buffer: Optional[int] = None,
+                 compression: Optional[str] = None, compression_level: int = 6, compression_threshold: int = 256,
+                 log_level: str = "INFO", log_file: str = "logs/client.log"):
+        super().__init__()
         self.host = host
         self.port = port
         self.enable_ssl = enable_ssl
         self.verify_ssl = verify_ssl
         self.timeout = timeout
+        self.framing = get_framing(framing)
+        if self.framing is None:
+            raise ValueError("Client framing must be 'length' or 'newline'")
+        self.buffer_size = buffer_size
+        self.preferred_codec = get_codec(codec)
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Client compression must be one of {', '.join(COMPRESSIONS)}")
+        if compression and self.framing.name != "length":
+            raise ValueError("Compression requires length-prefixed framing")
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_threshold = compression_threshold
+        self.decompressor: Optional[Decompressor] = None
+        self.tcp_nodelay = tcp_nodelay
+        self.socket_recv_buffer = socket_recv_buffer
+        self.socket_send_buffer = socket_send_buffer
+        self.log_level = log_level
+        self.log_file = log_file
         
         self.socket: Optional[socket.socket] = None
         self.connected = False
-        self.authenticated = False
-        self.username: Optional[str] = None
+        self.tls_session: Optional[ssl.SSLSession] = None
+        self.tls_stats = HandshakeStats()
         self.client_id: Optional[str] = None
+        self.decoder: Optional[FrameDecoder] = None
+        self.reader: Optional[threading.Thread] = None
+        self.send_lock = threading.Lock()
+        self.transfer_ids = itertools.count(1)
+        self.downloads: Dict[int, IncomingFile] = {}
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.on_message = on_message
+        self.incoming: queue.Queue = queue.Queue(maxsize=incoming_queue_size)
         
         self.setup_logging()
         self.setup_signal_handlers()
         
+    @classmethod
+    def from_config(cls, config, **overrides) -> 'TCPClient':
+        kwargs = {f.name: getattr(config, f.name) for f in fields(config) if f.name in cls.CONFIG_FIELDS}
+        kwargs.update(overrides)
+        return cls(**kwargs)
+        
     def setup_logging(self):
-        import os
-        os.makedirs('logs', exist_ok=True)
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('logs/client.log'),
-                logging.StreamHandler()
-            ]
-        )
+        configure_logging(self.log_file, self.log_level)
         self.logger = logging.getLogger(__name__)
         
     def setup_signal_handlers(self):
@@ -47,42 +95,100 @@ class TCPClient:
         signal.signal(signal.SIGTERM, self.signal_handler)
         
     def signal_handler(self, signum, frame):
-        self.logger.info(f"Received signal {signum}, disconnecting...")
+        self.logger.info("Received signal %s, disconnecting...", signum)
         self.disconnect()
         
     def create_socket(self) -> socket.socket:
         client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         client_socket.settimeout(self.timeout)
+        if self.tcp_nodelay:
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.socket_recv_buffer:
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.socket_recv_buffer)
+        if self.socket_send_buffer:
+            client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.socket_send_buffer)
         
         if self.enable_ssl:
-            context = ssl.create_default_context()
-            if not self.verify_ssl:
-                context.check_hostname = False
-                context.verify_mode = ssl.CERT_NONE
-            client_socket = context.wrap_socket(client_socket)
+            # Offering the previous connection's session lets the server skip
+            # the full key exchange on reconnect.
+            client_socket = client_context(self.verify_ssl).wrap_socket(
+                client_socket,
+                server_hostname=self.host,
+                do_handshake_on_connect=False,
+                session=self.tls_session
+            )
             
         return client_socket
         
+    def handshake(self):
+        started = time.perf_counter()
+        try:
+            self.socket.do_handshake()
+        except (ssl.SSLError, OSError):
+            self.tls_stats.record_failure()
+            raise
+        self.tls_stats.record(time.perf_counter() - started, self.socket.session_reused)
+        
     def connect(self) -> bool:
         try:
             self.socket = self.create_socket()
             self.socket.connect((self.host, self.port))
+            if self.enable_ssl:
+                self.handshake()
+            self.decoder = FrameDecoder(buffer_size=self.buffer_size)
+            self.codec = JSON_CODEC
+            self.compressor = None
+            self.decompressor = Decompressor()
             self.connected = True
-            self.logger.info(f"Connected to server {self.host}:{self.port}")
+            self.reader = threading.Thread(target=self.read_loop, name="client-reader", daemon=True)
+            self.reader.start()
+            self.logger.info("Connected to server %s:%s", self.host, self.port)
             return True
         except Exception as e:
-            self.logger.error(f"Failed to connect to server: {e}")
+            self.logger.error("Failed to connect to server: %s", e)
             return False
             
     def disconnect(self):
+        was_connected = self.connected
         self.connected = False
         self.authenticated = False
+        if isinstance(self.socket, ssl.SSLSocket) and was_connected:
+            try:
+                self.tls_session = self.socket.session
+            except (ssl.SSLError, ValueError):
+                pass
         if self.socket:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             try:
                 self.socket.close()
             except:
                 pass
-        self.logger.info("Disconnected from server")
+        self.fail_pending(ConnectionError("Disconnected from server"))
+        for download in list(self.downloads.values()):
+            download.fail("Disconnected from server")
+        if was_connected:
+            self.logger.info("Disconnected from server")
+        
+    def send_request(self, message: Dict[str, Any]) -> Future:
+        if not self.connected or not self.socket:
+            raise ConnectionError("Not connected to server")
+            
+        future = Future()
+        self.in_flight.acquire()
+        future.add_done_callback(lambda _: self.in_flight.release())
+        request_id = None
+        try:
+            with self.send_lock:
+                request_id, data = self.track(message, future)
+                self.socket.sendall(data)
+        except Exception as e:
+            self.forget(request_id)
+            future.set_exception(e)
+            raise
+        return future
         
     def send_message(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         if not self.connected or not self.socket:
@@ -90,35 +196,108 @@ class TCPClient:
             return None
             
         try:
-            self.socket.send(json.dumps(message).encode('utf-8'))
-            response_data = self.socket.recv(4096)
-            if response_data:
-                return json.loads(response_data.decode('utf-8'))
+            future = self.send_request(message)
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.logger.error("Timed out waiting for response to %s", message.get('type', 'message'))
+            future.cancel()
         except Exception as e:
-            self.logger.error(f"Failed to send/receive message: {e}")
+            self.logger.error("Failed to send/receive message: %s", e)
             self.disconnect()
         return None
         
+    def pipeline(self, messages: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        futures = []
+        try:
+            for message in messages:
+                futures.append(self.send_request(message))
+        except Exception as e:
+            self.logger.error("Failed to send pipelined message: %s", e)
+            
+        responses = []
+        for future in futures:
+            try:
+                responses.append(future.result(timeout=self.timeout))
+            except Exception:
+                responses.append(None)
+        return responses + [None] * (len(messages) - len(futures))
+        
+    def read_loop(self):
+        decoder = self.decoder
+        sock = self.socket
+        try:
+            while self.connected:
+                try:
+                    frames = decoder.recv_from(sock)
+                except socket.timeout:
+                    continue
+                if frames is None:
+                    break
+                for frame in frames:
+                    if is_chunk(frame):
+                        self.receive_chunk(frame)
+                    else:
+                        self.dispatch(decode_message(self.decompressor.decompress(frame)))
+        except Exception as e:
+            if self.connected:
+                self.logger.error("Connection lost: %s", e)
+        finally:
+            if self.socket is sock and self.connected:
+                self.disconnect()
+                
+    def receive_chunk(self, frame: bytes):
+        try:
+            transfer_id, offset, data = parse_chunk(frame)
+        except TransferError as e:
+            self.logger.error("Invalid file chunk: %s", e)
+            return
+        download = self.downloads.get(transfer_id)
+        if download is None:
+            self.logger.warning("Discarding chunk for unknown transfer %s", transfer_id)
+            return
+        download.write(offset, data)
+        
+    def answer_keepalive(self):
+        try:
+            with self.send_lock:
+                self.socket.sendall(self.keepalive_reply())
+        except OSError as e:
+            self.logger.error("Failed to answer keepalive: %s", e)
+            
+    def queue_push(self, message: Any):
+        while True:
+            try:
+                self.incoming.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    self.incoming.get_nowait()
+                except queue.Empty:
+                    pass
+                    
+    def receive_push(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        try:
+            return self.incoming.get(timeout=timeout)
+        except queue.Empty:
+            return None
+            
     def authenticate(self, username: str, password: str) -> bool:
-        message = {
-            "type": "auth",
-            "credentials": {
-                "username": username,
-                "password": password
-            }
-        }
+        if self.resume_session(username):
+            return True
+        return self.send_auth({"username": username, "password": password})
         
-        response = self.send_message(message)
-        if response and response.get('type') == 'auth_response':
-            success = response.get('success', False)
-            if success:
-                self.authenticated = True
-                self.username = username
-                self.logger.info("Authentication successful")
-            else:
-                self.logger.error(f"Authentication failed: {response.get('message', 'Unknown error')}")
-            return success
-        return False
+    def resume_session(self, username: Optional[str] = None) -> bool:
+        credentials = self.resume_credentials(username)
+        return credentials is not None and self.send_auth(credentials)
+        
+    def send_auth(self, credentials: Dict[str, str]) -> bool:
+        return self.accept_auth(self.send_message(self.auth_message(credentials)), credentials)
+        
+    def accept_auth(self, response: Optional[Dict[str, Any]], credentials: Dict[str, str]) -> bool:
+        success = super().accept_auth(response, credentials)
+        if success and response.get('compression') and self.compressor is None:
+            self.compressor = Compressor(self.compression_level, self.compression_threshold)
+        return success
         
     def send_broadcast_message(self, content: str) -> bool:
         if not self.authenticated:
@@ -135,9 +314,9 @@ class TCPClient:
         if response and response.get('type') == 'message_response':
             success = response.get('success', False)
             if success:
-                self.logger.info(f"Broadcast sent: {response.get('message', '')}")
+                self.logger.info("Broadcast sent: %s", response.get('message', ''), extra=SAMPLED)
             else:
-                self.logger.error(f"Failed to send broadcast: {response.get('message', '')}")
+                self.logger.error("Failed to send broadcast: %s", response.get('message', ''))
             return success
         return False
         
@@ -156,12 +335,111 @@ class TCPClient:
         if response and response.get('type') == 'message_response':
             success = response.get('success', False)
             if success:
-                self.logger.info(f"Private message sent to {target_username}")
+                self.logger.info("Private message sent to %s", target_username, extra=SAMPLED)
             else:
-                self.logger.error(f"Failed to send private message: {response.get('message', '')}")
+                self.logger.error("Failed to send private message: %s", response.get('message', ''))
             return success
         return False
         
+    def subscribe(self, channel: str) -> bool:
+        return self.send_channel_request({"type": "subscribe", "channel": channel}, 'subscribe_response')
+        
+    def unsubscribe(self, channel: str) -> bool:
+        return self.send_channel_request({"type": "unsubscribe", "channel": channel}, 'unsubscribe_response')
+        
+    def publish(self, channel: str, content: str) -> bool:
+        return self.send_channel_request({"type": "publish", "channel": channel, "content": content}, 'message_response')
+        
+    def send_channel_request(self, message: Dict[str, Any], response_type: str) -> bool:
+        if not self.authenticated:
+            self.logger.error("Authentication required")
+            return False
+            
+        return self.channel_result(message, self.send_message(message), response_type)
+        
+    def check_transfer(self) -> bool:
+        if not self.authenticated:
+            self.logger.error("Authentication required")
+            return False
+        if self.framing.name != "length":
+            self.logger.error("File transfer requires length-prefixed framing")
+            return False
+        return True
+        
+    def upload_file(self, path: str, name: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> bool:
+        # The server reports how much of the file it already holds, and only
+        # the rest is sent. Chunks go out with sendfile and the send lock is
+        # taken per chunk, so other requests can interleave.
+        if not self.check_transfer():
+            return False
+            
+        name = name or os.path.basename(path)
+        transfer_id = next(self.transfer_ids)
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            response = self.send_message({"type": "upload", "transfer": transfer_id, "name": name, "size": size})
+            if not response or not response.get('success'):
+                self.logger.error("Upload of %s refused: %s", name, (response or {}).get('message', 'no response'))
+                return False
+                
+            checksum = format_checksum(file_checksum(file.fileno(), size))
+            offset = response.get('offset', 0)
+            try:
+                while offset < size:
+                    chunk = min(chunk_size, size - offset)
+                    with self.send_lock:
+                        send_chunk(self.socket, file, transfer_id, offset, chunk)
+                    offset += chunk
+            except (OSError, TransferError) as e:
+                self.logger.error("Upload of %s interrupted at offset %s: %s", name, offset, e)
+                self.disconnect()
+                return False
+                
+        response = self.send_message({"type": "upload_complete", "transfer": transfer_id, "checksum": checksum})
+        if response and response.get('success'):
+            self.logger.info("Uploaded %s (%s bytes)", name, size)
+            return True
+        self.logger.error("Upload of %s failed: %s", name, (response or {}).get('message', 'no response'))
+        return False
+        
+    def download_file(self, name: str, path: str, timeout: Optional[float] = None) -> bool:
+        # Data lands in `<path>.part` first; a partial file from an earlier
+        # attempt is resumed from its current length.
+        if not self.check_transfer():
+            return False
+            
+        transfer_id = next(self.transfer_ids)
+        download = IncomingFile(path)
+        self.downloads[transfer_id] = download
+        try:
+            deadline = time.monotonic() + timeout if timeout is not None else None
+            future = self.send_request({"type": "download", "transfer": transfer_id, "name": name,
+                                        "offset": download.offset})
+            response = future.result(timeout=timeout)
+            # The server interleaves the chunks with other frames, so the
+            # response can arrive before the data has.
+            if response and response.get('success'):
+                remaining = max(deadline - time.monotonic(), 0) if deadline is not None else None
+                if not download.wait(response['size'], remaining):
+                    raise TimeoutError(f"Received {download.offset} of {response['size']} bytes")
+        except Exception as e:
+            self.logger.error("Download of %s failed: %s", name, e)
+            self.downloads.pop(transfer_id, None)
+            download.discard()
+            return False
+            
+        self.downloads.pop(transfer_id, None)
+        if not response or not response.get('success'):
+            download.discard()
+            self.logger.error("Download of %s refused: %s", name, (response or {}).get('message', 'no response'))
+            return False
+        error = download.finish(response['size'], response['checksum'])
+        if error:
+            self.logger.error("Download of %s failed: %s", name, error)
+            return False
+        self.logger.info("Downloaded %s (%s bytes)", name, response['size'])
+        return True
+        
     def execute_command(self, command: str) -> Optional[Dict[str, Any]]:
         if not self.authenticated:
             self.logger.error("Authentication required")
@@ -176,18 +454,40 @@ class TCPClient:
         if response and response.get('type') == 'command_response':
             return response.get('data')
         elif response and response.get('type') == 'error':
-            self.logger.error(f"Command error: {response.get('message', '')}")
+            self.logger.error("Command error: %s", response.get('message', ''))
+        return None
+        
+    def send_batch(self, messages: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        response = self.send_message({"type": "batch", "messages": messages})
+        if response and response.get('type') == 'batch_response':
+            if response.get('failed'):
+                self.logger.error("%s of %s batched messages failed", response['failed'], response.get('processed', 0))
+            return response.get('responses', [])
+        elif response and response.get('type') == 'error':
+            self.logger.error("Batch error: %s", response.get('message', ''))
         return None
         
     def ping_server(self) -> bool:
         message = {"type": "ping"}
         response = self.send_message(message)
         if response and response.get('type') == 'pong':
-            self.logger.info("Server ping successful")
+            self.logger.info("Server ping successful", extra=SAMPLED)
             return True
         return False
         
+    def print_push(self, message: Dict[str, Any]):
+        if message.get('type') in PUSH_TYPES:
+            if message['type'] == 'channel_message':
+                label = f"#{message.get('channel', '?')}"
+            else:
+                label = "private" if message['type'] == 'private_message' else "broadcast"
+            print(f"\n[{label}] {message.get('sender', '?')}: {message.get('content', '')}")
+        else:
+            print(f"\n{message}")
+            
     def start_interactive_mode(self):
+        if self.on_message is None:
+            self.on_message = self.print_push
         if not self.connect():
             return
             
@@ -196,8 +496,15 @@ class TCPClient:
         print("  auth <username> <password> - Authenticate with server")
         print("  broadcast <message> - Send broadcast message")
         print("  private <username> <message> - Send private message")
+        print("  subscribe <channel> - Subscribe to a channel")
+        print("  unsubscribe <channel> - Unsubscribe from a channel")
+        print("  publish <channel> <message> - Publish to a channel")
+        print("  channels - List channels and subscriber counts")
+        print("  upload <path> [name] - Upload a file")
+        print("  download <name> <path> - Download a file")
         print("  list - List connected clients")
         print("  info - Get server information")
+        print("  metrics - Show server metrics")
         print("  ping - Ping server")
         print("  quit - Disconnect and exit")
         print()
@@ -224,6 +531,24 @@ class TCPClient:
                     target = parts[1]
                     content = ' '.join(parts[2:])
                     self.send_private_message(target, content)
+                elif cmd == 'subscribe' and len(parts) >= 2:
+                    self.subscribe(parts[1])
+                elif cmd == 'unsubscribe' and len(parts) >= 2:
+                    self.unsubscribe(parts[1])
+                elif cmd == 'publish' and len(parts) >= 3:
+                    self.publish(parts[1], ' '.join(parts[2:]))
+                elif cmd == 'upload' and len(parts) >= 2:
+                    self.upload_file(parts[1], parts[2] if len(parts) >= 3 else None)
+                elif cmd == 'download' and len(parts) >= 3:
+                    self.download_file(parts[1], parts[2])
+                elif cmd == 'channels':
+                    data = self.execute_command('list_channels')
+                    if data is not None:
+                        print(f"Channels ({len(data)}):")
+                        for channel, subscribers in sorted(data.items()):
+                            print(f"  {channel} - {subscribers} subscribers")
+                    else:
+                        print("Failed to get channel list")
                 elif cmd == 'list':
                     data = self.execute_command('list_clients')
                     if data:
@@ -241,6 +566,12 @@ class TCPClient:
                         print(f"  Uptime: {data['uptime']:.2f} seconds")
                     else:
                         print("Failed to get server information")
+                elif cmd == 'metrics':
+                    data = self.execute_command('metrics')
+                    if data:
+                        print(json.dumps(data, indent=2))
+                    else:
+                        print("Failed to get server metrics")
                 elif cmd == 'ping':
                     self.ping_server()
                 else:
@@ -249,29 +580,31 @@ class TCPClient:
             except KeyboardInterrupt:
                 break
             except Exception as e:
-                self.logger.error(f"Error in interactive mode: {e}")
+                self.logger.error("Error in interactive mode: %s", e)
                 break
                 
         self.disconnect()
 
 def main():
     import argparse
+    from config.settings import ConfigManager
     
     parser = argparse.ArgumentParser(description='TCP Client')
-    parser.add_argument('--host', default='127.0.0.1', help='Server host')
-    parser.add_argument('--port', type=int, default=8080, help='Server port')
-    parser.add_argument('--ssl', action='store_true', help='Enable SSL')
+    parser.add_argument('--config', default='config/config.json', help='Configuration file')
+    parser.add_argument('--host', help='Server host')
+    parser.add_argument('--port', type=int, help='Server port')
+    parser.add_argument('--ssl', action='store_true', default=None, help='Enable SSL')
     parser.add_argument('--no-verify', action='store_true', help='Disable SSL verification')
-    parser.add_argument('--timeout', type=int, default=30, help='Connection timeout')
+    parser.add_argument('--timeout', type=int, help='Connection timeout')
     
     args = parser.parse_args()
     
-    client = TCPClient(
-        host=args.host,
-        port=args.port,
-        enable_ssl=args.ssl,
-        verify_ssl=not args.no_verify,
-        timeout=args.timeout
+    overrides = {"host": args.host, "port": args.port, "enable_ssl": args.ssl, "timeout": args.timeout}
+    if args.no_verify:
+        overrides["verify_ssl"] = False
+    client = TCPClient.from_config(
+        ConfigManager(args.config).get_client_config(),
+        **{key: value for key, value in overrides.items() if value is not None}
     )
     
     try:
@@ -0,0 +1,276 @@
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from framing import FRAMINGS, FrameDecoder
+
+BUS_FRAMING = FRAMINGS["length"]
+
+def encode_event(event: dict) -> bytes:
+    return BUS_FRAMING.encode(json.dumps(event).encode('utf-8'))
+
+class ClusterHub:
+    # Relays events between workers. When offline delivery is enabled the hub
+    # also owns the cluster's message log: workers queue, replay and ack
+    # through it, so a backlog queued on one worker is served by whichever
+    # worker the user reconnects to.
+    OFFLINE_OPS = ('offline', 'replay', 'offline_ack', 'offline_requeue')
+    
+    def __init__(self, path: str, message_log: Optional[Any] = None):
+        self.path = path
+        self.message_log = message_log
+        self.server_socket: Optional[socket.socket] = None
+        self.running = False
+        self.lock = threading.Lock()
+        self.workers: Dict[socket.socket, Optional[str]] = {}
+        self.members: Dict[str, dict] = {}
+        self.logger = logging.getLogger(__name__)
+        
+    def start(self):
+        self.server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server_socket.bind(self.path)
+        self.server_socket.listen()
+        self.running = True
+        
+    def serve(self):
+        threading.Thread(target=self.accept_workers, name="cluster-hub", daemon=True).start()
+        
+    def accept_workers(self):
+        while self.running:
+            try:
+                worker_socket, _ = self.server_socket.accept()
+            except OSError:
+                break
+                
+            with self.lock:
+                self.workers[worker_socket] = None
+                for member in self.members.values():
+                    worker_socket.sendall(encode_event(member))
+            threading.Thread(target=self.relay, args=(worker_socket,), daemon=True).start()
+            
+    def relay(self, worker_socket: socket.socket):
+        decoder = FrameDecoder(BUS_FRAMING)
+        try:
+            while self.running:
+                frames = decoder.recv_from(worker_socket)
+                if frames is None:
+                    break
+                for frame in frames:
+                    self.handle_event(worker_socket, json.loads(frame), frame)
+        except OSError:
+            pass
+        finally:
+            self.remove_worker(worker_socket)
+            
+    def handle_event(self, worker_socket: socket.socket, event: dict, frame: bytes):
+        op = event.get('op')
+        if op in self.OFFLINE_OPS:
+            self.handle_offline(worker_socket, event)
+            return
+        with self.lock:
+            if op == 'hello':
+                self.workers[worker_socket] = event['worker']
+                return
+            if op == 'join':
+                self.members[event['client']['id']] = event
+            elif op == 'leave':
+                self.members.pop(event['client_id'], None)
+            self.publish(BUS_FRAMING.encode(frame), exclude=worker_socket)
+            
+    def handle_offline(self, worker_socket: socket.socket, event: dict):
+        # Log I/O stays outside the hub lock so relaying is not held up by it.
+        if self.message_log is None:
+            return
+        op = event['op']
+        try:
+            if op == 'offline':
+                # The committer fsyncs within its flush interval; waiting here
+                # would stall every other event from this worker.
+                self.message_log.append(event['target'], event['message'], sync=False)
+            elif op == 'replay':
+                self.replay(worker_socket, event['user'], event['client_id'])
+            elif op == 'offline_ack':
+                self.message_log.ack(event['user'], event['offsets'])
+            elif op == 'offline_requeue':
+                self.message_log.requeue(event['user'], event['offsets'])
+        except (OSError, ValueError) as e:
+            self.logger.error("Message log %s for %s failed: %s", op, event.get('user', event.get('target')), e)
+            
+    def replay(self, worker_socket: socket.socket, username: str, client_id: str):
+        offsets = self.message_log.claim(username)
+        messages = []
+        for offset in offsets:
+            message = self.message_log.read(offset)
+            if message is not None:
+                messages.append([offset, message])
+        if not messages:
+            return
+        event = {"op": "offline_replay", "user": username, "client_id": client_id, "messages": messages}
+        with self.lock:
+            try:
+                worker_socket.sendall(encode_event(event))
+            except OSError:
+                self.message_log.requeue(username, offsets)
+                
+    def publish(self, data: bytes, exclude: Optional[socket.socket] = None):
+        for worker_socket in list(self.workers):
+            if worker_socket is exclude:
+                continue
+            try:
+                worker_socket.sendall(data)
+            except OSError:
+                self.workers.pop(worker_socket, None)
+                
+    def remove_worker(self, worker_socket: socket.socket):
+        with self.lock:
+            worker = self.workers.pop(worker_socket, None)
+            for client_id, member in list(self.members.items()):
+                if member['worker'] == worker:
+                    del self.members[client_id]
+                    self.publish(encode_event({"op": "leave", "worker": worker, "client_id": client_id}))
+        worker_socket.close()
+        
+    def stop(self):
+        self.running = False
+        if self.server_socket:
+            try:
+                self.server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.server_socket.close()
+        with self.lock:
+            for worker_socket in list(self.workers):
+                try:
+                    worker_socket.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                worker_socket.close()
+            self.workers.clear()
+        if self.message_log is not None:
+            self.message_log.close()
+
+class ClusterBus:
+    def __init__(self, path: str, worker: str):
+        self.path = path
+        self.worker = worker
+        self.socket: Optional[socket.socket] = None
+        self.send_lock = threading.Lock()
+        self.state_lock = threading.Lock()
+        self.members: Dict[str, dict] = {}
+        self.sessions_by_username: Dict[str, int] = {}
+        self.handler: Optional[Callable[[dict], None]] = None
+        self.logger = logging.getLogger(__name__)
+        
+    def connect(self, handler: Callable[[dict], None]):
+        self.handler = handler
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(self.path)
+        self.publish({"op": "hello", "worker": self.worker})
+        threading.Thread(target=self.receive, name="cluster-bus", daemon=True).start()
+        
+    def publish(self, event: dict):
+        event.setdefault("worker", self.worker)
+        data = encode_event(event)
+        with self.send_lock:
+            self.socket.sendall(data)
+            
+    def receive(self):
+        decoder = FrameDecoder(BUS_FRAMING)
+        try:
+            while True:
+                frames = decoder.recv_from(self.socket)
+                if frames is None:
+                    break
+                for frame in frames:
+                    event = json.loads(frame)
+                    self.update_membership(event)
+                    self.handler(event)
+        except OSError:
+            pass
+        except Exception as e:
+            self.logger.error("Cluster bus error: %s", e)
+            
+    def update_membership(self, event: dict):
+        op = event.get('op')
+        with self.state_lock:
+            if op == 'join':
+                member = event['client']
+                self.members[member['id']] = member
+                self.sessions_by_username[member['username']] = self.sessions_by_username.get(member['username'], 0) + 1
+            elif op == 'leave':
+                member = self.members.pop(event['client_id'], None)
+                if member is not None:
+                    remaining = self.sessions_by_username.get(member['username'], 0) - 1
+                    if remaining > 0:
+                        self.sessions_by_username[member['username']] = remaining
+                    else:
+                        self.sessions_by_username.pop(member['username'], None)
+                        
+    def remote_sessions(self, username: str) -> int:
+        return self.sessions_by_username.get(username, 0)
+        
+    def remote_members(self) -> List[dict]:
+        with self.state_lock:
+            return list(self.members.values())
+            
+    def remote_count(self) -> int:
+        return len(self.members)
+        
+    def close(self):
+        if self.socket:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+                self.socket.close()
+            except OSError:
+                pass
+
+def run_worker(server_factory: Callable[..., Any], server_kwargs: dict, bus_path: str, worker: str):
+    server = server_factory(**server_kwargs)
+    server.join_cluster(ClusterBus(bus_path, worker))
+    server.start()
+
+def run_cluster(server_factory: Callable[..., Any], server_kwargs: dict, workers: int,
+                message_log_factory: Optional[Callable[[], Any]] = None):
+    bus_dir = tempfile.mkdtemp(prefix="tcp-cluster-")
+    bus_path = os.path.join(bus_dir, "bus.sock")
+    hub = ClusterHub(bus_path)
+    hub.start()
+    
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(
+            target=run_worker,
+            args=(server_factory, server_kwargs, bus_path, f"worker-{index}"),
+            name=f"worker-{index}"
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    if message_log_factory:
+        # Opened after the fork so the workers do not inherit the segments
+        # or the committer thread.
+        hub.message_log = message_log_factory()
+    hub.serve()
+    
+    def terminate(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+                
+    signal.signal(signal.SIGINT, terminate)
+    signal.signal(signal.SIGTERM, terminate)
+    
+    try:
+        for process in processes:
+            process.join()
+    finally:
+        hub.stop()
+        shutil.rmtree(bus_dir, ignore_errors=True)
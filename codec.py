@@ -0,0 +1,251 @@
+import json
+import struct
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class CodecError(ValueError):
+    pass
+
+class JsonCodec:
+    name = "json"
+    label = "JSON"
+
+    def __init__(self):
+        self.backend = "orjson" if orjson else "json"
+
+    def encode(self, message: Any) -> bytes:
+        if orjson:
+            try:
+                return orjson.dumps(message)
+            except TypeError:
+                pass
+        return json.dumps(message, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, data: bytes) -> Any:
+        try:
+            if orjson:
+                return orjson.loads(data)
+            return json.loads(data)
+        except (ValueError, UnicodeDecodeError, RecursionError) as e:
+            raise CodecError(str(e))
+
+UINT8 = struct.Struct('>B')
+UINT16 = struct.Struct('>H')
+UINT32 = struct.Struct('>I')
+UINT64 = struct.Struct('>Q')
+INT8 = struct.Struct('>b')
+INT16 = struct.Struct('>h')
+INT32 = struct.Struct('>i')
+INT64 = struct.Struct('>q')
+FLOAT64 = struct.Struct('>d')
+# Containers nested deeper than this are rejected before the decoder can
+# exhaust the interpreter's recursion limit.
+MAX_DEPTH = 64
+
+class BinaryCodec:
+    # Compact MessagePack-compatible encoding of the JSON data model plus bytes.
+    name = "binary"
+    label = "binary"
+
+    def encode(self, message: Any) -> bytes:
+        out = bytearray()
+        self.pack(message, out)
+        return bytes(out)
+
+    def pack(self, value: Any, out: bytearray):
+        if value is None:
+            out.append(0xc0)
+        elif value is True:
+            out.append(0xc3)
+        elif value is False:
+            out.append(0xc2)
+        elif isinstance(value, int):
+            self.pack_int(value, out)
+        elif isinstance(value, float):
+            out.append(0xcb)
+            out += FLOAT64.pack(value)
+        elif isinstance(value, str):
+            data = value.encode('utf-8')
+            self.pack_header(len(data), out, 0xa0, 32, 0xd9, 0xda, 0xdb)
+            out += data
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            data = bytes(value)
+            self.pack_header(len(data), out, None, 0, 0xc4, 0xc5, 0xc6)
+            out += data
+        elif isinstance(value, (list, tuple)):
+            self.pack_header(len(value), out, 0x90, 16, None, 0xdc, 0xdd)
+            for item in value:
+                self.pack(item, out)
+        elif isinstance(value, dict):
+            self.pack_header(len(value), out, 0x80, 16, None, 0xde, 0xdf)
+            for key, item in value.items():
+                self.pack(key, out)
+                self.pack(item, out)
+        else:
+            raise CodecError(f"Cannot encode {type(value).__name__}")
+
+    def pack_int(self, value: int, out: bytearray):
+        if 0 <= value <= 0x7f:
+            out.append(value)
+        elif -32 <= value < 0:
+            out.append(value & 0xff)
+        elif value > 0:
+            for marker, packer in ((0xcc, UINT8), (0xcd, UINT16), (0xce, UINT32), (0xcf, UINT64)):
+                if value < 1 << (packer.size * 8):
+                    out.append(marker)
+                    out += packer.pack(value)
+                    return
+            raise CodecError(f"Integer {value} is too large")
+        else:
+            for marker, packer in ((0xd0, INT8), (0xd1, INT16), (0xd2, INT32), (0xd3, INT64)):
+                if value >= -(1 << (packer.size * 8 - 1)):
+                    out.append(marker)
+                    out += packer.pack(value)
+                    return
+            raise CodecError(f"Integer {value} is too small")
+
+    def pack_header(self, length: int, out: bytearray, fix_marker: Optional[int], fix_limit: int,
+                    marker8: Optional[int], marker16: int, marker32: int):
+        if fix_marker is not None and length < fix_limit:
+            out.append(fix_marker | length)
+        elif marker8 is not None and length < 1 << 8:
+            out.append(marker8)
+            out += UINT8.pack(length)
+        elif length < 1 << 16:
+            out.append(marker16)
+            out += UINT16.pack(length)
+        elif length < 1 << 32:
+            out.append(marker32)
+            out += UINT32.pack(length)
+        else:
+            raise CodecError("Value is too large to encode")
+
+    def decode(self, data: bytes) -> Any:
+        view = memoryview(data)
+        try:
+            value, offset = self.unpack(view, 0, 0)
+        except (IndexError, struct.error, UnicodeDecodeError, TypeError, RecursionError) as e:
+            raise CodecError(f"Truncated or invalid binary message: {e}")
+        if offset != len(view):
+            raise CodecError("Trailing bytes after binary message")
+        return value
+
+    def unpack(self, view: memoryview, offset: int, depth: int):
+        marker = view[offset]
+        offset += 1
+
+        if marker <= 0x7f:
+            return marker, offset
+        if marker >= 0xe0:
+            return marker - 0x100, offset
+        if 0xa0 <= marker <= 0xbf:
+            return self.unpack_str(view, offset, marker & 0x1f)
+        if 0x90 <= marker <= 0x9f:
+            return self.unpack_array(view, offset, marker & 0x0f, depth + 1)
+        if 0x80 <= marker <= 0x8f:
+            return self.unpack_map(view, offset, marker & 0x0f, depth + 1)
+
+        if marker == 0xc0:
+            return None, offset
+        if marker == 0xc2:
+            return False, offset
+        if marker == 0xc3:
+            return True, offset
+        if marker == 0xcb:
+            return FLOAT64.unpack_from(view, offset)[0], offset + 8
+
+        packer = SCALARS.get(marker)
+        if packer is not None:
+            return packer.unpack_from(view, offset)[0], offset + packer.size
+
+        length_packer, kind = CONTAINERS.get(marker, (None, None))
+        if length_packer is None:
+            raise CodecError(f"Unknown binary marker 0x{marker:02x}")
+        length = length_packer.unpack_from(view, offset)[0]
+        offset += length_packer.size
+        if kind == "str":
+            return self.unpack_str(view, offset, length)
+        if kind == "bin":
+            end = offset + length
+            if end > len(view):
+                raise CodecError("Truncated binary payload")
+            return bytes(view[offset:end]), end
+        if kind == "array":
+            return self.unpack_array(view, offset, length, depth + 1)
+        return self.unpack_map(view, offset, length, depth + 1)
+
+    def unpack_str(self, view: memoryview, offset: int, length: int):
+        end = offset + length
+        if end > len(view):
+            raise CodecError("Truncated string")
+        return str(view[offset:end], 'utf-8'), end
+
+    def unpack_array(self, view: memoryview, offset: int, length: int, depth: int):
+        if depth > MAX_DEPTH:
+            raise CodecError(f"Binary message is nested deeper than {MAX_DEPTH} levels")
+        items = []
+        for _ in range(length):
+            item, offset = self.unpack(view, offset, depth)
+            items.append(item)
+        return items, offset
+
+    def unpack_map(self, view: memoryview, offset: int, length: int, depth: int):
+        if depth > MAX_DEPTH:
+            raise CodecError(f"Binary message is nested deeper than {MAX_DEPTH} levels")
+        result = {}
+        for _ in range(length):
+            key, offset = self.unpack(view, offset, depth)
+            value, offset = self.unpack(view, offset, depth)
+            try:
+                result[key] = value
+            except TypeError:
+                raise CodecError(f"Binary map key cannot be a {type(key).__name__}")
+        return result, offset
+
+SCALARS = {
+    0xcc: UINT8, 0xcd: UINT16, 0xce: UINT32, 0xcf: UINT64,
+    0xd0: INT8, 0xd1: INT16, 0xd2: INT32, 0xd3: INT64
+}
+
+CONTAINERS = {
+    0xd9: (UINT8, "str"), 0xda: (UINT16, "str"), 0xdb: (UINT32, "str"),
+    0xc4: (UINT8, "bin"), 0xc5: (UINT16, "bin"), 0xc6: (UINT32, "bin"),
+    0xdc: (UINT16, "array"), 0xdd: (UINT32, "array"),
+    0xde: (UINT16, "map"), 0xdf: (UINT32, "map")
+}
+
+JSON_CODEC = JsonCodec()
+BINARY_CODEC = BinaryCodec()
+
+CODECS: Dict[str, Any] = {
+    JSON_CODEC.name: JSON_CODEC,
+    BINARY_CODEC.name: BINARY_CODEC
+}
+
+def get_codec(name: str):
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec: {name}")
+    return CODECS[name]
+
+def negotiate_codec(offered: Optional[List[str]], binary_safe: bool = True):
+    for name in offered or []:
+        codec = CODECS.get(name)
+        if codec is None:
+            continue
+        if codec is BINARY_CODEC and not binary_safe:
+            continue
+        return codec
+    return JSON_CODEC
+
+def detect_codec(data: bytes):
+    # Binary messages are always maps, so their first byte never looks like JSON text.
+    if data and (0x80 <= data[0] <= 0x8f or data[0] in (0xde, 0xdf)):
+        return BINARY_CODEC
+    return JSON_CODEC
+
+def decode_message(data: bytes) -> Any:
+    return detect_codec(data).decode(data)
@@ -0,0 +1,100 @@
+import threading
+import zlib
+from typing import List, Optional
+
+ZLIB = "zlib"
+COMPRESSIONS = (ZLIB,)
+
+# A compressed payload starts with one of these markers. JSON text and binary
+# codec maps never start with them, so raw and compressed frames can be mixed
+# on one connection and told apart without any extra header.
+STREAM_MARKER = 0x01
+STANDALONE_MARKER = 0x02
+COMPRESSED_MARKERS = (STREAM_MARKER, STANDALONE_MARKER)
+
+# Z_SYNC_FLUSH always ends with this empty block; it is stripped on the wire
+# and restored before inflating.
+SYNC_TAIL = b"\x00\x00\xff\xff"
+WINDOW_BITS = -15
+
+# Preset dictionary built from the frames the server actually sends (the
+# response and push templates in server.py, as the JSON codec encodes them),
+# so even the first frame on a connection, or a stateless fan-out frame,
+# compresses well. Deflate references nearby bytes more cheaply, so the most
+# frequent frames come last.
+SHARED_DICTIONARY = (
+    b'{"type":"error","message":"Authentication required"}'
+    b'{"type":"command_response","command":"'
+    b'{"type":"subscribe_response","success":true,"channel":"","subscribers":'
+    b'{"type":"auth_response","success":true,"message":"Authentication successful","username":"'
+    b'","session_token":"'
+    b'{"type":"keepalive","timestamp":'
+    b'{"type":"pong","timestamp":'
+    b'{"type":"message_response","success":true,"message":"Private message sent to '
+    b'{"type":"message_response","success":true,"message":"Broadcast sent to '
+    b' clients","id":'
+    b'{"type":"channel_message","channel":"'
+    b'{"type":"private_message","sender":"'
+    b'{"type":"broadcast","sender":"","content":"","timestamp":'
+)
+
+class CompressionError(ValueError):
+    pass
+
+def negotiate_compression(offered: Optional[List[str]], binary_safe: bool = True) -> Optional[str]:
+    # Compressed payloads are arbitrary bytes, so they need length-prefixed framing.
+    if not binary_safe:
+        return None
+    for name in offered or []:
+        if name in COMPRESSIONS:
+            return name
+    return None
+
+def is_compressed(data: bytes) -> bool:
+    return bool(data) and data[0] in COMPRESSED_MARKERS
+
+def compress_standalone(payload: bytes, level: int = 6) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WINDOW_BITS, zdict=SHARED_DICTIONARY)
+    return bytes((STANDALONE_MARKER,)) + compressor.compress(payload) + compressor.flush()
+
+class Compressor:
+    # Streaming frames share one deflate context per connection and compress
+    # best, but the peer must inflate them in exactly the order they were
+    # compressed: callers hold `lock` across compressing and queueing a frame.
+    def __init__(self, level: int = 6, threshold: int = 256, streaming: bool = True):
+        self.level = level
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.stream = zlib.compressobj(level, zlib.DEFLATED, WINDOW_BITS, zdict=SHARED_DICTIONARY) \
+            if streaming else None
+
+    def compress(self, payload: bytes) -> bytes:
+        if len(payload) < self.threshold:
+            return payload
+        if self.stream is None:
+            return compress_standalone(payload, self.level)
+        data = self.stream.compress(payload) + self.stream.flush(zlib.Z_SYNC_FLUSH)
+        return bytes((STREAM_MARKER,)) + data[:-len(SYNC_TAIL)]
+
+class Decompressor:
+    def __init__(self, max_size: int = 16 * 1024 * 1024):
+        self.max_size = max_size
+        self.stream = None
+
+    def decompress(self, data: bytes) -> bytes:
+        if not is_compressed(data):
+            return data
+        try:
+            if data[0] == STANDALONE_MARKER:
+                inflater = zlib.decompressobj(WINDOW_BITS, zdict=SHARED_DICTIONARY)
+                payload = inflater.decompress(memoryview(data)[1:], self.max_size)
+            else:
+                if self.stream is None:
+                    self.stream = zlib.decompressobj(WINDOW_BITS, zdict=SHARED_DICTIONARY)
+                inflater = self.stream
+                payload = inflater.decompress(bytes(memoryview(data)[1:]) + SYNC_TAIL, self.max_size)
+        except zlib.error as e:
+            raise CompressionError(str(e))
+        if inflater.unconsumed_tail:
+            raise CompressionError(f"Decompressed frame exceeds {self.max_size} bytes")
+        return payload
@@ -1,6 +1,6 @@
 import os
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, asdict
 
 @dataclass
@@ -13,8 +13,56 @@ class ServerConfig:
     key_file: Optional[str] = None
     log_level: str = "INFO"
     log_file: str = "logs/server.log"
-    timeout: int = 30
+    # Seconds a client may stay silent before the idle reaper disconnects it;
+    # None disables eviction.
+    timeout: Optional[float] = 300.0
     buffer_size: int = 4096
+    outbound_high_watermark: int = 1024 * 1024
+    outbound_low_watermark: int = 256 * 1024
+    slow_consumer_policy: str = "disconnect"
+    worker_threads: int = 8
+    workers: int = 1
+    framing: str = "auto"
+    max_frame_size: int = 16 * 1024 * 1024
+    max_batch_size: int = 1000
+    ping_interval: Optional[float] = None
+    tcp_keepalive_idle: Optional[int] = 60
+    tcp_nodelay: bool = True
+    socket_recv_buffer: Optional[int] = None
+    socket_send_buffer: Optional[int] = None
+    backlog: Optional[int] = None
+    client_rate_limit: Optional[float] = None
+    client_rate_burst: int = 20
+    user_rate_limit: Optional[float] = None
+    user_rate_burst: int = 50
+    type_rate_limits: Optional[Dict[str, List[float]]] = None
+    rate_limit_action: str = "reject"
+    rate_limit_max_delay: float = 1.0
+    user_store: str = "memory"
+    # Created at startup if missing; the memory store needs it to let anyone in.
+    admin_username: str = "admin"
+    admin_password: Optional[str] = None
+    auth_workers: int = 4
+    session_ttl: float = 3600.0
+    session_cache_size: int = 10000
+    handshake_timeout: float = 10.0
+    metrics_host: str = "127.0.0.1"
+    metrics_port: Optional[int] = None
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_backup_count: int = 5
+    log_sample_every: int = 100
+    enable_compression: bool = True
+    compression_level: int = 6
+    compression_threshold: int = 256
+    max_subscriptions: int = 100
+    message_log_dir: Optional[str] = None
+    message_log_segment_bytes: int = 64 * 1024 * 1024
+    message_log_flush_interval: float = 0.005
+    message_log_retention_seconds: Optional[float] = 7 * 24 * 3600
+    message_log_retention_bytes: Optional[int] = None
+    transfer_dir: Optional[str] = None
+    transfer_chunk_size: int = 1024 * 1024
+    max_transfer_size: int = 1024 * 1024 * 1024
 
 @dataclass
 class ClientConfig:
@@ -26,6 +74,16 @@ class ClientConfig:
     log_level: str = "INFO"
     log_file: str = "logs/client.log"
     buffer_size: int = 4096
+    framing: str = "length"
+    codec: str = "json"
+    max_in_flight: int = 1024
+    incoming_queue_size: int = 1000
+    tcp_nodelay: bool = True
+    socket_recv_buffer: Optional[int] = None
+    socket_send_buffer: Optional[int] = None
+    compression: Optional[str] = None
+    compression_level: int = 6
+    compression_threshold: int = 256
 
 class ConfigManager:
     def __init__(self, config_file: str = "config/config.json"):
@@ -84,4 +142,17 @@ class ConfigManager:
                 setattr(self.client_config, key, value)
         self.save_config()
 
-config_manager = ConfigManager() 
\ No newline at end of file
+_config_manager: Optional[ConfigManager] = None
+
+def get_config_manager() -> ConfigManager:
+    global _config_manager
+    if _config_manager is None:
+        _config_manager = ConfigManager()
+    return _config_manager
+
+def __getattr__(name: str):
+    # Keeps `from config.settings import config_manager` working while deferring
+    # the config file read until the manager is first used.
+    if name == "config_manager":
+        return get_config_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}") 
\ No newline at end of file
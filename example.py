@@ -5,7 +5,7 @@ from server import TCPServer
 from client import TCPClient
 
 def run_server():
-    server = TCPServer(host="127.0.0.1", port=8083, max_clients=5)
+    server = TCPServer(host="127.0.0.1", port=8083, max_clients=5, admin_password="admin123")
     server.start()
 
 def run_client():
@@ -0,0 +1,161 @@
+import json
+import socket
+import struct
+from typing import Dict, List, Optional
+
+LENGTH_PREFIX = struct.Struct('!I')
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+class FramingError(Exception):
+    pass
+
+class LengthPrefixFraming:
+    name = "length"
+    
+    def encode(self, payload: bytes) -> bytes:
+        return LENGTH_PREFIX.pack(len(payload)) + payload
+        
+    def next_frame(self, decoder: 'FrameDecoder') -> Optional[bytes]:
+        start = decoder.start
+        available = decoder.end - start
+        if available < LENGTH_PREFIX.size:
+            return None
+            
+        length = LENGTH_PREFIX.unpack_from(decoder.buffer, start)[0]
+        if length > decoder.max_frame_size:
+            raise FramingError(f"Frame of {length} bytes exceeds limit of {decoder.max_frame_size}")
+            
+        frame_end = start + LENGTH_PREFIX.size + length
+        if frame_end > decoder.end:
+            decoder.reserve(LENGTH_PREFIX.size + length)
+            return None
+            
+        frame = bytes(decoder.buffer[start + LENGTH_PREFIX.size:frame_end])
+        decoder.start = frame_end
+        return frame
+
+class NewlineFraming:
+    name = "newline"
+    
+    def __init__(self, allow_unterminated: bool = True):
+        self.allow_unterminated = allow_unterminated
+        
+    def encode(self, payload: bytes) -> bytes:
+        return payload + b'\n'
+        
+    def next_frame(self, decoder: 'FrameDecoder') -> Optional[bytes]:
+        while decoder.start < decoder.end:
+            index = decoder.buffer.find(b'\n', max(decoder.scan, decoder.start), decoder.end)
+            if index < 0:
+                decoder.scan = decoder.end
+                if decoder.end - decoder.start > decoder.max_frame_size:
+                    raise FramingError(f"Line exceeds limit of {decoder.max_frame_size} bytes")
+                return self.unterminated_frame(decoder)
+                
+            frame = bytes(decoder.buffer[decoder.start:index]).rstrip(b'\r')
+            decoder.start = decoder.scan = index + 1
+            if frame.strip():
+                return frame
+        return None
+        
+    def unterminated_frame(self, decoder: 'FrameDecoder') -> Optional[bytes]:
+        # Legacy peers send one bare JSON object per write without a terminator.
+        if not self.allow_unterminated:
+            return None
+            
+        frame = bytes(decoder.buffer[decoder.start:decoder.end]).strip()
+        if not (frame.startswith(b'{') and frame.endswith(b'}')):
+            return None
+            
+        try:
+            json.loads(frame)
+        except ValueError:
+            return None
+            
+        decoder.start = decoder.scan = decoder.end
+        return frame
+
+FRAMINGS: Dict[str, object] = {
+    LengthPrefixFraming.name: LengthPrefixFraming(),
+    NewlineFraming.name: NewlineFraming()
+}
+
+def get_framing(name: str):
+    if name == "auto":
+        return None
+    if name not in FRAMINGS:
+        raise ValueError(f"Unknown framing: {name}")
+    return FRAMINGS[name]
+
+def detect_framing(first_byte: int):
+    # A length prefix for any frame under 16 MB starts with a zero byte,
+    # while newline-delimited JSON starts with printable text.
+    if first_byte == 0:
+        return FRAMINGS[LengthPrefixFraming.name]
+    return FRAMINGS[NewlineFraming.name]
+
+class FrameDecoder:
+    def __init__(self, framing=None, buffer_size: int = 4096, max_frame_size: int = MAX_FRAME_SIZE):
+        self.framing = framing
+        self.buffer_size = buffer_size
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray(buffer_size)
+        self.start = 0
+        self.end = 0
+        self.scan = 0
+        self.received = 0
+        
+    def reserve(self, size: int):
+        if self.start + size <= len(self.buffer):
+            return
+            
+        pending = self.end - self.start
+        if self.start:
+            self.buffer[:pending] = self.buffer[self.start:self.end]
+            self.scan -= self.start
+            self.start = 0
+            self.end = pending
+            
+        if size > len(self.buffer):
+            self.buffer.extend(bytes(max(size, len(self.buffer) * 2) - len(self.buffer)))
+            
+    def writable(self) -> memoryview:
+        if self.end == len(self.buffer):
+            self.reserve(self.end - self.start + self.buffer_size)
+        return memoryview(self.buffer)[self.end:]
+        
+    def commit(self, size: int) -> List[bytes]:
+        self.end += size
+        self.received += size
+        return self.drain()
+        
+    def feed(self, data: bytes) -> List[bytes]:
+        self.reserve(self.end - self.start + len(data))
+        self.buffer[self.end:self.end + len(data)] = data
+        return self.commit(len(data))
+        
+    def recv_from(self, sock: socket.socket) -> Optional[List[bytes]]:
+        with self.writable() as view:
+            size = sock.recv_into(view)
+        if not size:
+            return None
+        return self.commit(size)
+        
+    def drain(self) -> List[bytes]:
+        if self.framing is None and self.end > self.start:
+            self.framing = detect_framing(self.buffer[self.start])
+            
+        frames = []
+        while self.framing is not None:
+            frame = self.framing.next_frame(self)
+            if frame is None:
+                break
+            frames.append(frame)
+            
+        if self.start == self.end:
+            self.start = self.end = self.scan = 0
+        return frames
+        
+    @property
+    def pending(self) -> int:
+        return self.end - self.start
\ No newline at end of file
@@ -0,0 +1,155 @@
+import atexit
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from typing import Dict, Iterator, List, Optional
+
+# Pass as `extra=SAMPLED` on per-message events; only one in `sample_every`
+# of each such message template is kept.
+SAMPLED = {"sampled": True}
+
+class SampleFilter(logging.Filter):
+    def __init__(self, every: int = 1):
+        super().__init__()
+        self.every = every
+        self.counters: Dict[str, Iterator[int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every <= 1 or not getattr(record, "sampled", False):
+            return True
+        # Records are still unformatted here, so msg is the template and every
+        # event of one kind shares a counter.
+        counter = self.counters.get(record.msg)
+        if counter is None:
+            counter = self.counters.setdefault(record.msg, itertools.count())
+        return next(counter) % self.every == 0
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The stock QueueHandler formats each record before queueing it; here the
+    # record is queued as is and formatted on the writer thread. When the queue
+    # is full the record is dropped rather than blocking the caller.
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class BatchFlushMixin:
+    # StreamHandler flushes after every record; these handlers flush once per batch.
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+class BatchedRotatingFileHandler(BatchFlushMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+class BatchedStreamHandler(BatchFlushMixin, logging.StreamHandler):
+    pass
+
+class LogPipeline:
+    def __init__(self, handlers: List[logging.Handler], queue_size: int = 10000, batch_size: int = 256,
+                 sample_every: int = 1):
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.handler = DeferredQueueHandler(self.queue)
+        self.handler.addFilter(SampleFilter(sample_every))
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            record = self.queue.get()
+            if record is None:
+                break
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            self.write(batch)
+
+    def write(self, batch: List[logging.LogRecord]):
+        for record in batch:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+        for handler in self.handlers:
+            try:
+                handler.flush_batch()
+            except Exception:
+                handler.handleError(batch[-1])
+
+    def restart_after_fork(self):
+        # Only the forking thread survives in the child, so the writer thread
+        # and the queue it may have been holding a lock on are replaced.
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self.handler.queue = self.queue
+        self.start()
+
+    def stop(self):
+        if self.thread and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+        for handler in self.handlers:
+            try:
+                handler.flush_batch()
+            except (OSError, ValueError):
+                pass
+
+_pipeline: Optional[LogPipeline] = None
+_pipeline_lock = threading.Lock()
+
+def _restart_after_fork():
+    if _pipeline is not None:
+        _pipeline.restart_after_fork()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+def configure_logging(log_file: str, log_level: str = "INFO", max_bytes: int = 10 * 1024 * 1024,
+                      backup_count: int = 5, sample_every: int = 1, queue_size: int = 10000) -> LogPipeline:
+    # Like basicConfig, the first call sets up the process and later calls
+    # reuse that pipeline.
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is not None:
+            return _pipeline
+
+        os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        handlers = [
+            BatchedRotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count),
+            BatchedStreamHandler()
+        ]
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        _pipeline = LogPipeline(handlers, queue_size=queue_size, sample_every=sample_every)
+        root = logging.getLogger()
+        root.setLevel(getattr(logging, log_level.upper(), logging.INFO))
+        root.addHandler(_pipeline.handler)
+        _pipeline.start()
+        atexit.register(_pipeline.stop)
+        return _pipeline
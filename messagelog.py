@@ -0,0 +1,301 @@
+import bisect
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# Every record is a fixed header followed by a JSON payload:
+# payload length, CRC-32 of the payload, offset, record kind, wall-clock time.
+HEADER = struct.Struct(">IIQBd")
+MESSAGE = 1
+ACK = 2
+
+SEGMENT_SUFFIX = ".log"
+
+class Segment:
+    # One append-only file holding a contiguous run of offsets starting at
+    # base_offset. positions[i] is the file position of offset base_offset + i.
+    def __init__(self, directory: str, base_offset: int):
+        self.base_offset = base_offset
+        self.path = os.path.join(directory, f"{base_offset:020d}{SEGMENT_SUFFIX}")
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o600)
+        self.size = os.fstat(self.fd).st_size
+        self.positions: List[int] = []
+        self.last_timestamp = 0.0
+        self.map: Optional[mmap.mmap] = None
+
+    @property
+    def next_offset(self) -> int:
+        return self.base_offset + len(self.positions)
+
+    def append(self, offset: int, kind: int, timestamp: float, payload: bytes):
+        os.write(self.fd, HEADER.pack(len(payload), zlib.crc32(payload), offset, kind, timestamp) + payload)
+        self.positions.append(self.size)
+        self.size += HEADER.size + len(payload)
+        self.last_timestamp = timestamp
+
+    def view(self) -> mmap.mmap:
+        # Records are read through a read-only mapping, so replay touches only
+        # the pages it needs. The mapping is widened as the segment grows.
+        if self.map is None or len(self.map) < self.size:
+            if self.map is not None:
+                self.map.close()
+            self.map = mmap.mmap(self.fd, self.size, access=mmap.ACCESS_READ)
+        return self.map
+
+    def read(self, offset: int) -> Tuple[int, bytes]:
+        position = self.positions[offset - self.base_offset]
+        view = self.view()
+        length, _, _, kind, _ = HEADER.unpack_from(view, position)
+        start = position + HEADER.size
+        return kind, view[start:start + length]
+
+    def recover(self) -> Iterator[Tuple[int, int, bytes]]:
+        # Rebuilds the position index and yields (offset, kind, payload). A torn
+        # or corrupt tail left by a crash is truncated away.
+        if self.size == 0:
+            return
+        view = self.view()
+        position = 0
+        while position + HEADER.size <= self.size:
+            length, crc, offset, kind, timestamp = HEADER.unpack_from(view, position)
+            start = position + HEADER.size
+            payload = view[start:start + length]
+            if offset != self.next_offset or len(payload) != length or zlib.crc32(payload) != crc:
+                break
+            self.positions.append(position)
+            self.last_timestamp = timestamp
+            yield offset, kind, payload
+            position = start + length
+        if position < self.size:
+            self.map.close()
+            self.map = None
+            os.ftruncate(self.fd, position)
+            self.size = position
+
+    def sync(self):
+        os.fsync(self.fd)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        os.close(self.fd)
+
+class MessageLog:
+    # Durable queue of messages for offline users, stored as segmented
+    # append-only files. Appends are written immediately but fsynced by a
+    # committer thread in groups: writers that arrive within one flush window
+    # share a single fsync. Delivery is recorded with ACK records listing the
+    # delivered offsets, so the pending index can be rebuilt from the segments
+    # after a restart.
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, flush_interval: float = 0.005,
+                 retention_seconds: Optional[float] = 7 * 24 * 3600, retention_bytes: Optional[int] = None):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.retention_seconds = retention_seconds
+        self.retention_bytes = retention_bytes
+        self.lock = threading.Lock()
+        self.committed = threading.Condition(self.lock)
+        self.segments: List[Segment] = []
+        self.pending: Dict[str, List[int]] = {}
+        self.written = -1
+        self.synced = -1
+        self.appended = 0
+        self.replayed = 0
+        self.expired = 0
+        self.fsyncs = 0
+        self.closed = False
+        self.logger = logging.getLogger(__name__)
+
+        os.makedirs(directory, exist_ok=True)
+        self.recover()
+        self.committer = threading.Thread(target=self.run, name="message-log", daemon=True)
+        self.committer.start()
+
+    def recover(self):
+        messages: Dict[str, List[int]] = {}
+        acked: Dict[str, Set[int]] = {}
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX))
+        for name in names:
+            segment = Segment(self.directory, int(name[:-len(SEGMENT_SUFFIX)]))
+            if self.segments and segment.base_offset != self.segments[-1].next_offset:
+                segment.close()
+                self.logger.warning("Skipping message log segment %s: offsets are not contiguous", name)
+                continue
+            self.segments.append(segment)
+            for offset, kind, payload in segment.recover():
+                record = json.loads(payload)
+                if kind == MESSAGE:
+                    messages.setdefault(record["to"], []).append(offset)
+                elif kind == ACK:
+                    acked.setdefault(record["user"], set()).update(record["offsets"])
+
+        for username, offsets in messages.items():
+            delivered = acked.get(username, set())
+            remaining = [offset for offset in offsets if offset not in delivered]
+            if remaining:
+                self.pending[username] = remaining
+        if not self.segments:
+            self.segments.append(Segment(self.directory, 0))
+        self.written = self.synced = self.segments[-1].next_offset - 1
+        self.logger.info("Message log recovered %d segments, %d pending messages",
+                         len(self.segments), sum(len(offsets) for offsets in self.pending.values()))
+
+    def append_record(self, kind: int, record: dict) -> int:
+        payload = json.dumps(record, separators=(',', ':')).encode('utf-8')
+        with self.lock:
+            if self.closed:
+                raise ValueError("Message log is closed")
+            segment = self.segments[-1]
+            if segment.positions and segment.size + HEADER.size + len(payload) > self.segment_bytes:
+                segment = self.roll()
+            offset = segment.next_offset
+            segment.append(offset, kind, time.time(), payload)
+            self.written = offset
+            if kind == MESSAGE:
+                self.pending.setdefault(record["to"], []).append(offset)
+                self.appended += 1
+            self.committed.notify_all()
+            return offset
+
+    def roll(self) -> Segment:
+        # Sealed segments are fsynced here, so the committer only ever has to
+        # sync the active one.
+        previous = self.segments[-1]
+        previous.sync()
+        self.synced = max(self.synced, self.written)
+        segment = Segment(self.directory, previous.next_offset)
+        self.segments.append(segment)
+        self.enforce_retention()
+        return segment
+
+    def append(self, username: str, message: dict, sync: bool = True) -> int:
+        offset = self.append_record(MESSAGE, {"to": username, "message": message})
+        if sync:
+            with self.lock:
+                while self.synced < offset and not self.closed:
+                    self.committed.wait()
+        return offset
+
+    def run(self):
+        while True:
+            with self.lock:
+                while self.synced >= self.written and not self.closed:
+                    self.committed.wait(timeout=60)
+                    self.enforce_retention()
+                if self.closed:
+                    return
+            # Let concurrent writers pile up behind one fsync.
+            time.sleep(self.flush_interval)
+            with self.lock:
+                if self.closed:
+                    return
+                target = self.written
+                segment = self.segments[-1]
+            try:
+                segment.sync()
+            except OSError as e:
+                self.logger.error("Message log fsync failed: %s", e)
+                continue
+            with self.lock:
+                self.fsyncs += 1
+                self.synced = max(self.synced, target)
+                self.committed.notify_all()
+
+    def enforce_retention(self, now: Optional[float] = None):
+        # Called with the lock held. Whole sealed segments are dropped, oldest
+        # first; the active segment is always kept.
+        now = time.time() if now is None else now
+        dropped = False
+        while len(self.segments) > 1:
+            oldest = self.segments[0]
+            too_old = self.retention_seconds is not None and oldest.last_timestamp < now - self.retention_seconds
+            too_big = self.retention_bytes is not None and self.size() > self.retention_bytes
+            if not (too_old or too_big):
+                break
+            self.segments.pop(0)
+            oldest.close()
+            os.remove(oldest.path)
+            dropped = True
+
+        if dropped:
+            first_offset = self.segments[0].base_offset
+            for username in list(self.pending):
+                offsets = self.pending[username]
+                kept = [offset for offset in offsets if offset >= first_offset]
+                self.expired += len(offsets) - len(kept)
+                if kept:
+                    self.pending[username] = kept
+                else:
+                    del self.pending[username]
+
+    def size(self) -> int:
+        return sum(segment.size for segment in self.segments)
+
+    def pending_count(self, username: str) -> int:
+        return len(self.pending.get(username, ()))
+
+    def read(self, offset: int) -> Optional[dict]:
+        with self.lock:
+            bases = [segment.base_offset for segment in self.segments]
+            index = bisect.bisect_right(bases, offset) - 1
+            if index < 0 or offset >= self.segments[index].next_offset:
+                return None
+            kind, payload = self.segments[index].read(offset)
+        return json.loads(payload)["message"] if kind == MESSAGE else None
+
+    def claim(self, username: str) -> List[int]:
+        # Takes the user's whole backlog so concurrent logins do not replay
+        # the same messages twice.
+        with self.lock:
+            return self.pending.pop(username, [])
+
+    def ack(self, username: str, offsets: List[int]):
+        # Marks exactly these messages as delivered. A replay can deliver a
+        # later message while requeueing an earlier one, so an ACK never
+        # covers offsets it does not list.
+        self.append_record(ACK, {"user": username, "offsets": offsets})
+        with self.lock:
+            self.replayed += len(offsets)
+
+    def requeue(self, username: str, offsets: List[int]):
+        with self.lock:
+            first_offset = self.segments[0].base_offset
+            offsets = [offset for offset in offsets if offset >= first_offset]
+            if offsets:
+                self.pending[username] = offsets + self.pending.get(username, [])
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "segments": len(self.segments),
+                "bytes": self.size(),
+                "first_offset": self.segments[0].base_offset,
+                "next_offset": self.segments[-1].next_offset,
+                "pending": sum(len(offsets) for offsets in self.pending.values()),
+                "appended": self.appended,
+                "replayed": self.replayed,
+                "expired": self.expired,
+                "fsyncs": self.fsyncs
+            }
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.committed.notify_all()
+        self.committer.join(timeout=5)
+        with self.lock:
+            for segment in self.segments:
+                try:
+                    segment.sync()
+                finally:
+                    segment.close()
@@ -0,0 +1,255 @@
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Updates land on one of a few stripes picked by thread id, so concurrent
+# writers rarely share a lock. The count is prime because thread ids are
+# aligned addresses that would otherwise pile onto a few stripes.
+STRIPES = 17
+
+# Histogram buckets are log-linear, as in HdrHistogram: each power of two is
+# split into 2 ** SUB_BUCKET_BITS buckets, which bounds the relative error of
+# any reported value to about 6%.
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_SHIFT = 40
+BUCKETS = (MAX_SHIFT + 2) * SUB_BUCKETS
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+def quantile_key(quantile: float) -> str:
+    return f"p{quantile * 100:g}"
+
+def stripe_index() -> int:
+    return threading.get_ident() % STRIPES
+
+def bucket_index(value: int) -> int:
+    shift = max(0, value.bit_length() - SUB_BUCKET_BITS - 1)
+    if shift > MAX_SHIFT:
+        return BUCKETS - 1
+    return shift * SUB_BUCKETS + (value >> shift)
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    if index < 2 * SUB_BUCKETS:
+        return index, index
+    shift = index // SUB_BUCKETS - 1
+    mantissa = index - shift * SUB_BUCKETS
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self):
+        self.locks = [threading.Lock() for _ in range(STRIPES)]
+        self.values = [0] * STRIPES
+
+    def inc(self, amount: float = 1):
+        index = stripe_index()
+        with self.locks[index]:
+            self.values[index] += amount
+
+    def value(self) -> float:
+        return sum(self.values)
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, function: Optional[Callable[[], float]] = None):
+        self.function = function
+        self.lock = threading.Lock()
+        self.current = 0
+
+    def set(self, value: float):
+        self.current = value
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.current += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def value(self) -> float:
+        return self.function() if self.function else self.current
+
+class Histogram:
+    kind = "summary"
+
+    def __init__(self, scale: float = 1000000):
+        # Values are recorded as integers in units of 1/scale, microseconds by default.
+        self.scale = scale
+        self.locks = [threading.Lock() for _ in range(STRIPES)]
+        self.counts = [[0] * BUCKETS for _ in range(STRIPES)]
+        self.sums = [0.0] * STRIPES
+        self.maxima = [0] * STRIPES
+
+    def observe(self, value: float):
+        scaled = max(0, int(value * self.scale))
+        index = stripe_index()
+        with self.locks[index]:
+            self.counts[index][bucket_index(scaled)] += 1
+            self.sums[index] += value
+            if scaled > self.maxima[index]:
+                self.maxima[index] = scaled
+
+    def merged(self) -> Tuple[List[int], float, int]:
+        counts = [0] * BUCKETS
+        total = 0.0
+        for index in range(STRIPES):
+            with self.locks[index]:
+                stripe = self.counts[index]
+                for bucket, count in enumerate(stripe):
+                    if count:
+                        counts[bucket] += count
+                total += self.sums[index]
+        return counts, total, max(self.maxima)
+
+    def summary(self) -> Dict[str, float]:
+        counts, total, maximum = self.merged()
+        count = sum(counts)
+        result = {"count": count, "sum": total, "max": maximum / self.scale}
+        targets = [(quantile, quantile * count) for quantile in QUANTILES]
+        seen = 0
+        for bucket, bucket_count in enumerate(counts):
+            if not bucket_count:
+                continue
+            seen += bucket_count
+            while targets and seen >= targets[0][1]:
+                low, high = bucket_bounds(bucket)
+                result[quantile_key(targets.pop(0)[0])] = min((low + high) / 2, maximum) / self.scale
+        for quantile, _ in targets:
+            result[quantile_key(quantile)] = 0.0
+        return result
+
+    def value(self) -> Dict[str, float]:
+        return self.summary()
+
+class MetricFamily:
+    def __init__(self, name: str, help_text: str, factory: Callable[[], Any], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.factory = factory
+        self.labelnames = tuple(labelnames)
+        self.kind = factory().kind
+        self.lock = threading.Lock()
+        self.children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: str) -> Any:
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self.lock:
+                child = self.children.setdefault(values, self.factory())
+        return child
+
+def escape_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class MetricsRegistry:
+    def __init__(self, namespace: str = "tcp_server"):
+        self.namespace = namespace
+        self.families: Dict[str, MetricFamily] = {}
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+
+    def register(self, name: str, help_text: str, factory: Callable[[], Any], labelnames: Sequence[str]) -> Any:
+        full_name = f"{self.namespace}_{name}" if self.namespace else name
+        with self.lock:
+            family = self.families.get(full_name)
+            if family is None:
+                family = self.families[full_name] = MetricFamily(full_name, help_text, factory, labelnames)
+        return family if labelnames else family.labels()
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Any:
+        return self.register(name, help_text, Counter, labels)
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = (),
+              function: Optional[Callable[[], float]] = None) -> Any:
+        return self.register(name, help_text, lambda: Gauge(function), labels)
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (), scale: float = 1000000) -> Any:
+        return self.register(name, help_text, lambda: Histogram(scale), labels)
+
+    def uptime(self) -> float:
+        return time.monotonic() - self.started
+
+    def snapshot(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"uptime": self.uptime()}
+        for name, family in list(self.families.items()):
+            key = name[len(self.namespace) + 1:] if self.namespace else name
+            if family.labelnames:
+                data[key] = {",".join(values): child.value() for values, child in list(family.children.items())}
+            else:
+                data[key] = family.labels().value()
+        return data
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.namespace}_uptime_seconds Seconds since the server started",
+            f"# TYPE {self.namespace}_uptime_seconds gauge",
+            f"{self.namespace}_uptime_seconds {self.uptime():.3f}"
+        ]
+        for name, family in list(self.families.items()):
+            lines.append(f"# HELP {name} {family.help_text}")
+            lines.append(f"# TYPE {name} {family.kind}")
+            for values, child in list(family.children.items()):
+                if family.kind != "summary":
+                    lines.append(f"{name}{format_labels(family.labelnames, values)} {child.value()}")
+                    continue
+                summary = child.summary()
+                for quantile in QUANTILES:
+                    labels = format_labels(family.labelnames, values, f'quantile="{quantile}"')
+                    lines.append(f"{name}{labels} {summary[quantile_key(quantile)]}")
+                labels = format_labels(family.labelnames, values)
+                lines.append(f"{name}_sum{labels} {summary['sum']}")
+                lines.append(f"{name}_count{labels} {summary['count']}")
+        return "\n".join(lines) + "\n"
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = None
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsServer:
+    # Plain-text scrape endpoint on a side port, served from its own thread.
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9100):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.httpd: Optional[ThreadingHTTPServer] = None
+        self.logger = logging.getLogger(__name__)
+
+    def start(self):
+        handler = type("BoundMetricsHandler", (MetricsHandler,), {"registry": self.registry})
+        self.httpd = ThreadingHTTPServer((self.host, self.port), handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, name="metrics-http", daemon=True).start()
+        self.logger.info("Metrics endpoint listening on http://%s:%s/metrics", self.host, self.port)
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
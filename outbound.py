@@ -0,0 +1,203 @@
+import os
+import socket
+import ssl
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+from transfer import FileRegion
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DISCONNECT = "disconnect"
+SLOW_CONSUMER_POLICIES = (DROP_OLDEST, DROP_NEWEST, DISCONNECT)
+
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+class SlowConsumerError(ConnectionError):
+    pass
+
+def close_regions(frames):
+    # File regions own an open file until sent; closing one twice is harmless.
+    for frame in frames:
+        if isinstance(frame, FileRegion):
+            frame.close()
+
+class OutboundQueue:
+    def __init__(self, high_watermark: int = 1024 * 1024, low_watermark: int = 256 * 1024,
+                 policy: str = DISCONNECT):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        if not 0 <= low_watermark <= high_watermark:
+            raise ValueError("Low watermark must be between 0 and the high watermark")
+            
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.policy = policy
+        self.frames = deque()
+        self.queued_bytes = 0
+        self.dropped_frames = 0
+        self.congested = False
+        self.closed = False
+        self.condition = threading.Condition()
+        
+    def put(self, frame: bytes) -> bool:
+        with self.condition:
+            if self.closed:
+                raise ConnectionError("Outbound queue is closed")
+                
+            if self.congested or self.queued_bytes + len(frame) > self.high_watermark:
+                self.congested = True
+                if self.policy == DISCONNECT:
+                    raise SlowConsumerError(f"Outbound queue exceeded {self.high_watermark} bytes")
+                if self.policy == DROP_NEWEST:
+                    self.dropped_frames += 1
+                    return False
+                self.drop_oldest(len(frame))
+                
+            self.frames.append(frame)
+            self.queued_bytes += len(frame)
+            self.condition.notify()
+        return True
+        
+    def drop_oldest(self, incoming: int):
+        # File regions are never dropped: the client has already been told to
+        # expect the whole download, and they hold no queued bytes anyway.
+        regions = deque()
+        while self.frames and self.queued_bytes + incoming > self.low_watermark:
+            frame = self.frames.popleft()
+            if isinstance(frame, FileRegion):
+                regions.append(frame)
+                continue
+            self.queued_bytes -= len(frame)
+            self.dropped_frames += 1
+        self.frames.extendleft(reversed(regions))
+            
+    def requeue(self, regions: List[FileRegion]):
+        # Unfinished file regions go to the back of the queue, behind frames
+        # that arrived while their last chunk was sent. They hold no queued
+        # bytes, so the watermarks do not apply.
+        with self.condition:
+            if self.closed:
+                close_regions(regions)
+                return
+            self.frames.extend(regions)
+            if regions:
+                self.condition.notify()
+                
+    def get_batch(self, timeout: Optional[float] = None) -> List[bytes]:
+        with self.condition:
+            if not self.frames and not self.closed:
+                self.condition.wait(timeout)
+                
+            batch = list(self.frames)
+            self.frames.clear()
+        return batch
+        
+    def sent(self, size: int):
+        with self.condition:
+            self.queued_bytes = max(self.queued_bytes - size, 0)
+            if self.congested and self.queued_bytes <= self.low_watermark:
+                self.congested = False
+                
+    def close(self):
+        with self.condition:
+            self.closed = True
+            close_regions(self.frames)
+            self.frames.clear()
+            self.queued_bytes = 0
+            self.condition.notify_all()
+            
+    def __len__(self) -> int:
+        return len(self.frames)
+        
+def send_frames(sock: socket.socket, frames: List[bytes]):
+    # Gathered writes hand the whole batch to the kernel in one sendmsg call
+    # without joining it first; TLS sockets cannot scatter, so they get one buffer.
+    if isinstance(sock, ssl.SSLSocket) or not hasattr(sock, 'sendmsg'):
+        sock.sendall(b''.join(frames))
+        return
+        
+    views = [memoryview(frame) for frame in frames if frame]
+    index = 0
+    while index < len(views):
+        sent = sock.sendmsg(views[index:index + IOV_MAX])
+        while sent:
+            size = len(views[index])
+            if sent < size:
+                views[index] = views[index][sent:]
+                break
+            sent -= size
+            index += 1
+            
+def send_batch(sock: socket.socket, batch: List[bytes]) -> List[FileRegion]:
+    # Sends one chunk of each file region and returns the regions with data left.
+    frames = []
+    unfinished = []
+    try:
+        for frame in batch:
+            if isinstance(frame, FileRegion):
+                if frames:
+                    send_frames(sock, frames)
+                    frames = []
+                if frame.send_next(sock):
+                    unfinished.append(frame)
+            else:
+                frames.append(frame)
+        if frames:
+            send_frames(sock, frames)
+    except BaseException:
+        close_regions(batch)
+        raise
+    return unfinished
+        
+class ClientWriter(threading.Thread):
+    def __init__(self, client, on_error: Callable[[str, Exception], None]):
+        super().__init__(name=f"writer-{client.id}", daemon=True)
+        self.client = client
+        self.on_error = on_error
+        
+    def run(self):
+        queue = self.client.outbound
+        sock = self.client.socket
+        try:
+            while not queue.closed:
+                batch = queue.get_batch()
+                if batch:
+                    unfinished = send_batch(sock, batch)
+                    queue.sent(sum(len(frame) for frame in batch))
+                    queue.requeue(unfinished)
+        except Exception as e:
+            if not queue.closed:
+                self.on_error(self.client.id, e)
+                
+class FanoutStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fanouts = 0
+        self.recipients = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+        
+    def record(self, recipients: int, seconds: float):
+        with self.lock:
+            self.fanouts += 1
+            self.recipients += recipients
+            self.total_seconds += seconds
+            self.last_seconds = seconds
+            if seconds > self.max_seconds:
+                self.max_seconds = seconds
+                
+    def snapshot(self) -> Dict[str, float]:
+        with self.lock:
+            average = self.total_seconds / self.fanouts if self.fanouts else 0.0
+            return {
+                "fanouts": self.fanouts,
+                "recipients": self.recipients,
+                "avg_ms": average * 1000,
+                "max_ms": self.max_seconds * 1000,
+                "last_ms": self.last_seconds * 1000
+            }
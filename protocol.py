@@ -0,0 +1,164 @@
+import functools
+import itertools
+import threading
+from concurrent.futures import InvalidStateError
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from codec import JSON_CODEC, get_codec
+
+PUSH_TYPES = ("broadcast", "private_message", "channel_message")
+KEEPALIVE_TYPE = "keepalive"
+
+def resolve(future: Any, result: Any = None, error: Optional[Exception] = None):
+    # Works for concurrent and asyncio futures alike; a future the caller has
+    # already cancelled or timed out is left alone.
+    try:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+class ClientProtocol:
+    # Wire logic shared by TCPClient and AsyncTCPClient: request ids and the
+    # futures waiting on them, response matching, keepalives and the auth
+    # handshake. Subclasses do the I/O and provide answer_keepalive() and
+    # queue_push(). pending_lock only matters for TCPClient, whose reader runs
+    # on its own thread; AsyncTCPClient touches `pending` from the loop alone.
+    compression: Optional[str] = None
+    on_message: Optional[Callable[[Any], None]] = None
+
+    def __init__(self):
+        self.codec = JSON_CODEC
+        self.compressor = None
+        self.authenticated = False
+        self.username: Optional[str] = None
+        self.session_token: Optional[str] = None
+        self.session_username: Optional[str] = None
+        self.pending_lock = threading.Lock()
+        self.pending: Dict[int, Any] = {}
+        self.request_ids = itertools.count(1)
+
+    def encode(self, message: Dict[str, Any]) -> bytes:
+        # TCPClient calls this under send_lock, which keeps the compression
+        # stream in wire order.
+        payload = self.codec.encode(message)
+        if self.compressor:
+            payload = self.compressor.compress(payload)
+        return self.framing.encode(payload)
+
+    def track(self, message: Dict[str, Any], future: Any) -> Tuple[int, bytes]:
+        # Assigns the next request id and registers the future under it.
+        # Callers that pipeline must hold their send lock so ids follow wire
+        # order.
+        request_id = next(self.request_ids)
+        data = self.encode(dict(message, id=request_id))
+        with self.pending_lock:
+            self.pending[request_id] = future
+        future.add_done_callback(functools.partial(self.abandon, request_id))
+        return request_id, data
+
+    def forget(self, request_id: Optional[int]):
+        with self.pending_lock:
+            self.pending.pop(request_id, None)
+
+    def abandon(self, request_id: int, future: Any):
+        # A caller that stops waiting cancels its future; dropping the id keeps
+        # `pending` from growing and turns a late response into a stray one.
+        if future.cancelled():
+            self.forget(request_id)
+
+    def dispatch(self, message: Any):
+        future = None
+        if isinstance(message, dict):
+            if message.get('type') == KEEPALIVE_TYPE:
+                self.answer_keepalive()
+                return
+
+            request_id = message.get('id')
+            with self.pending_lock:
+                if request_id is not None:
+                    future = self.pending.pop(request_id, None)
+                    if future is None:
+                        return
+                elif message.get('type') not in PUSH_TYPES and self.pending:
+                    # Servers that do not echo ids still answer each connection in order.
+                    future = self.pending.pop(next(iter(self.pending)))
+
+        if future is None:
+            self.deliver_push(message)
+        else:
+            resolve(future, message)
+
+    def keepalive_reply(self) -> bytes:
+        # The pong carries an id nobody waits for, so the reader discards it.
+        return self.encode({"type": "ping", "id": next(self.request_ids)})
+
+    def answer_keepalive(self):
+        raise NotImplementedError
+
+    def deliver_push(self, message: Any):
+        if self.on_message:
+            try:
+                self.on_message(message)
+            except Exception as e:
+                self.logger.error("Message callback failed: %s", e)
+            return
+        self.queue_push(message)
+
+    def queue_push(self, message: Any):
+        raise NotImplementedError
+
+    def fail_pending(self, error: Exception):
+        with self.pending_lock:
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            resolve(future, error=error)
+
+    def resume_credentials(self, username: Optional[str] = None) -> Optional[Dict[str, str]]:
+        # A cached session token skips the server's password hashing on reconnect.
+        if not self.session_token or (username is not None and username != self.session_username):
+            return None
+        return {"token": self.session_token}
+
+    def auth_message(self, credentials: Dict[str, str]) -> Dict[str, Any]:
+        message = {
+            "type": "auth",
+            "credentials": credentials
+        }
+        if self.preferred_codec is not JSON_CODEC:
+            message["codecs"] = [self.preferred_codec.name, JSON_CODEC.name]
+        if self.compression:
+            message["compression"] = [self.compression]
+        return message
+
+    def accept_auth(self, response: Optional[Dict[str, Any]], credentials: Dict[str, str]) -> bool:
+        if not response or response.get('type') != 'auth_response':
+            return False
+        success = response.get('success', False)
+        if success:
+            self.authenticated = True
+            self.username = response.get('username', credentials.get('username'))
+            self.session_token = response.get('session_token')
+            self.session_username = self.username
+            self.codec = get_codec(response.get('codec', JSON_CODEC.name))
+            self.logger.info("Authentication successful")
+        else:
+            if 'token' in credentials:
+                self.session_token = None
+            self.logger.error("Authentication failed: %s", response.get('message', 'Unknown error'))
+        return success
+
+    def channel_result(self, message: Dict[str, Any], response: Optional[Dict[str, Any]], response_type: str) -> bool:
+        if response and response.get('type') == response_type:
+            success = response.get('success', False)
+            if not success:
+                self.logger.error("Failed to %s %s: %s", message['type'], message['channel'],
+                                  response.get('message', ''))
+            return success
+        elif response and response.get('type') == 'error':
+            self.logger.error("Channel error: %s", response.get('message', ''))
+        return False
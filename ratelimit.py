@@ -0,0 +1,114 @@
+import threading
+import time
+from typing import Dict, Hashable, Optional, Sequence
+
+REJECT = "reject"
+DELAY = "delay"
+RATE_LIMIT_ACTIONS = (REJECT, DELAY)
+
+class RateLimitExceeded(Exception):
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Rate limit exceeded for {scope}, retry after {retry_after:.3f} seconds")
+        self.scope = scope
+        self.retry_after = retry_after
+
+class GcraLimiter:
+    # Generic cell rate algorithm: each key keeps a single theoretical arrival
+    # time, which behaves like a token bucket of `burst` tokens refilled at `rate`.
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("Rate must be positive")
+        if burst < 1:
+            raise ValueError("Burst must be at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.interval = 1.0 / rate
+        self.capacity = burst * self.interval
+        self.arrivals: Dict[Hashable, float] = {}
+
+    def wait(self, key: Hashable, now: float) -> float:
+        arrival = self.arrivals.get(key, now)
+        if arrival < now:
+            arrival = now
+        return arrival + self.interval - now - self.capacity
+
+    def commit(self, key: Hashable, now: float):
+        arrival = self.arrivals.get(key, now)
+        if arrival < now:
+            arrival = now
+        self.arrivals[key] = arrival + self.interval
+
+    def forget(self, key: Hashable):
+        self.arrivals.pop(key, None)
+
+    def release(self, key: Hashable, now: float):
+        # A key whose arrival time has passed is indistinguishable from a new
+        # one, so it can be dropped without handing out extra allowance.
+        if self.arrivals.get(key, now) <= now:
+            self.arrivals.pop(key, None)
+
+class RateLimiter:
+    def __init__(self, client: Optional[Sequence[float]] = None, username: Optional[Sequence[float]] = None,
+                 types: Optional[Dict[str, Sequence[float]]] = None, action: str = REJECT,
+                 max_delay: float = 1.0):
+        if action not in RATE_LIMIT_ACTIONS:
+            raise ValueError(f"Unknown rate limit action: {action}")
+        self.client = GcraLimiter(*client) if client else None
+        self.username = GcraLimiter(*username) if username else None
+        self.types = {kind: GcraLimiter(*limit) for kind, limit in (types or {}).items()}
+        self.action = action
+        self.max_delay = max_delay if action == DELAY else 0.0
+        self.lock = threading.Lock()
+        self.rejected = 0
+        self.delayed = 0
+
+    def acquire(self, client_id: str, username: Optional[str], kind: str, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        type_limiter = self.types.get(kind)
+        with self.lock:
+            # Every applicable limit is checked before any is charged, so a
+            # rejected message does not use up another scope's allowance.
+            wait, scope = 0.0, None
+            if self.client:
+                client_wait = self.client.wait(client_id, now)
+                if client_wait > wait:
+                    wait, scope = client_wait, "client"
+            if self.username and username:
+                user_wait = self.username.wait(username, now)
+                if user_wait > wait:
+                    wait, scope = user_wait, "user"
+            if type_limiter:
+                type_wait = type_limiter.wait(client_id, now)
+                if type_wait > wait:
+                    wait, scope = type_wait, kind
+
+            if wait > self.max_delay:
+                self.rejected += 1
+                raise RateLimitExceeded(scope, wait)
+
+            if self.client:
+                self.client.commit(client_id, now)
+            if self.username and username:
+                self.username.commit(username, now)
+            if type_limiter:
+                type_limiter.commit(client_id, now)
+            if wait > 0:
+                self.delayed += 1
+                return wait
+        return 0.0
+
+    def forget_client(self, client_id: str):
+        with self.lock:
+            if self.client:
+                self.client.forget(client_id)
+            for limiter in self.types.values():
+                limiter.forget(client_id)
+
+    def release_user(self, username: str, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self.username:
+                self.username.release(username, now)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"rejected": self.rejected, "delayed": self.delayed, "action": self.action}
@@ -0,0 +1,186 @@
+import logging
+import math
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+class TimerWheel:
+    # Hierarchical timing wheel: scheduling and cancelling are O(1), and an
+    # advance only touches the slots whose time has come.
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, now: Optional[float] = None):
+        if tick <= 0:
+            raise ValueError("Tick must be positive")
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.spans = [slots ** level for level in range(levels + 1)]
+        self.current = int((time.monotonic() if now is None else now) / tick)
+        self.wheels: List[List[Set[Hashable]]] = [[set() for _ in range(slots)] for _ in range(levels)]
+        self.positions: Dict[Hashable, Tuple[int, int]] = {}
+        self.deadlines: Dict[Hashable, int] = {}
+
+    def schedule(self, key: Hashable, when: float):
+        self.cancel(key)
+        deadline = max(math.ceil(when / self.tick), self.current + 1)
+        self.deadlines[key] = deadline
+        self.place(key, deadline)
+
+    def place(self, key: Hashable, deadline: int):
+        delta = deadline - self.current
+        level = 0
+        while level < self.levels - 1 and delta >= self.spans[level + 1]:
+            level += 1
+        # Timers beyond the top wheel park in its last slot and are re-placed when it cascades.
+        slot_time = min(deadline, self.current + self.spans[self.levels] - 1)
+        index = (slot_time // self.spans[level]) % self.slots
+        self.wheels[level][index].add(key)
+        self.positions[key] = (level, index)
+
+    def cancel(self, key: Hashable) -> bool:
+        position = self.positions.pop(key, None)
+        if position is None:
+            return False
+        level, index = position
+        self.wheels[level][index].discard(key)
+        del self.deadlines[key]
+        return True
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        target = int((time.monotonic() if now is None else now) / self.tick)
+        expired = []
+        while self.current < target:
+            self.current += 1
+            for level in range(1, self.levels):
+                if self.current % self.spans[level]:
+                    break
+                index = (self.current // self.spans[level]) % self.slots
+                bucket, self.wheels[level][index] = self.wheels[level][index], set()
+                for key in bucket:
+                    self.place(key, self.deadlines[key])
+
+            index = self.current % self.slots
+            bucket, self.wheels[0][index] = self.wheels[0][index], set()
+            for key in bucket:
+                del self.positions[key]
+                del self.deadlines[key]
+                expired.append(key)
+        return expired
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+class IdleReaper:
+    # Activity updates only touch the client's own timestamp; a client's timer
+    # is re-armed from that timestamp when it fires, so nothing is ever scanned.
+    def __init__(self, idle_timeout: float, idle_seconds: Callable[[Any], float],
+                 on_idle: Callable[[Any], None], ping_interval: Optional[float] = None,
+                 on_ping: Optional[Callable[[Any], None]] = None, tick: float = 1.0):
+        if ping_interval is not None and ping_interval >= idle_timeout:
+            raise ValueError("Ping interval must be shorter than the idle timeout")
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.idle_seconds = idle_seconds
+        self.on_idle = on_idle
+        self.on_ping = on_ping
+        self.wheel = TimerWheel(tick=tick)
+        self.lock = threading.Lock()
+        self.clients: Dict[str, Any] = {}
+        self.pinged: Dict[str, float] = {}
+        self.evicted = 0
+        self.pings = 0
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.logger = logging.getLogger(__name__)
+
+    def first_threshold(self) -> float:
+        return self.ping_interval if self.ping_interval else self.idle_timeout
+
+    def track(self, client):
+        with self.lock:
+            self.clients[client.id] = client
+            self.wheel.schedule(client.id, time.monotonic() + self.first_threshold())
+
+    def untrack(self, client_id: str):
+        with self.lock:
+            self.clients.pop(client_id, None)
+            self.pinged.pop(client_id, None)
+            self.wheel.cancel(client_id)
+
+    def poll(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        idle_clients = []
+        ping_clients = []
+        with self.lock:
+            for client_id in self.wheel.advance(now):
+                client = self.clients.get(client_id)
+                if client is None:
+                    continue
+                idle = self.idle_seconds(client)
+                if idle >= self.idle_timeout:
+                    del self.clients[client_id]
+                    self.pinged.pop(client_id, None)
+                    idle_clients.append(client)
+                    continue
+
+                pinged_at = self.pinged.get(client_id)
+                if pinged_at is not None and idle < now - pinged_at:
+                    # The client has been active since the last ping.
+                    del self.pinged[client_id]
+                    pinged_at = None
+                if self.ping_interval and pinged_at is None and idle >= self.ping_interval:
+                    self.pinged[client_id] = now
+                    ping_clients.append(client)
+
+                threshold = self.idle_timeout if client_id in self.pinged else self.first_threshold()
+                self.wheel.schedule(client_id, now + threshold - idle)
+
+        for client in ping_clients:
+            self.pings += 1
+            try:
+                self.on_ping(client)
+            except Exception as e:
+                self.logger.error("Failed to ping idle client %s: %s", client.id, e)
+        for client in idle_clients:
+            self.evicted += 1
+            try:
+                self.on_idle(client)
+            except Exception as e:
+                self.logger.error("Failed to evict idle client %s: %s", client.id, e)
+
+    def run(self):
+        while not self.stopped.wait(self.wheel.tick):
+            self.poll()
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="idle-reaper", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "tracked": len(self.clients),
+            "evicted": self.evicted,
+            "pings": self.pings,
+            "idle_timeout": self.idle_timeout
+        }
+
+def configure_keepalive(sock, idle: int = 60, interval: int = 10, count: int = 5):
+    # Lets the kernel detect dead peers on otherwise silent connections. The
+    # per-socket tuning options are platform specific, so missing ones are skipped.
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    except (OSError, AttributeError):
+        return
+    for option, value in (("TCP_KEEPIDLE", idle), ("TCP_KEEPINTVL", interval), ("TCP_KEEPCNT", count)):
+        if hasattr(socket, option):
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+            except OSError:
+                pass
@@ -0,0 +1,151 @@
+import itertools
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+class SnapshotSet:
+    # Members keyed by identity in an insertion-ordered dict, so adding and
+    # removing one is O(1) however large the set grows. Readers get a tuple
+    # snapshot they can iterate without locking; it is rebuilt at most once
+    # per batch of changes, on the first read after them. Changes must be
+    # made with `lock` held.
+    def __init__(self, lock: threading.Lock):
+        self.lock = lock
+        self.members: Dict[int, Any] = {}
+        self.cached: Optional[Tuple[Any, ...]] = ()
+        
+    def add(self, member) -> bool:
+        if id(member) in self.members:
+            return False
+        self.members[id(member)] = member
+        self.cached = None
+        return True
+        
+    def discard(self, member) -> bool:
+        if self.members.pop(id(member), None) is None:
+            return False
+        self.cached = None
+        return True
+        
+    def snapshot(self) -> Tuple[Any, ...]:
+        cached = self.cached
+        if cached is None:
+            with self.lock:
+                if self.cached is None:
+                    self.cached = tuple(self.members.values())
+                cached = self.cached
+        return cached
+        
+    def __contains__(self, member) -> bool:
+        return id(member) in self.members
+        
+    def __len__(self) -> int:
+        return len(self.members)
+
+class RegistryShard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clients: Dict[str, Any] = {}
+        self.authenticated = SnapshotSet(self.lock)
+
+class ClientRegistry:
+    def __init__(self, shard_count: int = 64):
+        self.shard_count = shard_count
+        self.shards = [RegistryShard() for _ in range(shard_count)]
+        self.username_locks = [threading.Lock() for _ in range(shard_count)]
+        self.sessions_by_username: Dict[str, SnapshotSet] = {}
+        self.ids = itertools.count(1)
+        
+    def next_id(self) -> int:
+        return next(self.ids)
+        
+    def shard_for(self, client_id: str) -> RegistryShard:
+        return self.shards[hash(client_id) % self.shard_count]
+        
+    def username_lock(self, username: str) -> threading.Lock:
+        return self.username_locks[hash(username) % self.shard_count]
+        
+    def add(self, client):
+        shard = self.shard_for(client.id)
+        with shard.lock:
+            shard.clients[client.id] = client
+            
+    def remove(self, client_id: str) -> Optional[Any]:
+        shard = self.shard_for(client_id)
+        with shard.lock:
+            client = shard.clients.pop(client_id, None)
+            if client is not None and client.authenticated:
+                shard.authenticated.discard(client)
+                self.remove_session(client)
+        return client
+        
+    def authenticate(self, client, username: str):
+        shard = self.shard_for(client.id)
+        with shard.lock:
+            if client.authenticated:
+                self.remove_session(client)
+            else:
+                shard.authenticated.add(client)
+                
+            client.username = username
+            client.authenticated = True
+            lock = self.username_lock(username)
+            with lock:
+                sessions = self.sessions_by_username.get(username)
+                if sessions is None:
+                    sessions = self.sessions_by_username[username] = SnapshotSet(lock)
+                sessions.add(client)
+                
+    def remove_session(self, client):
+        with self.username_lock(client.username):
+            sessions = self.sessions_by_username.get(client.username)
+            if sessions is not None:
+                sessions.discard(client)
+                if not sessions:
+                    self.sessions_by_username.pop(client.username, None)
+                
+    def sessions(self, username: str) -> Tuple[Any, ...]:
+        sessions = self.sessions_by_username.get(username)
+        return sessions.snapshot() if sessions is not None else ()
+        
+    def iter_authenticated(self) -> Iterator[Any]:
+        for shard in self.shards:
+            yield from shard.authenticated.snapshot()
+            
+    def authenticated_count(self) -> int:
+        return sum(len(shard.authenticated) for shard in self.shards)
+        
+    def get(self, client_id: str) -> Optional[Any]:
+        return self.shard_for(client_id).clients.get(client_id)
+        
+    def __getitem__(self, client_id: str):
+        client = self.get(client_id)
+        if client is None:
+            raise KeyError(client_id)
+        return client
+        
+    def __contains__(self, client_id: str) -> bool:
+        return client_id in self.shard_for(client_id).clients
+        
+    def __len__(self) -> int:
+        return sum(len(shard.clients) for shard in self.shards)
+        
+    def keys(self) -> List[str]:
+        keys = []
+        for shard in self.shards:
+            with shard.lock:
+                keys.extend(shard.clients.keys())
+        return keys
+        
+    def values(self) -> List[Any]:
+        values = []
+        for shard in self.shards:
+            with shard.lock:
+                values.extend(shard.clients.values())
+        return values
+        
+    def items(self) -> List[Tuple[str, Any]]:
+        items = []
+        for shard in self.shards:
+            with shard.lock:
+                items.extend(shard.clients.items())
+        return items
@@ -0,0 +1,288 @@
+import json
+import selectors
+import socket
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Set
+
+from framing import FRAMINGS, FrameDecoder, FramingError
+from server import ClientInfo, TCPServer
+
+class Connection:
+    def __init__(self, client: ClientInfo, decoder: FrameDecoder):
+        self.client = client
+        self.decoder = decoder
+        self.inbox = deque()
+        self.inbox_lock = threading.Lock()
+        self.scheduled = False
+        self.pending: Optional[memoryview] = None
+        self.writing = False
+
+class SelectorTCPServer(TCPServer):
+    CONFIG_FIELDS = TCPServer.CONFIG_FIELDS + ("worker_threads",)
+    # The I/O thread only drains byte frames from the outbound queues, so
+    # file regions are not supported here.
+    FILE_TRANSFER = False
+    
+    def __init__(self, *args, worker_threads: int = 8, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.worker_threads = worker_threads
+        self.selector: Optional[selectors.BaseSelector] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.io_thread: Optional[threading.Thread] = None
+        self.connections: Dict[str, Connection] = {}
+        self.wakeup_lock = threading.Lock()
+        self.write_requests: Set[str] = set()
+        self.close_requests: Set[str] = set()
+        self.wakeup_pending = False
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()
+        self.wakeup_reader.setblocking(False)
+        self.wakeup_writer.setblocking(False)
+        
+    def start_writer(self, client: ClientInfo):
+        pass
+        
+    def wakeup(self, client_id: str, closing: bool = False):
+        with self.wakeup_lock:
+            if closing:
+                self.close_requests.add(client_id)
+            else:
+                self.write_requests.add(client_id)
+            if self.wakeup_pending:
+                return
+            self.wakeup_pending = True
+            
+        try:
+            self.wakeup_writer.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass
+            
+    def send_frame(self, client: ClientInfo, frame: bytes) -> bool:
+        queued = super().send_frame(client, frame)
+        if queued:
+            self.wakeup(client.id)
+        return queued
+        
+    def close_client(self, client: ClientInfo):
+        client.outbound.close()
+        if threading.current_thread() is self.io_thread:
+            self.release_connection(client.id)
+        else:
+            self.wakeup(client.id, closing=True)
+            
+    def release_connection(self, client_id: str):
+        connection = self.connections.pop(client_id, None)
+        if connection is None:
+            return
+            
+        try:
+            self.selector.unregister(connection.client.socket)
+        except (KeyError, ValueError):
+            pass
+        connection.client.socket.close()
+        
+    def accept_clients(self):
+        while True:
+            try:
+                client_socket, client_address = self.server_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+                
+            if len(self.clients) >= self.max_clients:
+                self.connections_rejected.inc()
+                try:
+                    client_socket.send(FRAMINGS["newline"].encode(json.dumps({
+                        "type": "error",
+                        "message": "Server is at maximum capacity"
+                    }).encode('utf-8')))
+                except OSError:
+                    pass
+                client_socket.close()
+                continue
+                
+            client_socket.setblocking(False)
+            client_info = self.register_client(client_socket, client_address)
+            connection = Connection(client_info, self.create_decoder())
+            self.connections[client_info.id] = connection
+            self.selector.register(client_socket, selectors.EVENT_READ, connection)
+            
+    def handle_wakeup(self):
+        try:
+            while self.wakeup_reader.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+            
+        with self.wakeup_lock:
+            write_requests, self.write_requests = self.write_requests, set()
+            close_requests, self.close_requests = self.close_requests, set()
+            self.wakeup_pending = False
+            
+        for client_id in close_requests:
+            self.release_connection(client_id)
+            
+        for client_id in write_requests:
+            connection = self.connections.get(client_id)
+            if connection is not None and not connection.writing:
+                self.handle_writable(connection)
+                
+    def handle_readable(self, connection: Connection):
+        client = connection.client
+        try:
+            frames = connection.decoder.recv_from(client.socket)
+        except (BlockingIOError, InterruptedError):
+            return
+        except FramingError as e:
+            self.logger.warning("Framing error from client %s: %s", client.id, e)
+            frames = None
+        except OSError:
+            frames = None
+            
+        if frames is None:
+            self.disconnect_client(client.id)
+            return
+            
+        client.framing = connection.decoder.framing
+        client.touch(connection.decoder.received, len(frames))
+        if not frames:
+            return
+            
+        with connection.inbox_lock:
+            connection.inbox.extend(frames)
+            if connection.scheduled:
+                return
+            connection.scheduled = True
+        self.executor.submit(self.process_inbox, connection)
+        
+    def process_inbox(self, connection: Connection):
+        client = connection.client
+        while True:
+            with connection.inbox_lock:
+                if not connection.inbox or client.outbound.closed:
+                    connection.inbox.clear()
+                    connection.scheduled = False
+                    return
+                frame = connection.inbox.popleft()
+                
+            try:
+                response = self.process_data(client.id, frame)
+                self.send_to_client(client, response)
+            except Exception as e:
+                self.logger.error("Error handling client %s: %s", client.id, e)
+                self.disconnect_client(client.id)
+                
+    def handle_writable(self, connection: Connection):
+        client = connection.client
+        queue = client.outbound
+        try:
+            while True:
+                if connection.pending is None:
+                    batch = queue.get_batch(timeout=0)
+                    if not batch:
+                        break
+                    connection.pending = memoryview(b''.join(batch))
+                    
+                sent = client.socket.send(connection.pending)
+                queue.sent(sent)
+                if sent < len(connection.pending):
+                    connection.pending = connection.pending[sent:]
+                    break
+                connection.pending = None
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError as e:
+            self.logger.error("Error writing to client %s: %s", client.id, e)
+            self.disconnect_client(client.id)
+            return
+            
+        writing = connection.pending is not None
+        if writing != connection.writing:
+            connection.writing = writing
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            self.selector.modify(client.socket, events, connection)
+            
+    def serve(self):
+        while self.running:
+            for key, events in self.selector.select(timeout=1.0):
+                if key.data is None:
+                    self.accept_clients()
+                elif key.data == "wakeup":
+                    self.handle_wakeup()
+                else:
+                    if events & selectors.EVENT_READ:
+                        self.handle_readable(key.data)
+                    if events & selectors.EVENT_WRITE and key.data.client.id in self.connections:
+                        self.handle_writable(key.data)
+                        
+    def start(self):
+        try:
+            if self.enable_ssl:
+                raise ValueError("SSL is not supported by the selector engine")
+                
+            self.server_socket = self.create_server_socket()
+            self.server_socket.bind((self.host, self.port))
+            self.server_socket.listen(self.backlog)
+            self.server_socket.setblocking(False)
+            
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(self.server_socket, selectors.EVENT_READ, None)
+            self.selector.register(self.wakeup_reader, selectors.EVENT_READ, "wakeup")
+            self.executor = ThreadPoolExecutor(max_workers=self.worker_threads, thread_name_prefix="worker")
+            self.io_thread = threading.current_thread()
+            self.running = True
+            
+            self.logger.info("Selector TCP Server started on %s:%s", self.host, self.port)
+            self.logger.info("SSL enabled: %s", self.enable_ssl)
+            self.logger.info("Max clients: %s", self.max_clients)
+            self.logger.info("Worker threads: %s", self.worker_threads)
+            self.start_message_log()
+            self.start_reaper()
+            self.start_metrics()
+            
+            self.serve()
+        except Exception as e:
+            self.logger.error("Failed to start server: %s", e)
+        finally:
+            self.shutdown()
+            
+    def shutdown(self):
+        self.running = False
+        self.stop_reaper()
+        self.stop_metrics()
+        for client_id in list(self.clients.keys()):
+            self.disconnect_client(client_id)
+        self.stop_message_log()
+        self.authenticator.close()
+        for client_id in list(self.connections.keys()):
+            self.release_connection(client_id)
+            
+        if self.executor:
+            self.executor.shutdown(wait=False)
+        if self.selector:
+            self.selector.close()
+        if self.server_socket:
+            self.server_socket.close()
+            
+        self.logger.info("Server stopped")
+        
+    def stop(self):
+        self.running = False
+        try:
+            self.wakeup_writer.send(b'\0')
+        except OSError:
+            pass
+
+def main():
+    from config.settings import ConfigManager
+    
+    # Users come from the configured store, so settings are read like server.py does.
+    server = SelectorTCPServer.from_config(ConfigManager().get_server_config())
+    
+    try:
+        server.start()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
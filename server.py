@@ -1,3 +1,4 @@
+import os
 import socket
 import threading
 import json
@@ -5,66 +6,289 @@ import time
 import logging
 import signal
 import sys
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass, asdict
+import functools
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from dataclasses import fields
 from datetime import datetime
 import ssl
 import hashlib
 import secrets
+from framing import FrameDecoder, FramingError, get_framing, FRAMINGS
+from outbound import DISCONNECT, ClientWriter, FanoutStats, OutboundQueue, SlowConsumerError
+from registry import ClientRegistry
+from cluster import ClusterBus, run_cluster
+from codec import JSON_CODEC, CodecError, detect_codec, negotiate_codec
+from reaper import IdleReaper, configure_keepalive
+from ratelimit import RateLimiter, RateLimitExceeded
+from auth import Authenticator, create_user_store
+from tls import HandshakeStats, server_context
+from metrics import MetricsRegistry, MetricsServer
+from logpipe import SAMPLED, configure_logging
+from messagelog import MessageLog
+from transfer import (DEFAULT_CHUNK_SIZE, ChecksumCache, FileRegion, IncomingFile, TransferError, is_chunk,
+                      parse_chunk, valid_name)
+from utils import format_checksum
+from channels import MAX_CHANNEL_LENGTH, ChannelIndex, valid_channel
+from compression import (CompressionError, Compressor, Decompressor, compress_standalone, is_compressed,
+                         negotiate_compression)
 
-@dataclass
 class ClientInfo:
-    id: str
-    socket: socket.socket
-    address: Tuple[str, int]
-    connected_at: datetime
-    last_activity: datetime
-    username: Optional[str] = None
-    authenticated: bool = False
+    # One of these exists per connection, so it is slotted and keeps
+    # timestamps as time.monotonic() floats; wall_time() converts them for display.
+    __slots__ = (
+        "id", "socket", "address", "connected_at", "last_activity", "username", "authenticated",
+        "writer", "framing", "codec", "outbound", "compressor", "decompressor", "channels",
+        "transfers", "bytes_received", "bytes_sent", "messages_received", "messages_sent"
+    )
+    
+    def __init__(self, id: str, socket: socket.socket, address: Tuple[str, int],
+                 connected_at: Optional[float] = None, writer: Optional[Any] = None,
+                 outbound: Optional[OutboundQueue] = None):
+        self.id = id
+        self.socket = socket
+        self.address = address
+        self.connected_at = time.monotonic() if connected_at is None else connected_at
+        self.last_activity = self.connected_at
+        self.username: Optional[str] = None
+        self.authenticated = False
+        self.writer = writer
+        self.framing: Optional[Any] = None
+        self.codec: Any = JSON_CODEC
+        self.outbound = outbound
+        self.compressor: Optional[Compressor] = None
+        self.decompressor: Optional[Decompressor] = None
+        self.channels: Set[str] = set()
+        self.transfers: Dict[int, IncomingFile] = {}
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.messages_received = 0
+        self.messages_sent = 0
+        
+    def touch(self, bytes_received: int, frames: int):
+        self.last_activity = time.monotonic()
+        self.bytes_received = bytes_received
+        self.messages_received += frames
+        
+    def record_sent(self, size: int):
+        self.bytes_sent += size
+        self.messages_sent += 1
+        
+    @staticmethod
+    def wall_time(timestamp: float) -> datetime:
+        return datetime.fromtimestamp(time.time() - (time.monotonic() - timestamp))
 
 class TCPServer:
+    CONFIG_FIELDS = (
+        "host", "port", "max_clients", "enable_ssl", "cert_file", "key_file", "framing",
+        "buffer_size", "max_frame_size", "outbound_high_watermark", "outbound_low_watermark",
+        "slow_consumer_policy", "max_batch_size", "idle_timeout", "ping_interval",
+        "tcp_keepalive_idle", "tcp_nodelay", "socket_recv_buffer", "socket_send_buffer",
+        "backlog", "log_level", "log_file", "client_rate_limit", "client_rate_burst",
+        "user_rate_limit", "user_rate_burst", "type_rate_limits", "rate_limit_action",
+        "rate_limit_max_delay", "user_store", "admin_username", "admin_password", "auth_workers", "session_ttl", "session_cache_size",
+        "handshake_timeout", "metrics_host", "metrics_port",
+        "log_max_bytes", "log_backup_count", "log_sample_every", "enable_compression",
+        "compression_level", "compression_threshold", "max_subscriptions",
+        "message_log_dir", "message_log_segment_bytes", "message_log_flush_interval",
+        "message_log_retention_seconds", "message_log_retention_bytes", "transfer_dir",
+        "transfer_chunk_size", "max_transfer_size"
+    )
+    # ServerConfig.timeout predates the reaper and is its idle threshold.
+    CONFIG_ALIASES = {"timeout": "idle_timeout"}
+    MESSAGE_TYPES = (
+        "auth", "message", "command", "ping", "batch", "subscribe", "unsubscribe", "publish",
+        "upload", "upload_complete", "download"
+    )
+    # Downloads are streamed by the per-client writer thread with sendfile.
+    FILE_TRANSFER = True
+    # Offline messages are acknowledged only once their group commit is fsynced.
+    SYNC_OFFLINE_WRITES = True
+    
     def __init__(self, host: str = "127.0.0.1", port: int = 8080, max_clients: int = 100, 
-                 enable_ssl: bool = False, cert_file: str = None, key_file: str = None):
+                 enable_ssl: bool = False, cert_file: str = None, key_file: str = None,
+                 framing: str = "auto", buffer_size: int = 4096, max_frame_size: int = 16 * 1024 * 1024,
+                 outbound_high_watermark: int = 1024 * 1024, outbound_low_watermark: int = 256 * 1024,
+                 slow_consumer_policy: str = "disconnect", max_batch_size: int = 1000,
+                 idle_timeout: Optional[float] = 300.0, ping_interval: Optional[float] = None,
+                 tcp_keepalive_idle: Optional[int] = 60, tcp_nodelay: bool = True,
+                 socket_recv_buffer: Optional[int] = None, socket_send_buffer: Optional[int] = None,
+                 backlog: Optional[int] = None, log_level: str = "INFO", log_file: str = "logs/server.log",
+                 client_rate_limit: Optional[float] = None, client_rate_burst: int = 20,
+                 user_rate_limit: Optional[float] = None, user_rate_burst: int = 50,
+                 type_rate_limits: Optional[Dict[str, List[float]]] = None,
+                 rate_limit_action: str = "reject", rate_limit_max_delay: float = 1.0,
+                 user_store: Any = "memory", admin_username: str = "admin", admin_password: Optional[str] = None,
+                 auth_workers: int = 4, session_ttl: float = 3600.0,
+                 session_cache_size: int = 10000, handshake_timeout: float = 10.0,
+                 metrics_host: str = "127.0.0.1", metrics_port: Optional[int] = None,
+                 log_max_bytes: int = 10 * 1024 * 1024, log_backup_count: int = 5, log_sample_every: int = 100,
+                 enable_compression: bool = True, compression_level: int = 6, compression_threshold: int = 256,
+                 max_subscriptions: int = 100, message_log_dir: Optional[str] = None,
+                 message_log_segment_bytes: int = 64 * 1024 * 1024, message_log_flush_interval: float = 0.005,
+                 message_log_retention_seconds: Optional[float] = 7 * 24 * 3600,
+                 message_log_retention_bytes: Optional[int] = None, transfer_dir: Optional[str] = None,
+                 transfer_chunk_size: int = DEFAULT_CHUNK_SIZE, max_transfer_size: int = 1024 * 1024 * 1024):
         self.host = host
         self.port = port
         self.max_clients = max_clients
         self.enable_ssl = enable_ssl
         self.cert_file = cert_file
         self.key_file = key_file
+        self.handshake_timeout = handshake_timeout
+        self.framing = get_framing(framing)
+        self.buffer_size = buffer_size
+        self.max_frame_size = max_frame_size
+        self.outbound_high_watermark = outbound_high_watermark
+        self.outbound_low_watermark = outbound_low_watermark
+        self.slow_consumer_policy = slow_consumer_policy
+        self.max_batch_size = max_batch_size
+        self.enable_compression = enable_compression
+        self.compression_level = compression_level
+        self.compression_threshold = compression_threshold
+        self.max_subscriptions = max_subscriptions
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self.tcp_keepalive_idle = tcp_keepalive_idle
+        self.tcp_nodelay = tcp_nodelay
+        self.socket_recv_buffer = socket_recv_buffer
+        self.socket_send_buffer = socket_send_buffer
+        self.backlog = backlog or max_clients
+        self.log_level = log_level
+        self.log_file = log_file
+        self.log_max_bytes = log_max_bytes
+        self.log_backup_count = log_backup_count
+        self.log_sample_every = log_sample_every
+        self.metrics_host = metrics_host
+        self.metrics_port = metrics_port
+        self.message_log_dir = message_log_dir
+        self.message_log_segment_bytes = message_log_segment_bytes
+        self.message_log_flush_interval = message_log_flush_interval
+        self.message_log_retention_seconds = message_log_retention_seconds
+        self.message_log_retention_bytes = message_log_retention_bytes
+        self.transfer_dir = transfer_dir
+        self.transfer_chunk_size = transfer_chunk_size
+        self.max_transfer_size = max_transfer_size
         
-        self.clients: Dict[str, ClientInfo] = {}
+        self.clients = ClientRegistry()
+        self.channels = ChannelIndex()
         self.server_socket: Optional[socket.socket] = None
         self.running = False
-        self.client_counter = 0
+        self.fanout_stats = FanoutStats()
+        self.tls_stats = HandshakeStats()
+        self.metrics_server: Optional[MetricsServer] = None
+        self.message_log: Optional[MessageLog] = None
+        self.transfer_lock = threading.Lock()
+        self.checksums = ChecksumCache()
+        self.active_uploads: Set[str] = set()
+        if transfer_dir:
+            os.makedirs(transfer_dir, exist_ok=True)
+        self.cluster: Optional[ClusterBus] = None
+        self.reaper: Optional[IdleReaper] = None
+        if idle_timeout:
+            self.reaper = IdleReaper(
+                idle_timeout,
+                idle_seconds=self.idle_seconds,
+                on_idle=self.evict_idle_client,
+                ping_interval=ping_interval,
+                on_ping=self.ping_idle_client
+            )
+        self.rate_limiter: Optional[RateLimiter] = None
+        if client_rate_limit or user_rate_limit or type_rate_limits:
+            self.rate_limiter = RateLimiter(
+                client=(client_rate_limit, client_rate_burst) if client_rate_limit else None,
+                username=(user_rate_limit, user_rate_burst) if user_rate_limit else None,
+                types=type_rate_limits,
+                action=rate_limit_action,
+                max_delay=rate_limit_max_delay
+            )
+        store = create_user_store(user_store)
+        if admin_password:
+            store.ensure_user(admin_username, admin_password)
+        elif user_store is None or user_store == "memory":
+            raise ValueError("The memory user store starts empty; set admin_password or configure "
+                             "a json or sqlite user_store")
+        self.authenticator = Authenticator(
+            store,
+            workers=auth_workers,
+            session_ttl=session_ttl,
+            session_cache_size=session_cache_size
+        )
         
         self.setup_logging()
+        self.setup_metrics()
         self.setup_signal_handlers()
         
+    @classmethod
+    def from_config(cls, config, **overrides) -> 'TCPServer':
+        kwargs = {}
+        for field in fields(config):
+            name = cls.CONFIG_ALIASES.get(field.name, field.name)
+            if name in cls.CONFIG_FIELDS:
+                kwargs[name] = getattr(config, field.name)
+        kwargs.update(overrides)
+        return cls(**kwargs)
+        
     def setup_logging(self):
-        import os
-        os.makedirs('logs', exist_ok=True)
-        
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('logs/server.log'),
-                logging.StreamHandler()
-            ]
+        configure_logging(
+            self.log_file,
+            self.log_level,
+            max_bytes=self.log_max_bytes,
+            backup_count=self.log_backup_count,
+            sample_every=self.log_sample_every
         )
         self.logger = logging.getLogger(__name__)
         
+    def setup_metrics(self):
+        self.metrics = MetricsRegistry()
+        self.metrics.gauge("connected_clients", "Currently connected clients", function=lambda: len(self.clients))
+        self.metrics.gauge("channels", "Channels with at least one subscriber", function=lambda: len(self.channels))
+        self.connections_accepted = self.metrics.counter("connections_accepted_total", "Connections accepted")
+        self.connections_rejected = self.metrics.counter("connections_rejected_total", "Connections refused at capacity")
+        self.auth_attempts = self.metrics.counter("auth_attempts_total", "Authentication attempts", ("method", "result"))
+        self.auth_seconds = self.metrics.histogram("auth_seconds", "Time spent authenticating", ("method",))
+        self.messages_total = self.metrics.counter("messages_total", "Messages processed", ("type",))
+        self.message_seconds = self.metrics.histogram("message_seconds", "Time spent processing a message", ("type",))
+        self.fanout_recipients = self.metrics.histogram("fanout_recipients", "Recipients per broadcast", scale=1)
+        self.send_failures = self.metrics.counter("send_failures_total", "Pushes that could not be queued", ("reason",))
+        self.transfer_bytes = self.metrics.counter("transfer_bytes_total", "File bytes transferred", ("direction",))
+        
+    def start_metrics(self):
+        if self.metrics_port is None:
+            return
+        self.metrics_server = MetricsServer(self.metrics, self.metrics_host, self.metrics_port)
+        try:
+            self.metrics_server.start()
+        except OSError as e:
+            self.logger.warning("Metrics endpoint unavailable on %s:%s: %s", self.metrics_host, self.metrics_port, e)
+            self.metrics_server = None
+            
+    def stop_metrics(self):
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        
+    def start_message_log(self):
+        # Segments belong to one process, so in a cluster the hub owns the log
+        # and workers reach it over the bus.
+        if not self.message_log_dir or self.cluster:
+            return
+        self.message_log = open_message_log(self)
+        
+    def stop_message_log(self):
+        if self.message_log:
+            self.message_log.close()
+            self.message_log = None
+            
     def setup_signal_handlers(self):
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
         
     def signal_handler(self, signum, frame):
-        self.logger.info(f"Received signal {signum}, shutting down gracefully...")
+        self.logger.info("Received signal %s, shutting down gracefully...", signum)
         self.stop()
         
     def generate_client_id(self) -> str:
-        self.client_counter += 1
-        return f"client_{self.client_counter}_{int(time.time())}"
+        return f"client_{self.clients.next_id()}_{int(time.time())}"
         
     def create_server_socket(self) -> socket.socket:
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -74,72 +298,387 @@ class TCPServer:
             server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         except AttributeError:
             pass
+        # Buffer sizes must be set before listen() so the TCP window scale covers them.
+        self.apply_buffer_sizes(server_socket)
+        return server_socket
         
-        if self.enable_ssl and self.cert_file and self.key_file:
-            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-            context.load_cert_chain(certfile=self.cert_file, keyfile=self.key_file)
-            server_socket = context.wrap_socket(server_socket, server_side=True)
+    def apply_buffer_sizes(self, sock: socket.socket):
+        if self.socket_recv_buffer:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.socket_recv_buffer)
+        if self.socket_send_buffer:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.socket_send_buffer)
             
-        return server_socket
+    def configure_client_socket(self, client_socket: socket.socket):
+        try:
+            self.apply_buffer_sizes(client_socket)
+            if self.tcp_nodelay:
+                client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            self.logger.warning("Failed to apply socket options: %s", e)
+        if self.tcp_keepalive_idle:
+            configure_keepalive(client_socket, idle=self.tcp_keepalive_idle)
+            
+    def create_ssl_context(self) -> Optional[ssl.SSLContext]:
+        if not (self.enable_ssl and self.cert_file and self.key_file):
+            return None
+            
+        return server_context(self.cert_file, self.key_file)
+        
+    def accept_tls(self, client_socket: socket.socket, context: ssl.SSLContext) -> Optional[ssl.SSLSocket]:
+        # Handshakes run on the connection's own thread with a deadline, so a
+        # slow or stalled peer cannot hold up accept() for everyone else.
+        started = time.perf_counter()
+        client_socket.settimeout(self.handshake_timeout)
+        try:
+            tls_socket = context.wrap_socket(client_socket, server_side=True)
+        except (ssl.SSLError, OSError) as e:
+            self.tls_stats.record_failure()
+            self.logger.warning("TLS handshake failed: %s", e)
+            client_socket.close()
+            return None
+        tls_socket.settimeout(None)
+        self.tls_stats.record(time.perf_counter() - started, tls_socket.session_reused)
+        return tls_socket
         
     def authenticate_client(self, client_id: str, credentials: dict) -> bool:
-        if not credentials or 'username' not in credentials or 'password' not in credentials:
+        if not isinstance(credentials, dict):
+            return False
+            
+        started = time.perf_counter()
+        if credentials.get('token'):
+            method = "token"
+            username = self.authenticator.resume_session(credentials['token'])
+        elif 'username' in credentials and 'password' in credentials:
+            method = "password"
+            username = credentials['username']
+            if not self.authenticator.authenticate(username, credentials['password']):
+                username = None
+        else:
+            return False
+        self.auth_seconds.labels(method).observe(time.perf_counter() - started)
+        self.auth_attempts.labels(method, "failure" if username is None else "success").inc()
+            
+        if username is None:
             return False
+        self.mark_authenticated(self.clients[client_id], username)
+        return True
+        
+    def issue_session(self, username: str) -> str:
+        # Tokens are copied to the other workers, so a client can resume on
+        # whichever worker its reconnect lands on.
+        token = self.authenticator.issue_session(username)
+        if self.cluster:
+            self.cluster.publish({"op": "session", "token": token, "username": username})
+        return token
+        
+    def mark_authenticated(self, client: ClientInfo, username: str):
+        was_authenticated = client.authenticated
+        self.clients.authenticate(client, username)
+        
+        if self.cluster:
+            if was_authenticated:
+                self.cluster.publish({"op": "leave", "client_id": client.id})
+            self.cluster.publish({"op": "join", "client": self.client_entry(client)})
             
-        username = credentials['username']
-        password = credentials['password']
+    def join_cluster(self, cluster: ClusterBus):
+        self.cluster = cluster
+        cluster.connect(self.handle_cluster_event)
+        
+    def handle_cluster_event(self, event: dict):
+        op = event.get('op')
+        if op == 'broadcast':
+            self.fanout(event['message'])
+        elif op == 'channel':
+            self.fanout(event['message'], recipients=self.channels.subscribers(event['channel']))
+        elif op == 'private':
+            self.deliver_private(event['target'], event['message'])
+        elif op == 'offline_replay':
+            self.replay_from_hub(event)
+        elif op == 'session':
+            self.authenticator.sessions.add(event['token'], event['username'])
+            
+    def client_entry(self, client: ClientInfo) -> dict:
+        return {
+            "id": client.id,
+            "username": client.username,
+            "address": f"{client.address[0]}:{client.address[1]}",
+            "connected_at": client.wall_time(client.connected_at).isoformat()
+        }
         
-        if username == "admin" and password == "admin123":
-            self.clients[client_id].username = username
-            self.clients[client_id].authenticated = True
-            return True
-        return False
+    def client_stats(self, client: ClientInfo) -> dict:
+        entry = self.client_entry(client)
+        entry.update({
+            "idle_seconds": round(self.idle_seconds(client), 3),
+            "bytes_received": client.bytes_received,
+            "bytes_sent": client.bytes_sent,
+            "messages_received": client.messages_received,
+            "messages_sent": client.messages_sent
+        })
+        return entry
         
-    def handle_client(self, client_socket: socket.socket, client_address: Tuple[str, int]):
+    def get_sessions(self, username: str) -> List[ClientInfo]:
+        return list(self.clients.sessions(username))
+        
+    def get_authenticated_clients(self) -> List[ClientInfo]:
+        return list(self.clients.iter_authenticated())
+        
+    def register_client(self, client_socket: socket.socket, client_address: Tuple[str, int],
+                        writer: Optional[Any] = None) -> ClientInfo:
         client_id = self.generate_client_id()
         client_info = ClientInfo(
             id=client_id,
             socket=client_socket,
             address=client_address,
-            connected_at=datetime.now(),
-            last_activity=datetime.now()
+            writer=writer,
+            outbound=self.create_outbound_queue()
+        )
+        
+        self.configure_client_socket(client_socket)
+        self.clients.add(client_info)
+        self.connections_accepted.inc()
+        if self.reaper:
+            self.reaper.track(client_info)
+        self.logger.info("Client %s connected from %s:%s", client_id, client_address[0], client_address[1])
+        return client_info
+        
+    def idle_seconds(self, client: ClientInfo) -> float:
+        return time.monotonic() - client.last_activity
+        
+    def evict_idle_client(self, client: ClientInfo):
+        self.logger.info("Disconnecting client %s after %s seconds idle", client.id, self.idle_timeout)
+        self.disconnect_client(client.id)
+        
+    def ping_idle_client(self, client: ClientInfo):
+        if client.framing is None:
+            # Nothing has been received yet, so the client's framing is unknown.
+            return
+        self.send_to_client(client, {"type": "keepalive", "timestamp": time.time()})
+        
+    def start_reaper(self):
+        if self.reaper:
+            self.reaper.start()
+            
+    def stop_reaper(self):
+        if self.reaper:
+            self.reaper.stop()
+        
+    def create_outbound_queue(self) -> Optional[OutboundQueue]:
+        return OutboundQueue(
+            high_watermark=self.outbound_high_watermark,
+            low_watermark=self.outbound_low_watermark,
+            policy=self.slow_consumer_policy
         )
         
-        self.clients[client_id] = client_info
-        self.logger.info(f"Client {client_id} connected from {client_address[0]}:{client_address[1]}")
+    def create_decoder(self) -> FrameDecoder:
+        return FrameDecoder(self.framing, buffer_size=self.buffer_size, max_frame_size=self.max_frame_size)
+        
+    def process_data(self, client_id: str, data: bytes) -> Optional[dict]:
+        if is_chunk(data):
+            return self.receive_chunk(self.clients[client_id], data)
+        parsed_message, error = self.decode_frame(data, self.clients[client_id].decompressor)
+        if error:
+            return error
+        return self.respond(client_id, parsed_message)
+        
+    def decode_frame(self, data: bytes, decompressor: Optional[Decompressor] = None) -> Tuple[Optional[dict], Optional[dict]]:
+        if decompressor and is_compressed(data):
+            try:
+                data = decompressor.decompress(data)
+            except CompressionError as e:
+                return None, {"type": "error", "message": f"Invalid compressed frame: {e}"}
+                
+        codec = detect_codec(data)
+        try:
+            parsed_message = codec.decode(data)
+        except CodecError:
+            return None, {"type": "error", "message": f"Invalid {codec.label} format"}
+            
+        if not isinstance(parsed_message, dict):
+            return None, {"type": "error", "message": "Message must be a JSON object"}
+        return parsed_message, None
+        
+    def respond(self, client_id: str, message: dict) -> dict:
+        started = time.perf_counter()
+        return self.finish_response(message, self.process_message(client_id, message), started)
+        
+    def finish_response(self, message: dict, response: dict, started: float) -> dict:
+        msg_type = message.get('type')
+        if msg_type not in self.MESSAGE_TYPES:
+            msg_type = "unknown"
+        self.messages_total.labels(msg_type).inc()
+        self.message_seconds.labels(msg_type).observe(time.perf_counter() - started)
+        if 'id' in message:
+            response["id"] = message['id']
+        return response
+        
+    def encode_message(self, client: ClientInfo, message: dict) -> bytes:
+        framing = client.framing or FRAMINGS["newline"]
+        payload = client.codec.encode(message)
+        if client.compressor:
+            payload = client.compressor.compress(payload)
+        return framing.encode(payload)
+        
+    def binary_safe(self, client: ClientInfo) -> bool:
+        return client.framing is FRAMINGS["length"]
+        
+    def send_frame(self, client: ClientInfo, frame: bytes) -> bool:
+        try:
+            queued = client.outbound.put(frame)
+        except SlowConsumerError as e:
+            self.logger.warning("Disconnecting slow consumer %s: %s", client.id, e)
+            self.disconnect_client(client.id)
+            raise
+        if queued:
+            client.record_sent(len(frame))
+        return queued
+            
+    def send_to_client(self, client: ClientInfo, message: dict) -> bool:
+        compressor = client.compressor
+        if compressor is None or compressor.stream is None:
+            return self.send_frame(client, self.encode_message(client, message))
+        with compressor.lock:
+            return self.send_frame(client, self.encode_message(client, message))
+            
+    def negotiate_compression(self, client: ClientInfo, offered: Any) -> Optional[str]:
+        if client.compressor is None:
+            if not self.enable_compression or not isinstance(offered, list):
+                return None
+            if negotiate_compression(offered, binary_safe=self.binary_safe(client)) is None:
+                return None
+            # A dropped frame would desynchronise a streaming context, so
+            # policies that shed frames get self-contained compressed frames.
+            client.decompressor = Decompressor(self.max_frame_size)
+            client.compressor = Compressor(
+                level=self.compression_level,
+                threshold=self.compression_threshold,
+                streaming=self.slow_consumer_policy == DISCONNECT
+            )
+        return "zlib"
+        
+    def start_writer(self, client: ClientInfo):
+        ClientWriter(client, self.handle_writer_error).start()
+        
+    def handle_writer_error(self, client_id: str, error: Exception):
+        self.logger.error("Error writing to client %s: %s", client_id, error)
+        self.disconnect_client(client_id)
+        
+    def close_client(self, client: ClientInfo):
+        client.outbound.close()
+        try:
+            # Wakes the reader thread when another thread (e.g. the reaper) closes the client.
+            client.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        client.socket.close()
+        
+    def handle_client(self, client_socket: socket.socket, client_address: Tuple[str, int],
+                      context: Optional[ssl.SSLContext] = None):
+        if context:
+            client_socket = self.accept_tls(client_socket, context)
+            if client_socket is None:
+                return
+        client_info = self.register_client(client_socket, client_address)
+        client_id = client_info.id
+        decoder = self.create_decoder()
+        self.start_writer(client_info)
         
         try:
             while self.running:
-                data = client_socket.recv(4096)
-                if not data:
+                frames = decoder.recv_from(client_socket)
+                if frames is None:
                     break
                     
-                client_info.last_activity = datetime.now()
-                message = data.decode('utf-8').strip()
-                
-                try:
-                    parsed_message = json.loads(message)
-                    response = self.process_message(client_id, parsed_message)
-                except json.JSONDecodeError:
-                    response = {"type": "error", "message": "Invalid JSON format"}
+                client_info.framing = decoder.framing
+                client_info.touch(decoder.received, len(frames))
+                for frame in frames:
+                    response = self.process_data(client_id, frame)
+                    if response is not None:
+                        self.send_to_client(client_info, response)
                     
-                client_socket.send(json.dumps(response).encode('utf-8'))
-                
+        except FramingError as e:
+            self.logger.warning("Framing error from client %s: %s", client_id, e)
         except Exception as e:
-            self.logger.error(f"Error handling client {client_id}: {e}")
+            self.logger.error("Error handling client %s: %s", client_id, e)
         finally:
             self.disconnect_client(client_id)
             
+    def reject_client(self, client_socket: socket.socket, client_address: Tuple[str, int],
+                      context: Optional[ssl.SSLContext] = None):
+        if context:
+            client_socket = self.accept_tls(client_socket, context)
+            if client_socket is None:
+                return
+        self.connections_rejected.inc()
+        try:
+            client_socket.sendall(FRAMINGS["newline"].encode(json.dumps({
+                "type": "error",
+                "message": "Server is at maximum capacity"
+            }).encode('utf-8')))
+        except OSError:
+            pass
+        finally:
+            client_socket.close()
+            
+    def rate_limit_kind(self, message: dict) -> str:
+        msg_type = message.get('type', 'unknown')
+        if msg_type == 'message':
+            return 'broadcast' if message.get('target', 'broadcast') == 'broadcast' else 'private'
+        return msg_type
+        
+    def check_rate_limit(self, client_id: str, message: dict) -> Optional[dict]:
+        client = self.clients.get(client_id)
+        username = client.username if client else None
+        try:
+            delay = self.rate_limiter.acquire(client_id, username, self.rate_limit_kind(message))
+        except RateLimitExceeded as e:
+            return {
+                "type": "error",
+                "message": "Rate limit exceeded",
+                "scope": e.scope,
+                "retry_after": round(e.retry_after, 3)
+            }
+            
+        if delay:
+            self.throttle(client_id, delay)
+        return None
+        
+    def throttle(self, client_id: str, seconds: float):
+        time.sleep(seconds)
+        
     def process_message(self, client_id: str, message: dict) -> dict:
         msg_type = message.get('type', 'unknown')
         
+        if self.rate_limiter:
+            limited = self.check_rate_limit(client_id, message)
+            if limited:
+                return limited
+                
         if msg_type == 'auth':
-            success = self.authenticate_client(client_id, message.get('credentials', {}))
-            return {
+            credentials = message.get('credentials', {})
+            success = self.authenticate_client(client_id, credentials)
+            response = {
                 "type": "auth_response",
                 "success": success,
                 "message": "Authentication successful" if success else "Authentication failed"
             }
+            if success:
+                client = self.clients[client_id]
+                response["username"] = client.username
+                response["session_token"] = credentials.get('token') or self.issue_session(client.username)
+            if success and 'codecs' in message:
+                client.codec = negotiate_codec(message['codecs'], binary_safe=self.binary_safe(client))
+                response["codec"] = client.codec.name
+            if success and 'compression' in message:
+                compression = self.negotiate_compression(client, message['compression'])
+                if compression:
+                    response["compression"] = compression
+            if success and self.message_log and self.message_log.pending_count(client.username):
+                response["queued_messages"] = self.message_log.pending_count(client.username)
+                self.replay_offline(client)
+            elif success and self.cluster and self.offline_delivery():
+                # The hub holds the backlog and replays it through this worker.
+                self.cluster.publish({"op": "replay", "user": client.username, "client_id": client.id})
+            return response
             
         elif msg_type == 'message':
             if not self.clients[client_id].authenticated:
@@ -153,6 +692,41 @@ class TCPServer:
             else:
                 return self.send_private_message(client_id, target, content)
                 
+        elif msg_type in ('subscribe', 'unsubscribe', 'publish'):
+            if not self.clients[client_id].authenticated:
+                return {"type": "error", "message": "Authentication required"}
+                
+            channel = message.get('channel')
+            if not valid_channel(channel):
+                return {"type": "error", "message": f"Channel must be a non-empty string of at most {MAX_CHANNEL_LENGTH} characters"}
+                
+            if msg_type == 'subscribe':
+                return self.subscribe(client_id, channel)
+            elif msg_type == 'unsubscribe':
+                return self.unsubscribe(client_id, channel)
+            else:
+                return self.publish(client_id, channel, message.get('content', ''))
+                
+        elif msg_type in ('upload', 'upload_complete', 'download'):
+            client = self.clients[client_id]
+            if not client.authenticated:
+                return {"type": "error", "message": "Authentication required"}
+            if not self.FILE_TRANSFER or not self.transfer_dir:
+                return {"type": "error", "message": "File transfer is not enabled"}
+            if not self.binary_safe(client):
+                return {"type": "error", "message": "File transfer requires length-prefixed framing"}
+                
+            transfer_id = message.get('transfer')
+            if not isinstance(transfer_id, int) or not 0 <= transfer_id < 2 ** 32:
+                return {"type": "error", "message": "Transfer id must be an unsigned 32-bit integer"}
+                
+            if msg_type == 'upload':
+                return self.start_upload(client, transfer_id, message.get('name'), message.get('size'))
+            elif msg_type == 'upload_complete':
+                return self.finish_upload(client, transfer_id, message.get('checksum'))
+            else:
+                return self.start_download(client, transfer_id, message.get('name'), message.get('offset', 0))
+                
         elif msg_type == 'command':
             if not self.clients[client_id].authenticated:
                 return {"type": "error", "message": "Authentication required"}
@@ -162,22 +736,60 @@ class TCPServer:
         elif msg_type == 'ping':
             return {"type": "pong", "timestamp": time.time()}
             
+        elif msg_type == 'batch':
+            return self.process_batch(client_id, message.get('messages'))
+            
         else:
             return {"type": "error", "message": f"Unknown message type: {msg_type}"}
             
+    def process_batch(self, client_id: str, messages: Any) -> dict:
+        error = self.check_batch(messages)
+        if error:
+            return error
+        return self.batch_response([self.respond_batched(client_id, message) for message in messages])
+        
+    def check_batch(self, messages: Any) -> Optional[dict]:
+        if not isinstance(messages, list):
+            return {"type": "error", "message": "Batch messages must be a list"}
+        if len(messages) > self.max_batch_size:
+            return {"type": "error", "message": f"Batch of {len(messages)} messages exceeds limit of {self.max_batch_size}"}
+        return None
+        
+    def respond_batched(self, client_id: str, message: Any) -> dict:
+        if not isinstance(message, dict):
+            return {"type": "error", "message": "Message must be a JSON object"}
+        if message.get('type') == 'batch':
+            return {"type": "error", "message": "Batches cannot be nested"}
+        return self.respond(client_id, message)
+        
+    def batch_response(self, responses: List[dict]) -> dict:
+        failed = sum(1 for response in responses
+                     if response.get('type') == 'error' or response.get('success') is False)
+        return {
+            "type": "batch_response",
+            "success": failed == 0,
+            "processed": len(responses),
+            "failed": failed,
+            "responses": responses
+        }
+        
     def handle_command(self, client_id: str, command: str) -> dict:
         if command == 'list_clients':
-            client_list = []
-            for cid, client in self.clients.items():
-                if client.authenticated:
-                    client_list.append({
-                        "id": cid,
-                        "username": client.username,
-                        "address": f"{client.address[0]}:{client.address[1]}",
-                        "connected_at": client.connected_at.isoformat()
-                    })
+            client_list = [self.client_stats(client) for client in self.get_authenticated_clients()]
+            if self.cluster:
+                client_list.extend(self.cluster.remote_members())
             return {"type": "command_response", "command": command, "data": client_list}
             
+        elif command == 'list_channels':
+            return {"type": "command_response", "command": command, "data": self.channels.snapshot()}
+            
+        elif command == 'metrics':
+            return {
+                "type": "command_response",
+                "command": command,
+                "data": self.metrics.snapshot()
+            }
+            
         elif command == 'server_info':
             return {
                 "type": "command_response",
@@ -186,8 +798,17 @@ class TCPServer:
                     "host": self.host,
                     "port": self.port,
                     "connected_clients": len(self.clients),
+                    "channels": len(self.channels),
                     "max_clients": self.max_clients,
-                    "uptime": time.time()
+                    "uptime": self.metrics.uptime(),
+                    "fanout": self.fanout_stats.snapshot(),
+                    "idle": self.reaper.snapshot() if self.reaper else None,
+                    "rate_limit": self.rate_limiter.snapshot() if self.rate_limiter else None,
+                    "auth": self.authenticator.snapshot(),
+                    "tls": self.tls_stats.snapshot() if self.enable_ssl else None,
+                    "message_log": self.message_log.snapshot() if self.message_log else None,
+                    "worker": self.cluster.worker if self.cluster else None,
+                    "cluster_clients": self.cluster.remote_count() if self.cluster else 0
                 }
             }
             
@@ -203,37 +824,113 @@ class TCPServer:
             "timestamp": time.time()
         }
         
-        sent_count = 0
-        for client_id, client in self.clients.items():
-            if client_id != sender_id and client.authenticated:
-                try:
-                    client.socket.send(json.dumps(message).encode('utf-8'))
-                    sent_count += 1
-                except Exception as e:
-                    self.logger.error(f"Failed to send broadcast to {client_id}: {e}")
-                    
+        sent_count = self.fanout(message, exclude_id=sender_id)
+        if self.cluster:
+            self.cluster.publish({"op": "broadcast", "message": message})
+            sent_count += self.cluster.remote_count()
+            
         return {
             "type": "message_response",
             "success": True,
             "message": f"Broadcast sent to {sent_count} clients"
         }
         
-    def send_private_message(self, sender_id: str, target_username: str, content: str) -> dict:
-        sender_username = self.clients[sender_id].username or sender_id
-        
-        target_client = None
-        for client in self.clients.values():
-            if client.username == target_username and client.authenticated:
-                target_client = client
-                break
-                
-        if not target_client:
+    def subscribe(self, client_id: str, channel: str) -> dict:
+        client = self.clients[client_id]
+        if channel not in client.channels and len(client.channels) >= self.max_subscriptions:
             return {
-                "type": "message_response",
+                "type": "subscribe_response",
                 "success": False,
-                "message": f"User {target_username} not found or not authenticated"
+                "channel": channel,
+                "message": f"Subscription limit of {self.max_subscriptions} channels reached"
             }
             
+        self.channels.subscribe(channel, client)
+        if client_id not in self.clients:
+            # Lost a race with disconnect_client, which has already cleaned up.
+            self.channels.remove_client(client)
+        return {
+            "type": "subscribe_response",
+            "success": True,
+            "channel": channel,
+            "subscribers": len(self.channels.subscribers(channel))
+        }
+        
+    def unsubscribe(self, client_id: str, channel: str) -> dict:
+        removed = self.channels.unsubscribe(channel, self.clients[client_id])
+        return {
+            "type": "unsubscribe_response",
+            "success": removed,
+            "channel": channel,
+            "message": f"Unsubscribed from {channel}" if removed else f"Not subscribed to {channel}"
+        }
+        
+    def publish(self, sender_id: str, channel: str, content: str) -> dict:
+        sender_username = self.clients[sender_id].username or sender_id
+        message = {
+            "type": "channel_message",
+            "channel": channel,
+            "sender": sender_username,
+            "content": content,
+            "timestamp": time.time()
+        }
+        
+        sent_count = self.fanout(message, exclude_id=sender_id, recipients=self.channels.subscribers(channel))
+        if self.cluster:
+            self.cluster.publish({"op": "channel", "channel": channel, "message": message})
+            
+        return {
+            "type": "message_response",
+            "success": True,
+            "message": f"Published to {sent_count} subscribers of {channel}"
+        }
+        
+    def fanout(self, message: dict, exclude_id: Optional[str] = None,
+               recipients: Optional[Iterable[ClientInfo]] = None) -> int:
+        started = time.perf_counter()
+        payloads = {}
+        compressed = {}
+        frames = {}
+        
+        if recipients is None:
+            recipients = self.clients.iter_authenticated()
+            
+        sent_count = 0
+        for client in recipients:
+            if client.id == exclude_id:
+                continue
+                
+            framing = client.framing or FRAMINGS["newline"]
+            key = (framing.name, client.codec.name, client.compressor is not None)
+            frame = frames.get(key)
+            if frame is None:
+                payload = payloads.get(client.codec.name)
+                if payload is None:
+                    payload = payloads[client.codec.name] = client.codec.encode(message)
+                if client.compressor and len(payload) >= self.compression_threshold:
+                    # Compressed once without connection state, so every
+                    # compressing recipient shares the same frame.
+                    if client.codec.name not in compressed:
+                        compressed[client.codec.name] = compress_standalone(payload, self.compression_level)
+                    payload = compressed[client.codec.name]
+                frame = frames[key] = framing.encode(payload)
+                
+            try:
+                if self.send_frame(client, frame):
+                    sent_count += 1
+                else:
+                    self.send_failures.labels("dropped").inc()
+            except Exception as e:
+                self.send_failures.labels("error").inc()
+                self.logger.error("Failed to send broadcast to %s: %s", client.id, e, extra=SAMPLED)
+                
+        self.fanout_stats.record(sent_count, time.perf_counter() - started)
+        self.fanout_recipients.observe(sent_count)
+        return sent_count
+        
+    def send_private_message(self, sender_id: str, target_username: str, content: str) -> dict:
+        sender_username = self.clients[sender_id].username or sender_id
+        
         message = {
             "type": "private_message",
             "sender": sender_username,
@@ -241,57 +938,300 @@ class TCPServer:
             "timestamp": time.time()
         }
         
-        try:
-            target_client.socket.send(json.dumps(message).encode('utf-8'))
+        target_clients = [client for client in self.clients.sessions(target_username) if client.id != sender_id]
+        remote_sessions = self.cluster.remote_sessions(target_username) if self.cluster else 0
+        if not target_clients and not remote_sessions:
+            if self.offline_delivery() and self.authenticator.user_exists(target_username):
+                return self.queue_offline(target_username, message)
             return {
                 "type": "message_response",
-                "success": True,
-                "message": f"Private message sent to {target_username}"
+                "success": False,
+                "message": f"User {target_username} not found or not authenticated"
             }
-        except Exception as e:
-            self.logger.error(f"Failed to send private message: {e}")
+        
+        delivered = self.deliver_private(target_username, message, exclude_id=sender_id)
+        if remote_sessions:
+            self.cluster.publish({"op": "private", "target": target_username, "message": message})
+            delivered += remote_sessions
+            
+        if not delivered:
             return {
                 "type": "message_response",
                 "success": False,
                 "message": "Failed to send private message"
             }
+        return {
+            "type": "message_response",
+            "success": True,
+            "message": f"Private message sent to {target_username}"
+        }
+        
+    def offline_delivery(self) -> bool:
+        return self.message_log is not None or bool(self.cluster and self.message_log_dir)
+        
+    def queue_offline(self, target_username: str, message: dict) -> dict:
+        message = dict(message, offline=True)
+        try:
+            if self.cluster:
+                self.cluster.publish({"op": "offline", "target": target_username, "message": message})
+            else:
+                self.message_log.append(target_username, message, sync=self.SYNC_OFFLINE_WRITES)
+        except (OSError, ValueError) as e:
+            self.logger.error("Failed to queue message for %s: %s", target_username, e)
+            return {
+                "type": "message_response",
+                "success": False,
+                "message": "Failed to queue private message"
+            }
+        return {
+            "type": "message_response",
+            "success": True,
+            "queued": True,
+            "message": f"{target_username} is offline; message queued for delivery"
+        }
+        
+    def replay_offline(self, client: ClientInfo) -> int:
+        # The backlog is claimed as a whole. Anything that cannot be queued
+        # to the client goes back for the next login, and one ACK record
+        # lists everything that was delivered.
+        username = client.username
+        offsets = self.message_log.claim(username)
+        delivered, undelivered = self.deliver_offline(client, offsets, self.message_log.read)
+        if undelivered:
+            self.message_log.requeue(username, undelivered)
+        if delivered:
+            self.message_log.ack(username, delivered)
+            self.logger.info("Replayed %d offline messages to %s", len(delivered), username)
+        return len(delivered)
+        
+    def replay_from_hub(self, event: dict):
+        # Same as replay_offline, with the claim made by the hub and the
+        # requeue and ACK sent back to it.
+        username = event['user']
+        messages = {offset: message for offset, message in event['messages']}
+        offsets = [offset for offset, _ in event['messages']]
+        client = self.clients.get(event['client_id'])
+        if client is None:
+            delivered, undelivered = [], offsets
+        else:
+            delivered, undelivered = self.deliver_offline(client, offsets, messages.get)
+        if undelivered:
+            self.cluster.publish({"op": "offline_requeue", "user": username, "offsets": undelivered})
+        if delivered:
+            self.cluster.publish({"op": "offline_ack", "user": username, "offsets": delivered})
+            self.logger.info("Replayed %d offline messages to %s", len(delivered), username)
+            
+    def deliver_offline(self, client: ClientInfo, offsets: List[int],
+                        read: Callable[[int], Optional[dict]]) -> Tuple[List[int], List[int]]:
+        # Returns the offsets delivered and the offsets left undelivered once
+        # the client's queue refuses a message.
+        delivered = []
+        for index, offset in enumerate(offsets):
+            message = read(offset)
+            if message is None:
+                continue
+            try:
+                sent = self.send_to_client(client, message)
+            except Exception as e:
+                self.logger.error("Failed to replay offline messages to %s: %s", client.id, e)
+                sent = False
+            if not sent:
+                return delivered, offsets[index:]
+            delivered.append(offset)
+        return delivered, []
+        
+    def start_upload(self, client: ClientInfo, transfer_id: int, name: Any, size: Any) -> dict:
+        if not valid_name(name):
+            return {"type": "error", "message": "Invalid file name"}
+        if not isinstance(size, int) or not 0 <= size <= self.max_transfer_size:
+            return {"type": "error", "message": f"File size must be between 0 and {self.max_transfer_size} bytes"}
+        if transfer_id in client.transfers:
+            return {"type": "error", "message": f"Transfer {transfer_id} is already in progress"}
+            
+        with self.transfer_lock:
+            if name in self.active_uploads:
+                return {"type": "error", "message": f"{name} is already being uploaded"}
+            self.active_uploads.add(name)
+        try:
+            upload = IncomingFile(os.path.join(self.transfer_dir, name), size)
+        except OSError as e:
+            self.release_upload(name)
+            self.logger.error("Failed to open upload %s: %s", name, e)
+            return {"type": "error", "message": "Failed to open file for upload"}
+            
+        client.transfers[transfer_id] = upload
+        return {
+            "type": "upload_response",
+            "success": True,
+            "transfer": transfer_id,
+            "name": name,
+            "offset": upload.offset
+        }
+        
+    def receive_chunk(self, client: ClientInfo, frame: bytes) -> Optional[dict]:
+        # Chunks are not answered; errors are reported by upload_complete.
+        if not self.FILE_TRANSFER:
+            return {"type": "error", "message": "File transfer is not enabled"}
+        try:
+            transfer_id, offset, data = parse_chunk(frame)
+        except TransferError as e:
+            self.logger.warning("Invalid chunk from client %s: %s", client.id, e)
+            return None
+        upload = client.transfers.get(transfer_id)
+        if upload is None:
+            self.logger.warning("Chunk for unknown transfer %s from client %s", transfer_id, client.id)
+            return None
+        try:
+            upload.write(offset, data)
+        except OSError as e:
+            upload.error = f"Write failed: {e}"
+        self.transfer_bytes.labels("upload").inc(len(data))
+        return None
+        
+    def finish_upload(self, client: ClientInfo, transfer_id: int, checksum: Any) -> dict:
+        upload = client.transfers.pop(transfer_id, None)
+        if upload is None:
+            return {"type": "error", "message": f"Unknown transfer {transfer_id}"}
             
+        name = os.path.basename(upload.path)
+        try:
+            error = upload.finish(upload.size, str(checksum))
+        except OSError as e:
+            error = f"Failed to store file: {e}"
+        finally:
+            self.release_upload(name)
+            
+        if error:
+            return {"type": "upload_response", "success": False, "transfer": transfer_id, "message": error}
+        self.logger.info("Client %s uploaded %s (%d bytes)", client.id, name, upload.size)
+        return {
+            "type": "upload_response",
+            "success": True,
+            "transfer": transfer_id,
+            "name": name,
+            "size": upload.size,
+            "checksum": checksum
+        }
+        
+    def release_upload(self, name: str):
+        with self.transfer_lock:
+            self.active_uploads.discard(name)
+            
+    def abort_transfers(self, client: ClientInfo):
+        # Partial files stay on disk so the upload can resume on a new connection.
+        transfers, client.transfers = client.transfers, {}
+        for upload in transfers.values():
+            upload.close()
+            self.release_upload(os.path.basename(upload.path))
+            
+    def start_download(self, client: ClientInfo, transfer_id: int, name: Any, offset: Any) -> dict:
+        if not valid_name(name):
+            return {"type": "error", "message": "Invalid file name"}
+        path = os.path.join(self.transfer_dir, name)
+        try:
+            file = open(path, 'rb')
+        except OSError:
+            return {"type": "error", "message": f"File {name} not found"}
+        # The region sends from this same open file, so the data matches the
+        # size and checksum below even if an upload replaces the file meanwhile.
+        queued = False
+        try:
+            stat = os.fstat(file.fileno())
+            size = stat.st_size
+            if not isinstance(offset, int) or not 0 <= offset <= size:
+                return {"type": "error", "message": f"Offset must be between 0 and {size}"}
+            checksum = self.checksums.get(path, file.fileno(), stat)
+            
+            # The writer interleaves the chunks with other frames, so this
+            # response may reach the client before the data does.
+            region = FileRegion(file, transfer_id, offset, size - offset, self.transfer_chunk_size)
+            queued = self.send_frame(client, region)
+            if not queued:
+                return {"type": "error", "message": "Outbound queue is full"}
+        finally:
+            # Once queued, the region closes the file after sending it.
+            if not queued:
+                file.close()
+                
+        # send_frame counted the region as one message of zero bytes.
+        client.bytes_sent += region.size
+        self.transfer_bytes.labels("download").inc(region.size)
+        return {
+            "type": "download_response",
+            "success": True,
+            "transfer": transfer_id,
+            "name": name,
+            "size": size,
+            "offset": offset,
+            "checksum": format_checksum(checksum)
+        }
+        
+    def deliver_private(self, target_username: str, message: dict, exclude_id: Optional[str] = None) -> int:
+        delivered = 0
+        for target_client in self.clients.sessions(target_username):
+            if target_client.id == exclude_id:
+                continue
+                
+            try:
+                if self.send_to_client(target_client, message):
+                    delivered += 1
+                else:
+                    self.send_failures.labels("dropped").inc()
+            except Exception as e:
+                self.send_failures.labels("error").inc()
+                self.logger.error("Failed to send private message to %s: %s", target_client.id, e, extra=SAMPLED)
+        return delivered
+        
     def disconnect_client(self, client_id: str):
-        if client_id in self.clients:
-            client = self.clients[client_id]
+        client = self.clients.remove(client_id)
+        if client and client.channels:
+            self.channels.remove_client(client)
+        if client and client.transfers:
+            self.abort_transfers(client)
+        if self.reaper:
+            self.reaper.untrack(client_id)
+        if self.rate_limiter:
+            self.rate_limiter.forget_client(client_id)
+            if client and client.authenticated and not self.clients.sessions(client.username):
+                self.rate_limiter.release_user(client.username)
+        if client:
+            if self.cluster and client.authenticated:
+                try:
+                    self.cluster.publish({"op": "leave", "client_id": client_id})
+                except OSError:
+                    pass
             try:
-                client.socket.close()
+                self.close_client(client)
             except:
                 pass
-            del self.clients[client_id]
-            self.logger.info(f"Client {client_id} disconnected")
+            self.logger.info("Client %s disconnected", client_id)
             
     def start(self):
         try:
             self.server_socket = self.create_server_socket()
             self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(self.max_clients)
+            self.server_socket.listen(self.backlog)
+            context = self.create_ssl_context()
             self.running = True
             
-            self.logger.info(f"TCP Server started on {self.host}:{self.port}")
-            self.logger.info(f"SSL enabled: {self.enable_ssl}")
-            self.logger.info(f"Max clients: {self.max_clients}")
+            self.logger.info("TCP Server started on %s:%s", self.host, self.port)
+            self.logger.info("SSL enabled: %s", self.enable_ssl)
+            self.logger.info("Max clients: %s", self.max_clients)
+            self.start_message_log()
+            self.start_reaper()
+            self.start_metrics()
             
             while self.running:
                 try:
                     client_socket, client_address = self.server_socket.accept()
                     
+                    target = self.handle_client
                     if len(self.clients) >= self.max_clients:
-                        client_socket.send(json.dumps({
-                            "type": "error",
-                            "message": "Server is at maximum capacity"
-                        }).encode('utf-8'))
-                        client_socket.close()
-                        continue
+                        target = self.reject_client
                         
                     client_thread = threading.Thread(
-                        target=self.handle_client,
-                        args=(client_socket, client_address)
+                        target=target,
+                        args=(client_socket, client_address, context)
                     )
                     client_thread.daemon = True
                     client_thread.start()
@@ -302,30 +1242,68 @@ class TCPServer:
                     break
                     
         except Exception as e:
-            self.logger.error(f"Failed to start server: {e}")
+            self.logger.error("Failed to start server: %s", e)
             self.stop()
             
     def stop(self):
         self.running = False
+        self.stop_reaper()
+        self.stop_metrics()
         
         for client_id in list(self.clients.keys()):
             self.disconnect_client(client_id)
+        self.stop_message_log()
+        self.authenticator.close()
             
         if self.server_socket:
+            try:
+                self.server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             try:
                 self.server_socket.close()
             except:
                 pass
                 
+        if self.cluster:
+            self.cluster.close()
+                
         self.logger.info("Server stopped")
 
-def main():
-    server = TCPServer(
-        host="127.0.0.1",
-        port=8080,
-        max_clients=100,
-        enable_ssl=False
+def open_message_log(settings: Any) -> MessageLog:
+    # settings is a TCPServer or a ServerConfig; both carry the message_log_* fields.
+    return MessageLog(
+        settings.message_log_dir,
+        segment_bytes=settings.message_log_segment_bytes,
+        flush_interval=settings.message_log_flush_interval,
+        retention_seconds=settings.message_log_retention_seconds,
+        retention_bytes=settings.message_log_retention_bytes
     )
+
+def main():
+    import argparse
+    from config.settings import ConfigManager
+    
+    parser = argparse.ArgumentParser(description='TCP Server')
+    parser.add_argument('--config', default='config/config.json', help='Configuration file')
+    parser.add_argument('--host', help='Bind address')
+    parser.add_argument('--port', type=int, help='Bind port')
+    parser.add_argument('--max-clients', type=int, help='Maximum clients per worker')
+    parser.add_argument('--workers', type=int, help='Number of worker processes sharing the port')
+    
+    args = parser.parse_args()
+    
+    config = ConfigManager(args.config).get_server_config()
+    for key in ('host', 'port', 'max_clients', 'workers'):
+        if getattr(args, key) is not None:
+            setattr(config, key, getattr(args, key))
+            
+    if config.workers > 1:
+        message_log_factory = functools.partial(open_message_log, config) if config.message_log_dir else None
+        run_cluster(TCPServer.from_config, {"config": config}, config.workers, message_log_factory)
+        return
+        
+    server = TCPServer.from_config(config)
     
     try:
         server.start()
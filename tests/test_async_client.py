@@ -0,0 +1,81 @@
+import unittest
+import asyncio
+import threading
+import time
+from async_client import AsyncClientPool, AsyncTCPClient
+from server import TCPServer
+
+class TestAsyncTCPClient(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = TCPServer(host="127.0.0.1", port=8089, max_clients=20, admin_password="admin123")
+        cls.server_thread = threading.Thread(target=cls.server.start)
+        cls.server_thread.daemon = True
+        cls.server_thread.start()
+        time.sleep(1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        time.sleep(0.5)
+
+    async def test_client_round_trip(self):
+        client = AsyncTCPClient(host="127.0.0.1", port=8089, timeout=5)
+        try:
+            self.assertTrue(await client.connect())
+            self.assertTrue(await client.ping_server())
+            self.assertIsNone(await client.execute_command('server_info'))
+            self.assertTrue(await client.authenticate("admin", "admin123"))
+
+            data = await client.execute_command('server_info')
+            self.assertEqual(data['port'], 8089)
+
+            responses = await client.pipeline([{"type": "ping"}] * 100)
+            self.assertTrue(all(response['type'] == 'pong' for response in responses))
+        finally:
+            await client.disconnect()
+        self.assertFalse(client.connected)
+
+    async def test_connection_failure(self):
+        client = AsyncTCPClient(host="127.0.0.1", port=8099, timeout=1)
+        self.assertFalse(await client.connect())
+        self.assertIsNone(await client.send_message({"type": "ping"}))
+
+    async def test_timed_out_request_is_forgotten(self):
+        server = await asyncio.start_server(lambda reader, writer: None, "127.0.0.1", 0)
+        client = AsyncTCPClient(host="127.0.0.1", port=server.sockets[0].getsockname()[1], timeout=0.5)
+        try:
+            self.assertTrue(await client.connect())
+            self.assertIsNone(await client.send_message({"type": "ping"}))
+            await asyncio.sleep(0)
+            self.assertEqual(client.pending, {})
+        finally:
+            await client.disconnect()
+            server.close()
+            await server.wait_closed()
+
+    async def test_pool_spreads_sessions_and_dedupes_pushes(self):
+        receiver = AsyncTCPClient(host="127.0.0.1", port=8089, timeout=5)
+        async with AsyncClientPool(host="127.0.0.1", port=8089, size=3, timeout=5) as pool:
+            self.assertEqual(len(pool.clients), 3)
+
+            results = await asyncio.gather(*(pool.ping_server() for _ in range(300)))
+            self.assertTrue(all(results))
+
+            try:
+                self.assertTrue(await receiver.connect())
+                self.assertTrue(await receiver.authenticate("admin", "admin123"))
+                self.assertTrue(await receiver.send_broadcast_message("hello pool"))
+            finally:
+                await receiver.disconnect()
+
+            push = await pool.receive_push(timeout=5)
+            self.assertEqual(push['content'], 'hello pool')
+            self.assertIsNone(await pool.receive_push(timeout=0.5))
+
+            await pool.clients[0].disconnect()
+            self.assertTrue(await pool.ping_server())
+            self.assertEqual(len(pool.clients), 3)
+
+if __name__ == '__main__':
+    unittest.main()
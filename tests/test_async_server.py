@@ -0,0 +1,87 @@
+import unittest
+import socket
+import json
+import threading
+import time
+from async_server import AsyncTCPServer
+
+class TestAsyncTCPServer(unittest.TestCase):
+    def setUp(self):
+        self.server = AsyncTCPServer(host="127.0.0.1", port=8084, max_clients=10, admin_password="admin123")
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1)
+        
+    def tearDown(self):
+        self.server.stop()
+        self.server_thread.join(timeout=5)
+        
+    def connect(self) -> socket.socket:
+        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        client_socket.settimeout(5)
+        client_socket.connect(("127.0.0.1", 8084))
+        return client_socket
+        
+    def request(self, client_socket: socket.socket, message: dict) -> dict:
+        client_socket.send(json.dumps(message).encode('utf-8'))
+        return json.loads(client_socket.recv(4096).decode('utf-8'))
+        
+    def test_ping(self):
+        client_socket = self.connect()
+        try:
+            response_data = self.request(client_socket, {"type": "ping"})
+            self.assertEqual(response_data.get('type'), 'pong')
+            self.assertIn('timestamp', response_data)
+        finally:
+            client_socket.close()
+            
+    def test_authentication_and_broadcast(self):
+        sender = self.connect()
+        receiver = self.connect()
+        try:
+            credentials = {"username": "admin", "password": "admin123"}
+            self.assertTrue(self.request(sender, {"type": "auth", "credentials": credentials})['success'])
+            self.assertTrue(self.request(receiver, {"type": "auth", "credentials": credentials})['success'])
+            
+            response_data = self.request(sender, {"type": "message", "target": "broadcast", "content": "hi"})
+            self.assertTrue(response_data['success'])
+            
+            broadcast = json.loads(receiver.recv(4096).decode('utf-8'))
+            self.assertEqual(broadcast['type'], 'broadcast')
+            self.assertEqual(broadcast['content'], 'hi')
+        finally:
+            sender.close()
+            receiver.close()
+            
+    def test_batched_auth_runs_off_the_loop(self):
+        threads = []
+        authenticate_client = self.server.authenticate_client
+        def record_thread(client_id, credentials):
+            threads.append(threading.current_thread())
+            return authenticate_client(client_id, credentials)
+        self.server.authenticate_client = record_thread
+        
+        client_socket = self.connect()
+        try:
+            response_data = self.request(client_socket, {"type": "batch", "messages": [
+                {"type": "auth", "credentials": {"username": "admin", "password": "admin123"}},
+                {"type": "command", "command": "server_info"}
+            ]})
+            self.assertEqual(response_data['failed'], 0)
+            self.assertEqual(response_data['responses'][1]['data']['port'], 8084)
+            self.assertEqual(len(threads), 1)
+            self.assertIsNot(threads[0], self.server_thread)
+        finally:
+            client_socket.close()
+            
+    def test_disconnect_removes_client(self):
+        client_socket = self.connect()
+        self.request(client_socket, {"type": "ping"})
+        self.assertEqual(len(self.server.clients), 1)
+        client_socket.close()
+        time.sleep(0.5)
+        self.assertEqual(len(self.server.clients), 0)
+
+if __name__ == '__main__':
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,123 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from auth import (Authenticator, JsonUserStore, MemoryUserStore, SessionCache, SqliteUserStore, UserStore,
+                  create_user_store, hash_secret, verify_secret)
+from client import TCPClient
+from server import TCPServer
+
+class TestCredentials(unittest.TestCase):
+    def setUp(self):
+        self.store_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def test_hash_secret(self):
+        encoded = hash_secret("secret")
+        self.assertNotEqual(encoded, hash_secret("secret"))
+        self.assertTrue(verify_secret("secret", encoded))
+        self.assertFalse(verify_secret("wrong", encoded))
+        self.assertFalse(verify_secret("secret", "md5$abc"))
+
+    def test_file_stores_persist(self):
+        stores = (
+            lambda: JsonUserStore(os.path.join(self.store_dir, "users.json")),
+            lambda: SqliteUserStore(os.path.join(self.store_dir, "users.db"))
+        )
+        for open_store in stores:
+            open_store().add_user("alice", "wonderland")
+            store = open_store()
+            self.assertTrue(verify_secret("wonderland", store.get_hash("alice")))
+            self.assertIsNone(store.get_hash("bob"))
+            self.assertTrue(store.delete("alice"))
+            self.assertFalse(store.delete("alice"))
+
+        self.assertIsInstance(create_user_store(f"sqlite:{self.store_dir}/other.db"), SqliteUserStore)
+        with self.assertRaises(ValueError):
+            create_user_store("ldap:example")
+
+    def test_authenticator(self):
+        authenticator = Authenticator(MemoryUserStore({"alice": "wonderland"}), workers=2)
+        try:
+            self.assertTrue(authenticator.authenticate("alice", "wonderland"))
+            self.assertFalse(authenticator.authenticate("alice", "wrong"))
+            self.assertFalse(authenticator.authenticate("nobody", "wonderland"))
+            self.assertEqual(authenticator.snapshot()["failed"], 2)
+
+            futures = [authenticator.submit("alice", "wonderland" if index % 2 else "wrong") for index in range(8)]
+            for future in futures:
+                future.result()
+            snapshot = authenticator.snapshot()
+            self.assertEqual((snapshot["verified"], snapshot["failed"]), (5, 6))
+        finally:
+            authenticator.close()
+
+    def test_server_requires_bootstrap_credentials(self):
+        self.assertIsNone(create_user_store("memory").get_hash("admin"))
+        with self.assertRaises(ValueError):
+            TCPServer(host="127.0.0.1", port=8093)
+
+        path = os.path.join(self.store_dir, "users.json")
+        JsonUserStore(path).add_user("admin", "changed")
+        server = TCPServer(host="127.0.0.1", port=8093, user_store=f"json:{path}", admin_password="initial")
+        server.stop()
+        self.assertTrue(verify_secret("changed", JsonUserStore(path).get_hash("admin")))
+        with self.assertRaises(RuntimeError):
+            server.authenticator.submit("admin", "changed")
+
+    def test_user_store_is_abstract(self):
+        with self.assertRaises(TypeError):
+            UserStore()
+
+    def test_session_cache_expiry_and_eviction(self):
+        cache = SessionCache(ttl=10, max_size=2)
+        first = cache.issue("alice", now=0)
+        second = cache.issue("bob", now=0)
+        self.assertEqual(cache.resume(first, now=5), "alice")
+        cache.issue("carol", now=5)
+        self.assertIsNone(cache.resume(second, now=5))
+        self.assertIsNone(cache.resume(first, now=10))
+        self.assertEqual(len(cache), 1)
+
+class TestServerSessions(unittest.TestCase):
+    def setUp(self):
+        self.server = TCPServer(host="127.0.0.1", port=8093, max_clients=10, admin_password="admin123")
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1)
+
+    def tearDown(self):
+        self.server.stop()
+        time.sleep(0.5)
+
+    def test_reconnect_resumes_session(self):
+        client = TCPClient(host="127.0.0.1", port=8093, timeout=5)
+        try:
+            self.assertTrue(client.connect())
+            self.assertFalse(client.authenticate("admin", "wrong"))
+            self.assertTrue(client.authenticate("admin", "admin123"))
+            self.assertIsNotNone(client.session_token)
+            client.disconnect()
+
+            self.assertTrue(client.connect())
+            self.assertTrue(client.authenticate("admin", "admin123"))
+            self.assertTrue(client.send_broadcast_message("resumed"))
+            stats = self.server.authenticator.snapshot()
+            self.assertEqual(stats["verified"], 1)
+            self.assertEqual(stats["resumed"], 1)
+
+            client.disconnect()
+            client.session_token = "stale"
+            self.assertTrue(client.connect())
+            self.assertTrue(client.authenticate("admin", "admin123"))
+            self.assertEqual(self.server.authenticator.snapshot()["verified"], 2)
+        finally:
+            client.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
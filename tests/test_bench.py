@@ -0,0 +1,47 @@
+import unittest
+import json
+from bench.loadgen import LoadGenerator, LocalServer, compare_reports, parse_mix, summarize_latencies
+
+class TestLoadGenerator(unittest.TestCase):
+    def test_summarize_latencies(self):
+        summary = summarize_latencies([i / 1000 for i in range(1, 1001)])
+        self.assertEqual(summary['count'], 1000)
+        self.assertAlmostEqual(summary['p50_ms'], 501)
+        self.assertAlmostEqual(summary['p99_ms'], 991)
+        self.assertAlmostEqual(summary['p999_ms'], 1000)
+        self.assertEqual(summarize_latencies([])['p99_ms'], 0.0)
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("ping=8,broadcast=1,private"),
+                         {"ping": 8.0, "broadcast": 1.0, "private": 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix("pong=1")
+        with self.assertRaises(ValueError):
+            parse_mix("ping=0")
+
+    def test_compare_reports(self):
+        baseline = {"messages": {"per_sec": 1000.0}, "latency": {"p99_ms": 2.0}}
+        current = {"messages": {"per_sec": 850.0}, "latency": {"p99_ms": 2.1}}
+        rows = {row['metric']: row for row in compare_reports(baseline, current, tolerance=0.10)}
+        self.assertTrue(rows['messages.per_sec']['regressed'])
+        self.assertFalse(rows['latency.p99_ms']['regressed'])
+
+    def test_run_against_local_server(self):
+        server = LocalServer("threaded", port=8088, max_clients=20, admin_password="admin123")
+        server.start()
+        try:
+            generator = LoadGenerator(port=8088, connections=4, duration=0.5, rate=50,
+                                      mix=parse_mix("ping=2,broadcast=1,private=1"))
+            report = generator.run(server)
+        finally:
+            server.stop()
+
+        self.assertEqual(report['connections']['established'], 4)
+        self.assertEqual(report['messages']['errors'], 0)
+        self.assertGreater(report['messages']['responses'], 0)
+        self.assertGreater(report['messages']['pushes_received'], 0)
+        self.assertIn('p999_ms', report['latency'])
+        self.assertEqual(json.loads(json.dumps(report))['config']['connections'], 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import threading
+import time
+from types import SimpleNamespace
+from channels import ChannelIndex, valid_channel
+from client import TCPClient
+from server import TCPServer
+
+class TestChannelIndex(unittest.TestCase):
+    def test_subscribe_and_unsubscribe(self):
+        index = ChannelIndex()
+        alice = SimpleNamespace(channels=set())
+        bob = SimpleNamespace(channels=set())
+        self.assertTrue(index.subscribe("news", alice))
+        self.assertFalse(index.subscribe("news", alice))
+        self.assertTrue(index.subscribe("news", bob))
+        self.assertTrue(index.subscribe("sport", alice))
+        self.assertEqual(index.subscribers("news"), (alice, bob))
+        self.assertEqual(index.snapshot(), {"news": 2, "sport": 1})
+
+        self.assertTrue(index.unsubscribe("news", bob))
+        self.assertFalse(index.unsubscribe("news", bob))
+        self.assertEqual(sorted(index.remove_client(alice)), ["news", "sport"])
+        self.assertEqual(len(index), 0)
+        self.assertEqual(alice.channels, set())
+
+    def test_valid_channel(self):
+        self.assertTrue(valid_channel("room-1"))
+        self.assertFalse(valid_channel(""))
+        self.assertFalse(valid_channel(42))
+        self.assertFalse(valid_channel("x" * 129))
+
+class TestServerChannels(unittest.TestCase):
+    def setUp(self):
+        self.server = TCPServer(host="127.0.0.1", port=8097, max_clients=10, max_subscriptions=2,
+                                admin_password="admin123")
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1)
+
+    def tearDown(self):
+        self.server.stop()
+        time.sleep(0.5)
+
+    def test_publish_reaches_only_subscribers(self):
+        publisher = TCPClient(host="127.0.0.1", port=8097, timeout=5)
+        subscriber = TCPClient(host="127.0.0.1", port=8097, timeout=5)
+        bystander = TCPClient(host="127.0.0.1", port=8097, timeout=5)
+        try:
+            for client in (publisher, subscriber, bystander):
+                self.assertTrue(client.connect())
+                self.assertTrue(client.authenticate("admin", "admin123"))
+
+            self.assertTrue(subscriber.subscribe("news"))
+            self.assertTrue(bystander.subscribe("sport"))
+            self.assertTrue(publisher.publish("news", "headline"))
+
+            push = subscriber.receive_push(timeout=5)
+            self.assertEqual(push["type"], "channel_message")
+            self.assertEqual(push["channel"], "news")
+            self.assertEqual(push["content"], "headline")
+            self.assertIsNone(bystander.receive_push(timeout=0.5))
+
+            self.assertEqual(publisher.execute_command('list_channels'), {"news": 1, "sport": 1})
+            self.assertTrue(subscriber.subscribe("weather"))
+            self.assertFalse(subscriber.subscribe("traffic"))
+            self.assertTrue(subscriber.unsubscribe("weather"))
+            self.assertFalse(subscriber.unsubscribe("weather"))
+
+            subscriber.disconnect()
+            time.sleep(0.5)
+            self.assertEqual(self.server.channels.snapshot(), {"sport": 1})
+        finally:
+            for client in (publisher, subscriber, bystander):
+                client.disconnect()
+
+    def test_subscribe_requires_auth(self):
+        client = TCPClient(host="127.0.0.1", port=8097, timeout=5)
+        try:
+            self.assertTrue(client.connect())
+            response = client.send_message({"type": "subscribe", "channel": "news"})
+            self.assertEqual(response["type"], "error")
+        finally:
+            client.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -37,6 +37,19 @@ class TestTCPClient(unittest.TestCase):
         result = self.client.authenticate("invalid", "invalid")
         self.assertFalse(result)
         self.assertFalse(self.client.authenticated)
+        
+    def test_timed_out_request_is_forgotten(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1)
+        client = TCPClient(host="127.0.0.1", port=listener.getsockname()[1], timeout=0.5)
+        try:
+            self.assertTrue(client.connect())
+            self.assertIsNone(client.send_message({"type": "ping"}))
+            self.assertEqual(client.pending, {})
+        finally:
+            client.disconnect()
+            listener.close()
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
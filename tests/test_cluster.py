@@ -0,0 +1,195 @@
+import unittest
+import json
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from auth import MemoryUserStore
+from client import TCPClient
+from cluster import ClusterBus, ClusterHub
+from framing import FrameDecoder, LengthPrefixFraming
+from messagelog import MessageLog
+from server import TCPServer
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+class TestClusterBus(unittest.TestCase):
+    def setUp(self):
+        self.bus_dir = tempfile.mkdtemp()
+        self.hub = ClusterHub(os.path.join(self.bus_dir, "bus.sock"))
+        self.hub.start()
+        self.hub.serve()
+        self.buses = []
+        
+    def tearDown(self):
+        for bus in self.buses:
+            bus.close()
+        self.hub.stop()
+        shutil.rmtree(self.bus_dir, ignore_errors=True)
+        
+    def connect(self, worker: str):
+        events = []
+        bus = ClusterBus(self.hub.path, worker)
+        bus.connect(events.append)
+        self.buses.append(bus)
+        return bus, events
+        
+    def test_membership_and_relay(self):
+        first, first_events = self.connect("worker-0")
+        second, second_events = self.connect("worker-1")
+        self.assertTrue(wait_for(lambda: len(self.hub.workers) == 2 and all(self.hub.workers.values())))
+        
+        first.publish({"op": "join", "client": {"id": "client_1", "username": "alice"}})
+        self.assertTrue(wait_for(lambda: second.remote_sessions("alice") == 1))
+        self.assertEqual(first.remote_sessions("alice"), 0)
+        
+        first.publish({"op": "broadcast", "message": {"type": "broadcast", "content": "hi"}})
+        self.assertTrue(wait_for(lambda: any(e['op'] == 'broadcast' for e in second_events)))
+        self.assertFalse(any(e['op'] == 'broadcast' for e in first_events))
+        
+        late, _ = self.connect("worker-2")
+        self.assertTrue(wait_for(lambda: late.remote_sessions("alice") == 1))
+        
+        first.close()
+        self.assertTrue(wait_for(lambda: second.remote_sessions("alice") == 0))
+        self.assertEqual(second.remote_members(), [])
+
+class TestClusteredServers(unittest.TestCase):
+    def setUp(self):
+        self.bus_dir = tempfile.mkdtemp()
+        self.hub = ClusterHub(os.path.join(self.bus_dir, "bus.sock"))
+        self.hub.start()
+        self.hub.serve()
+        
+        self.servers = []
+        for index, port in enumerate((8086, 8087)):
+            server = TCPServer(host="127.0.0.1", port=port, max_clients=10, admin_password="admin123")
+            server.join_cluster(ClusterBus(self.hub.path, f"worker-{index}"))
+            threading.Thread(target=server.start, daemon=True).start()
+            self.servers.append(server)
+        time.sleep(1)
+        
+    def tearDown(self):
+        for server in self.servers:
+            server.stop()
+        self.hub.stop()
+        shutil.rmtree(self.bus_dir, ignore_errors=True)
+        time.sleep(0.5)
+        
+    def connect(self, port: int):
+        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        client_socket.settimeout(5)
+        client_socket.connect(("127.0.0.1", port))
+        return client_socket, FrameDecoder()
+        
+    def request(self, connection, message: dict) -> dict:
+        client_socket, decoder = connection
+        client_socket.sendall(LengthPrefixFraming().encode(json.dumps(message).encode('utf-8')))
+        return json.loads(decoder.recv_from(client_socket)[0])
+        
+    def test_cross_worker_delivery(self):
+        first = self.connect(8086)
+        second = self.connect(8087)
+        try:
+            credentials = {"username": "admin", "password": "admin123"}
+            self.assertTrue(self.request(first, {"type": "auth", "credentials": credentials})['success'])
+            self.assertTrue(self.request(second, {"type": "auth", "credentials": credentials})['success'])
+            self.assertTrue(wait_for(lambda: self.servers[0].cluster.remote_count() == 1))
+            
+            clients = self.request(first, {"type": "command", "command": "list_clients"})['data']
+            self.assertEqual(len(clients), 2)
+            
+            response = self.request(first, {"type": "message", "target": "broadcast", "content": "hi"})
+            self.assertEqual(response['message'], "Broadcast sent to 1 clients")
+            broadcast = json.loads(second[1].recv_from(second[0])[0])
+            self.assertEqual(broadcast['content'], 'hi')
+            
+            response = self.request(second, {"type": "message", "target": "admin", "content": "psst"})
+            self.assertTrue(response['success'])
+            private = json.loads(first[1].recv_from(first[0])[0])
+            self.assertEqual(private['type'], 'private_message')
+        finally:
+            first[0].close()
+            second[0].close()
+
+    def test_session_resumes_on_another_worker(self):
+        first = self.connect(8086)
+        second = self.connect(8087)
+        try:
+            credentials = {"username": "admin", "password": "admin123"}
+            token = self.request(first, {"type": "auth", "credentials": credentials})['session_token']
+            self.assertTrue(wait_for(lambda: len(self.servers[1].authenticator.sessions) == 1))
+            
+            response = self.request(second, {"type": "auth", "credentials": {"token": token}})
+            self.assertTrue(response['success'])
+            self.assertEqual(self.servers[1].authenticator.snapshot()["resumed"], 1)
+            self.assertEqual(self.servers[1].authenticator.snapshot()["verified"], 0)
+        finally:
+            first[0].close()
+            second[0].close()
+
+class TestClusteredOfflineDelivery(unittest.TestCase):
+    def setUp(self):
+        self.bus_dir = tempfile.mkdtemp()
+        self.log_dir = os.path.join(self.bus_dir, "messages")
+        self.hub = ClusterHub(os.path.join(self.bus_dir, "bus.sock"), MessageLog(self.log_dir))
+        self.hub.start()
+        self.hub.serve()
+        
+        users = MemoryUserStore({"admin": "admin123", "bob": "builder"})
+        self.servers = []
+        for index, port in enumerate((8101, 8102)):
+            server = TCPServer(host="127.0.0.1", port=port, max_clients=10, user_store=users,
+                               message_log_dir=self.log_dir)
+            server.join_cluster(ClusterBus(self.hub.path, f"worker-{index}"))
+            threading.Thread(target=server.start, daemon=True).start()
+            self.servers.append(server)
+        time.sleep(1)
+        
+    def tearDown(self):
+        for server in self.servers:
+            server.stop()
+        self.hub.stop()
+        shutil.rmtree(self.bus_dir, ignore_errors=True)
+        time.sleep(0.5)
+        
+    def connect(self, port: int, username: str, password: str) -> TCPClient:
+        client = TCPClient(host="127.0.0.1", port=port, timeout=5)
+        self.assertTrue(client.connect())
+        self.assertTrue(client.authenticate(username, password))
+        return client
+        
+    def test_reconnect_to_another_worker(self):
+        sender = self.connect(8101, "admin", "admin123")
+        try:
+            self.assertTrue(sender.send_private_message("bob", "first"))
+            self.assertTrue(sender.send_private_message("bob", "second"))
+            self.assertTrue(wait_for(lambda: self.hub.message_log.pending_count("bob") == 2))
+        finally:
+            sender.disconnect()
+            
+        bob = self.connect(8102, "bob", "builder")
+        try:
+            contents = [bob.receive_push(timeout=5)["content"] for _ in range(2)]
+            self.assertEqual(contents, ["first", "second"])
+            self.assertTrue(wait_for(lambda: self.hub.message_log.snapshot()["replayed"] == 2))
+        finally:
+            bob.disconnect()
+            
+        bob = self.connect(8101, "bob", "builder")
+        try:
+            self.assertIsNone(bob.receive_push(timeout=0.5))
+            self.assertEqual(self.hub.message_log.snapshot()["pending"], 0)
+        finally:
+            bob.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
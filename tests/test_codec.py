@@ -0,0 +1,89 @@
+import unittest
+import json
+from unittest import mock
+import codec
+from codec import (
+    BINARY_CODEC, JSON_CODEC, MAX_DEPTH, CodecError, decode_message, detect_codec,
+    get_codec, negotiate_codec
+)
+
+class TestCodec(unittest.TestCase):
+    def test_binary_round_trip(self):
+        message = {
+            "type": "message",
+            "content": "héllo" * 20,
+            "small": 5,
+            "negative": -7,
+            "ints": [0, 127, 128, 255, 256, 65535, 65536, 2 ** 32, 2 ** 63, -33, -129, -32769, -2 ** 40],
+            "float": 1.5,
+            "flags": [True, False, None],
+            "blob": b"\x00\x01\x02",
+            "nested": {"list": list(range(20)), "map": {str(i): i for i in range(20)}}
+        }
+        
+        self.assertEqual(BINARY_CODEC.decode(BINARY_CODEC.encode(message)), message)
+        
+    def test_binary_is_compact(self):
+        message = {"type": "message", "target": "broadcast", "content": "hi", "timestamp": 1700000000.25}
+        self.assertLess(len(BINARY_CODEC.encode(message)), len(json.dumps(message)))
+        
+    def test_binary_long_strings_and_containers(self):
+        for size in (31, 32, 255, 256, 65535, 65536):
+            text = "x" * size
+            self.assertEqual(BINARY_CODEC.decode(BINARY_CODEC.encode({"s": text}))["s"], text)
+            
+        values = list(range(70000))
+        self.assertEqual(BINARY_CODEC.decode(BINARY_CODEC.encode({"v": values}))["v"], values)
+        
+    def test_binary_errors(self):
+        encoded = BINARY_CODEC.encode({"type": "ping"})
+        
+        with self.assertRaises(CodecError):
+            BINARY_CODEC.decode(encoded[:-1])
+        with self.assertRaises(CodecError):
+            BINARY_CODEC.decode(encoded + b"\x00")
+        with self.assertRaises(CodecError):
+            BINARY_CODEC.encode({"value": object()})
+        with self.assertRaises(CodecError):
+            BINARY_CODEC.encode({"value": 2 ** 64})
+            
+        # A map keyed by an array, and arrays nested far past the limit.
+        with self.assertRaises(CodecError):
+            BINARY_CODEC.decode(b"\x81\x91\x01\x01")
+        with self.assertRaises(CodecError):
+            BINARY_CODEC.decode(b"\x81\xa1a" + b"\x91" * 100000 + b"\xc0")
+        nested = {"a": None}
+        for _ in range(MAX_DEPTH - 1):
+            nested = {"a": nested}
+        self.assertEqual(BINARY_CODEC.decode(BINARY_CODEC.encode(nested)), nested)
+        with self.assertRaises(CodecError):
+            BINARY_CODEC.decode(BINARY_CODEC.encode({"a": nested}))
+            
+    def test_json_codec(self):
+        encoded = JSON_CODEC.encode({"type": "ping"})
+        self.assertEqual(json.loads(encoded), {"type": "ping"})
+        self.assertEqual(JSON_CODEC.decode(encoded), {"type": "ping"})
+        
+        with self.assertRaises(CodecError):
+            JSON_CODEC.decode(b'{"type": ')
+        with mock.patch.object(codec, "orjson", None), self.assertRaises(CodecError):
+            JSON_CODEC.decode(b'{"a": ' + b'[' * 100000 + b']' * 100000 + b'}')
+            
+    def test_detection(self):
+        self.assertIs(detect_codec(b'{"type": "ping"}'), JSON_CODEC)
+        self.assertIs(detect_codec(BINARY_CODEC.encode({"type": "ping"})), BINARY_CODEC)
+        self.assertEqual(decode_message(BINARY_CODEC.encode({"a": 1})), {"a": 1})
+        self.assertEqual(decode_message(b' {"a": 1}'), {"a": 1})
+        
+    def test_negotiation(self):
+        self.assertIs(negotiate_codec(["binary", "json"]), BINARY_CODEC)
+        self.assertIs(negotiate_codec(["binary", "json"], binary_safe=False), JSON_CODEC)
+        self.assertIs(negotiate_codec(["unknown"]), JSON_CODEC)
+        self.assertIs(negotiate_codec(None), JSON_CODEC)
+        self.assertIs(get_codec("binary"), BINARY_CODEC)
+        
+        with self.assertRaises(ValueError):
+            get_codec("xml")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import threading
+import time
+from client import TCPClient
+from codec import JSON_CODEC
+from compression import (SHARED_DICTIONARY, CompressionError, Compressor, Decompressor, compress_standalone,
+                         is_compressed, negotiate_compression)
+from server import TCPServer
+
+class TestCompression(unittest.TestCase):
+    def test_small_payloads_stay_raw(self):
+        compressor = Compressor(threshold=256)
+        payload = b'{"type":"ping"}'
+        self.assertEqual(compressor.compress(payload), payload)
+        self.assertFalse(is_compressed(payload))
+
+    def test_stream_round_trip(self):
+        compressor = Compressor(threshold=0)
+        decompressor = Decompressor()
+        payloads = [b'{"type":"broadcast","sender":"admin","content":"%d"}' % i * 8 for i in range(20)]
+        frames = [compressor.compress(payload) for payload in payloads]
+        self.assertTrue(all(is_compressed(frame) for frame in frames))
+        self.assertLess(len(frames[-1]), len(frames[0]))
+        self.assertEqual([decompressor.decompress(frame) for frame in frames], payloads)
+
+    def test_standalone_frames_mix_with_stream(self):
+        compressor = Compressor(threshold=0)
+        decompressor = Decompressor()
+        payload = b'{"type":"broadcast","content":"' + b'x' * 500 + b'"}'
+        self.assertEqual(decompressor.decompress(compressor.compress(payload)), payload)
+        self.assertEqual(decompressor.decompress(compress_standalone(payload)), payload)
+        self.assertEqual(decompressor.decompress(compressor.compress(payload)), payload)
+
+    def test_decompressed_size_is_bounded(self):
+        decompressor = Decompressor(max_size=1024)
+        with self.assertRaises(CompressionError):
+            decompressor.decompress(compress_standalone(b'a' * 4096))
+        with self.assertRaises(CompressionError):
+            Decompressor().decompress(b'\x02not deflate')
+
+    def test_dictionary_covers_server_frames(self):
+        # Each frame's fixed part, up to its first variable value.
+        frames = [
+            ({"type": "broadcast", "sender": "admin", "content": "hi", "timestamp": 1.0}, b'"admin"'),
+            ({"type": "private_message", "sender": "admin", "content": "hi", "timestamp": 1.0}, b'"admin"'),
+            ({"type": "channel_message", "channel": "news", "sender": "admin"}, b'"news"'),
+            ({"type": "message_response", "success": True, "message": "Broadcast sent to 3 clients"}, b'3'),
+            ({"type": "message_response", "success": True, "message": "Private message sent to bob"}, b'bob'),
+            ({"type": "pong", "timestamp": 1.0}, b'1.0'),
+            ({"type": "keepalive", "timestamp": 1.0}, b'1.0'),
+            ({"type": "auth_response", "success": True, "message": "Authentication successful",
+              "username": "admin"}, b'"admin"'),
+            ({"type": "subscribe_response", "success": True, "channel": "news"}, b'"news"'),
+            ({"type": "command_response", "command": "list_clients"}, b'"list_clients"'),
+        ]
+        for message, variable in frames:
+            frame = JSON_CODEC.encode(message)
+            self.assertIn(frame[:frame.index(variable)], SHARED_DICTIONARY)
+        self.assertIn(JSON_CODEC.encode({"type": "error", "message": "Authentication required"}), SHARED_DICTIONARY)
+
+    def test_negotiation(self):
+        self.assertEqual(negotiate_compression(["brotli", "zlib"]), "zlib")
+        self.assertIsNone(negotiate_compression(["brotli"]))
+        self.assertIsNone(negotiate_compression(["zlib"], binary_safe=False))
+
+class TestServerCompression(unittest.TestCase):
+    def setUp(self):
+        self.server = TCPServer(host="127.0.0.1", port=8096, max_clients=10, admin_password="admin123")
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1)
+
+    def tearDown(self):
+        self.server.stop()
+        time.sleep(0.5)
+
+    def test_compressed_broadcast(self):
+        sender = TCPClient(host="127.0.0.1", port=8096, timeout=5, compression="zlib")
+        compressed = TCPClient(host="127.0.0.1", port=8096, timeout=5, compression="zlib")
+        plain = TCPClient(host="127.0.0.1", port=8096, timeout=5)
+        content = "market update " * 100
+        try:
+            for client in (sender, compressed, plain):
+                self.assertTrue(client.connect())
+                self.assertTrue(client.authenticate("admin", "admin123"))
+            self.assertIsNotNone(sender.compressor)
+            self.assertIsNone(plain.compressor)
+
+            self.assertTrue(sender.send_broadcast_message(content))
+            for client in (compressed, plain):
+                push = client.receive_push(timeout=5)
+                self.assertEqual(push["content"], content)
+
+            clients = sender.execute_command('list_clients')
+            self.assertEqual(len(clients), 3)
+            address = "%s:%d" % sender.socket.getsockname()
+            entry = next(entry for entry in clients if entry["address"] == address)
+            self.assertLess(entry["bytes_received"], len(content))
+        finally:
+            for client in (sender, compressed, plain):
+                client.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
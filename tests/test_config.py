@@ -0,0 +1,73 @@
+import unittest
+import json
+import os
+import shutil
+import socket
+import tempfile
+from config import settings
+from config.settings import ClientConfig, ConfigManager, ServerConfig
+from client import TCPClient
+from selector_server import SelectorTCPServer
+from server import TCPServer
+
+class TestConfig(unittest.TestCase):
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.config_dir, "config.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+
+    def test_manager_is_created_lazily(self):
+        settings._config_manager = None
+        self.assertIsNone(settings._config_manager)
+        manager = settings.config_manager
+        self.assertIsInstance(manager, ConfigManager)
+        self.assertIs(settings.get_config_manager(), manager)
+
+    def test_load_config_file(self):
+        with open(self.config_file, 'w') as f:
+            json.dump({"server": {"port": 9001, "backlog": 512}, "client": {"buffer_size": 65536}}, f)
+
+        manager = ConfigManager(self.config_file)
+        self.assertEqual(manager.get_server_config().port, 9001)
+        self.assertEqual(manager.get_server_config().backlog, 512)
+        self.assertEqual(manager.get_client_config().buffer_size, 65536)
+
+    def test_server_from_config(self):
+        config = ServerConfig(port=9002, buffer_size=65536, backlog=256, worker_threads=3,
+                              socket_recv_buffer=131072, max_batch_size=10, timeout=45,
+                              admin_password="secret")
+        server = TCPServer.from_config(config, max_clients=5)
+        self.assertEqual(server.port, 9002)
+        self.assertEqual(server.idle_timeout, 45)
+        self.assertEqual(server.buffer_size, 65536)
+        self.assertEqual(server.backlog, 256)
+        self.assertEqual(server.max_clients, 5)
+        self.assertEqual(server.max_batch_size, 10)
+        self.assertEqual(server.create_decoder().buffer_size, 65536)
+
+        server_socket = server.create_server_socket()
+        try:
+            self.assertGreaterEqual(server_socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF), 131072)
+        finally:
+            server_socket.close()
+
+        self.assertEqual(SelectorTCPServer.from_config(config).worker_threads, 3)
+
+    def test_client_from_config(self):
+        config = ClientConfig(port=9003, buffer_size=8192, framing="newline", socket_send_buffer=65536)
+        client = TCPClient.from_config(config, timeout=5)
+        self.assertEqual(client.port, 9003)
+        self.assertEqual(client.timeout, 5)
+        self.assertEqual(client.framing.name, "newline")
+
+        client_socket = client.create_socket()
+        try:
+            self.assertEqual(client_socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY), 1)
+            self.assertGreaterEqual(client_socket.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF), 65536)
+        finally:
+            client_socket.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import json
+import socket
+from framing import (
+    FrameDecoder, FramingError, LengthPrefixFraming, NewlineFraming,
+    get_framing, detect_framing
+)
+
+class TestFraming(unittest.TestCase):
+    def test_length_prefix_round_trip(self):
+        framing = LengthPrefixFraming()
+        decoder = FrameDecoder(framing)
+        payloads = [b'{"type": "ping"}', b'', b'x' * 10000]
+        
+        data = b''.join(framing.encode(payload) for payload in payloads)
+        self.assertEqual(decoder.feed(data), payloads)
+        self.assertEqual(decoder.pending, 0)
+        
+    def test_length_prefix_split_reads(self):
+        framing = LengthPrefixFraming()
+        decoder = FrameDecoder(framing, buffer_size=8)
+        data = framing.encode(b'hello world') + framing.encode(b'again')
+        
+        frames = []
+        for i in range(len(data)):
+            frames.extend(decoder.feed(data[i:i + 1]))
+            
+        self.assertEqual(frames, [b'hello world', b'again'])
+        
+    def test_length_prefix_limit(self):
+        framing = LengthPrefixFraming()
+        decoder = FrameDecoder(framing, max_frame_size=4)
+        
+        with self.assertRaises(FramingError):
+            decoder.feed(framing.encode(b'too large'))
+            
+    def test_newline_framing(self):
+        decoder = FrameDecoder(NewlineFraming())
+        
+        self.assertEqual(decoder.feed(b'{"a": 1}\n{"b"'), [b'{"a": 1}'])
+        self.assertEqual(decoder.feed(b': 2}\r\n\n'), [b'{"b": 2}'])
+        
+    def test_newline_unterminated_legacy_message(self):
+        decoder = FrameDecoder(NewlineFraming())
+        
+        self.assertEqual(decoder.feed(b'{"type": "ping"'), [])
+        self.assertEqual(decoder.feed(b'}'), [b'{"type": "ping"}'])
+        
+        strict = FrameDecoder(NewlineFraming(allow_unterminated=False))
+        self.assertEqual(strict.feed(b'{"type": "ping"}'), [])
+        
+    def test_auto_detection(self):
+        self.assertIsNone(get_framing("auto"))
+        self.assertIsInstance(detect_framing(0), LengthPrefixFraming)
+        self.assertIsInstance(detect_framing(ord('{')), NewlineFraming)
+        
+        decoder = FrameDecoder()
+        frames = decoder.feed(get_framing("length").encode(json.dumps({"type": "ping"}).encode('utf-8')))
+        self.assertIsInstance(decoder.framing, LengthPrefixFraming)
+        self.assertEqual(json.loads(frames[0]), {"type": "ping"})
+        
+    def test_recv_from_socket(self):
+        framing = LengthPrefixFraming()
+        left, right = socket.socketpair()
+        try:
+            decoder = FrameDecoder(framing, buffer_size=16)
+            left.sendall(framing.encode(b'a' * 40) + framing.encode(b'b'))
+            
+            frames = []
+            while len(frames) < 2:
+                frames.extend(decoder.recv_from(right))
+            self.assertEqual(frames, [b'a' * 40, b'b'])
+            
+            left.close()
+            self.assertIsNone(decoder.recv_from(right))
+        finally:
+            right.close()
+
+if __name__ == '__main__':
+    unittest.main()
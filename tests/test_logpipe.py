@@ -0,0 +1,61 @@
+import unittest
+import io
+import logging
+import os
+import queue
+import shutil
+import tempfile
+from logpipe import (SAMPLED, BatchedRotatingFileHandler, BatchedStreamHandler, DeferredQueueHandler,
+                     LogPipeline, SampleFilter)
+
+class TestLogPipeline(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.log_dir, "server.log")
+        self.logger = logging.getLogger("tests.logpipe")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        self.logger.handlers.clear()
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+
+    def test_sampling_keeps_one_in_n(self):
+        sample = SampleFilter(every=10)
+        record = lambda msg, extra: self.logger.makeRecord(self.logger.name, logging.INFO, __file__, 0, msg,
+                                                           (), None, extra=extra)
+        kept = sum(sample.filter(record("sent %s", SAMPLED)) for _ in range(100))
+        self.assertEqual(kept, 10)
+        self.assertTrue(all(sample.filter(record("connected %s", None)) for _ in range(5)))
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = DeferredQueueHandler(queue.Queue(maxsize=2))
+        self.logger.addHandler(handler)
+        for index in range(5):
+            self.logger.info("event %d", index)
+        self.assertEqual(handler.dropped, 3)
+        record = handler.queue.get_nowait()
+        self.assertEqual(record.args, (0,))
+
+    def test_pipeline_writes_and_rotates(self):
+        stream = io.StringIO()
+        handlers = [BatchedRotatingFileHandler(self.log_file, maxBytes=2000, backupCount=2),
+                    BatchedStreamHandler(stream)]
+        pipeline = LogPipeline(handlers, batch_size=16, sample_every=5)
+        self.logger.addHandler(pipeline.handler)
+        pipeline.start()
+        for index in range(100):
+            self.logger.info("client %d connected", index)
+            self.logger.info("ping %d", index, extra=SAMPLED)
+        pipeline.stop()
+        for handler in handlers:
+            handler.close()
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 120)
+        self.assertEqual([line for line in lines if line.startswith("ping")],
+                         [f"ping {index}" for index in range(0, 100, 5)])
+        self.assertTrue(os.path.exists(self.log_file + ".1"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from auth import MemoryUserStore
+from client import TCPClient
+from messagelog import MessageLog
+from server import TCPServer
+
+class TestMessageLog(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+
+    def test_group_commit(self):
+        log = MessageLog(self.log_dir, flush_interval=0.01)
+        try:
+            def write(sender):
+                for index in range(25):
+                    log.append("bob", {"sender": sender, "index": index})
+
+            threads = [threading.Thread(target=write, args=(sender,)) for sender in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            snapshot = log.snapshot()
+            self.assertEqual(snapshot["appended"], 200)
+            self.assertLess(snapshot["fsyncs"], 200)
+            self.assertEqual(log.pending_count("bob"), 200)
+        finally:
+            log.close()
+
+    def test_recovery_skips_acked_and_torn_records(self):
+        log = MessageLog(self.log_dir, segment_bytes=512)
+        for index in range(20):
+            log.append("bob", {"index": index})
+        offsets = log.claim("bob")
+        log.ack("bob", offsets[:10])
+        log.requeue("bob", offsets[10:])
+        self.assertGreater(log.snapshot()["segments"], 1)
+        log.close()
+
+        last_segment = sorted(os.listdir(self.log_dir))[-1]
+        with open(os.path.join(self.log_dir, last_segment), "ab") as f:
+            f.write(b"\x00\x00\x00\x10torn")
+
+        log = MessageLog(self.log_dir, segment_bytes=512)
+        try:
+            offsets = log.claim("bob")
+            self.assertEqual([log.read(offset)["index"] for offset in offsets], list(range(10, 20)))
+            self.assertEqual(log.append("bob", {"index": 20}), offsets[-1] + 2)
+        finally:
+            log.close()
+
+    def test_recovery_keeps_requeued_offsets_below_an_ack(self):
+        # One login requeues what it could not deliver while another delivers
+        # later messages; the earlier ones must survive a restart.
+        log = MessageLog(self.log_dir)
+        for index in range(3):
+            log.append("bob", {"index": index})
+        first = log.claim("bob")
+        log.append("bob", {"index": 3})
+        second = log.claim("bob")
+        log.requeue("bob", first)
+        log.ack("bob", second)
+        log.close()
+
+        log = MessageLog(self.log_dir)
+        try:
+            self.assertEqual([log.read(offset)["index"] for offset in log.claim("bob")], [0, 1, 2])
+        finally:
+            log.close()
+
+    def test_retention_drops_old_segments(self):
+        log = MessageLog(self.log_dir, segment_bytes=256, retention_bytes=1024)
+        try:
+            for index in range(100):
+                log.append("bob", {"index": index}, sync=False)
+            snapshot = log.snapshot()
+            self.assertLessEqual(snapshot["bytes"], 1024 + 256)
+            self.assertGreater(snapshot["expired"], 0)
+            self.assertEqual(snapshot["pending"], 100 - snapshot["expired"])
+            self.assertEqual(log.read(log.claim("bob")[-1])["index"], 99)
+        finally:
+            log.close()
+
+class TestServerOfflineDelivery(unittest.TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.users = MemoryUserStore({"admin": "admin123", "bob": "builder"})
+        self.server = None
+
+    def tearDown(self):
+        self.stop_server()
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+
+    def start_server(self):
+        self.server = TCPServer(host="127.0.0.1", port=8098, max_clients=10, user_store=self.users,
+                                message_log_dir=self.log_dir)
+        threading.Thread(target=self.server.start, daemon=True).start()
+        time.sleep(1)
+
+    def stop_server(self):
+        if self.server:
+            self.server.stop()
+            self.server = None
+            time.sleep(0.5)
+
+    def connect(self, username: str, password: str) -> TCPClient:
+        client = TCPClient(host="127.0.0.1", port=8098, timeout=5)
+        self.assertTrue(client.connect())
+        self.assertTrue(client.authenticate(username, password))
+        return client
+
+    def test_offline_messages_survive_restart(self):
+        self.start_server()
+        sender = self.connect("admin", "admin123")
+        try:
+            self.assertTrue(sender.send_private_message("bob", "first"))
+            self.assertTrue(sender.send_private_message("bob", "second"))
+            self.assertFalse(sender.send_private_message("nobody", "lost"))
+        finally:
+            sender.disconnect()
+        self.stop_server()
+
+        self.start_server()
+        bob = self.connect("bob", "builder")
+        try:
+            contents = [bob.receive_push(timeout=5)["content"] for _ in range(2)]
+            self.assertEqual(contents, ["first", "second"])
+        finally:
+            bob.disconnect()
+        self.stop_server()
+
+        self.start_server()
+        bob = self.connect("bob", "builder")
+        try:
+            self.assertIsNone(bob.receive_push(timeout=0.5))
+            self.assertEqual(self.server.message_log.snapshot()["pending"], 0)
+        finally:
+            bob.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
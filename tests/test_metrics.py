@@ -0,0 +1,88 @@
+import unittest
+import threading
+import time
+import urllib.request
+from client import TCPClient
+from metrics import Histogram, MetricsRegistry, bucket_bounds, bucket_index
+from server import TCPServer
+
+class TestMetrics(unittest.TestCase):
+    def test_buckets_cover_values(self):
+        for value in list(range(0, 5000)) + [10 ** 6, 2 ** 30 + 12345]:
+            low, high = bucket_bounds(bucket_index(value))
+            self.assertLessEqual(low, value)
+            self.assertGreaterEqual(high, value)
+            self.assertLessEqual(high - low, max(1, value // 8))
+
+    def test_histogram_quantiles(self):
+        histogram = Histogram()
+        for millis in range(1, 1001):
+            histogram.observe(millis / 1000)
+        summary = histogram.summary()
+        self.assertEqual(summary["count"], 1000)
+        self.assertAlmostEqual(summary["p50"], 0.5, delta=0.5 * 0.07)
+        self.assertAlmostEqual(summary["p90"], 0.9, delta=0.9 * 0.07)
+        self.assertEqual(summary["max"], 1.0)
+
+    def test_counter_across_threads(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("events_total", "Events")
+
+        def bump():
+            for _ in range(1000):
+                counter.inc()
+
+        threads = [threading.Thread(target=bump) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counter.value(), 8000)
+
+    def test_render(self):
+        registry = MetricsRegistry()
+        registry.counter("messages_total", "Messages", ("type",)).labels('pi"ng').inc(3)
+        registry.histogram("message_seconds", "Latency").observe(0.002)
+        text = registry.render()
+        self.assertIn('# TYPE tcp_server_messages_total counter', text)
+        self.assertIn('tcp_server_messages_total{type="pi\\"ng"} 3', text)
+        self.assertIn('tcp_server_message_seconds{quantile="0.99"}', text)
+        self.assertIn('tcp_server_message_seconds_count 1', text)
+
+class TestServerMetrics(unittest.TestCase):
+    def setUp(self):
+        self.server = TCPServer(host="127.0.0.1", port=8095, max_clients=10, metrics_port=0, admin_password="admin123")
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1)
+
+    def tearDown(self):
+        self.server.stop()
+        time.sleep(0.5)
+
+    def test_metrics_command_and_endpoint(self):
+        client = TCPClient(host="127.0.0.1", port=8095, timeout=5)
+        try:
+            self.assertTrue(client.connect())
+            self.assertTrue(client.authenticate("admin", "admin123"))
+            self.assertTrue(client.ping_server())
+            self.assertTrue(client.send_broadcast_message("hello"))
+
+            data = client.execute_command('metrics')
+            self.assertEqual(data["connections_accepted_total"], 1)
+            self.assertEqual(data["connected_clients"], 1)
+            self.assertEqual(data["messages_total"]["ping"], 1)
+            self.assertEqual(data["auth_attempts_total"]["password,success"], 1)
+            self.assertEqual(data["fanout_recipients"]["count"], 1)
+
+            url = f"http://127.0.0.1:{self.server.metrics_server.port}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                text = response.read().decode('utf-8')
+            self.assertIn('tcp_server_messages_total{type="message"} 1', text)
+            self.assertIn('tcp_server_message_seconds_count{type="ping"} 1', text)
+        finally:
+            client.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+import io
+import socket
+import threading
+from types import SimpleNamespace
+from outbound import (
+    ClientWriter, FanoutStats, OutboundQueue, SlowConsumerError,
+    DROP_NEWEST, DROP_OLDEST, DISCONNECT, IOV_MAX, send_batch, send_frames
+)
+from framing import FrameDecoder, FRAMINGS
+from transfer import FileRegion, is_chunk, parse_chunk
+
+class TestOutbound(unittest.TestCase):
+    def test_queue_batches_frames(self):
+        queue = OutboundQueue()
+        self.assertTrue(queue.put(b'one'))
+        self.assertTrue(queue.put(b'two'))
+        self.assertEqual(queue.queued_bytes, 6)
+        
+        self.assertEqual(queue.get_batch(), [b'one', b'two'])
+        queue.sent(6)
+        self.assertEqual(queue.queued_bytes, 0)
+        self.assertEqual(queue.get_batch(timeout=0.01), [])
+        
+    def test_closed_queue_rejects_frames(self):
+        queue = OutboundQueue()
+        queue.close()
+        
+        with self.assertRaises(ConnectionError):
+            queue.put(b'frame')
+        self.assertEqual(queue.get_batch(), [])
+        
+    def test_drop_newest_policy(self):
+        queue = OutboundQueue(high_watermark=10, low_watermark=4, policy=DROP_NEWEST)
+        self.assertTrue(queue.put(b'12345678'))
+        self.assertFalse(queue.put(b'abc'))
+        self.assertEqual(queue.dropped_frames, 1)
+        
+        batch = queue.get_batch()
+        self.assertFalse(queue.put(b'abc'))
+        queue.sent(sum(len(frame) for frame in batch))
+        self.assertFalse(queue.congested)
+        self.assertTrue(queue.put(b'abc'))
+        
+    def test_drop_oldest_policy(self):
+        queue = OutboundQueue(high_watermark=10, low_watermark=6, policy=DROP_OLDEST)
+        for frame in (b'aaa', b'bbb', b'ccc'):
+            self.assertTrue(queue.put(frame))
+        self.assertTrue(queue.put(b'ddd'))
+        
+        self.assertEqual(queue.get_batch(), [b'ccc', b'ddd'])
+        self.assertEqual(queue.dropped_frames, 2)
+        
+    def test_drop_oldest_keeps_file_regions(self):
+        queue = OutboundQueue(high_watermark=10, low_watermark=6, policy=DROP_OLDEST)
+        region = FileRegion(io.BytesIO(bytes(4096)), 1, 0, 4096)
+        for frame in (b'aaa', region, b'bbb', b'ccc'):
+            self.assertTrue(queue.put(frame))
+        self.assertTrue(queue.put(b'ddd'))
+        
+        self.assertEqual(queue.get_batch(), [region, b'ccc', b'ddd'])
+        self.assertEqual(queue.dropped_frames, 2)
+        
+    def test_file_regions_interleave_with_frames(self):
+        region = FileRegion(io.BytesIO(bytes(300)), 1, 0, 300, chunk_size=100)
+        sender, receiver = socket.socketpair()
+        try:
+            self.assertEqual(send_batch(sender, [region, b'\x00\x00\x00\x01x']), [region])
+            self.assertEqual(send_batch(sender, [region]), [region])
+            self.assertEqual(send_batch(sender, [region]), [])
+            self.assertTrue(region.file.closed)
+            
+            sender.close()
+            received = b''.join(iter(lambda: receiver.recv(65536), b''))
+        finally:
+            receiver.close()
+        frames = FrameDecoder(FRAMINGS["length"]).feed(received)
+        self.assertEqual([frame if not is_chunk(frame) else parse_chunk(frame)[1] for frame in frames],
+                         [0, b'x', 100, 200])
+        
+        queue = OutboundQueue(high_watermark=10, low_watermark=4)
+        queue.put(b'12345678')
+        queue.requeue([region])
+        self.assertEqual(queue.get_batch(), [b'12345678', region])
+        
+    def test_disconnect_policy(self):
+        queue = OutboundQueue(high_watermark=10, low_watermark=4, policy=DISCONNECT)
+        queue.put(b'12345678')
+        
+        with self.assertRaises(SlowConsumerError):
+            queue.put(b'abc')
+            
+    def test_invalid_configuration(self):
+        with self.assertRaises(ValueError):
+            OutboundQueue(policy="block")
+        with self.assertRaises(ValueError):
+            OutboundQueue(high_watermark=10, low_watermark=20)
+        
+    def test_writer_drains_shared_frame(self):
+        left, right = socket.socketpair()
+        errors = []
+        try:
+            client = SimpleNamespace(id="client_1", socket=left, outbound=OutboundQueue())
+            writer = ClientWriter(client, lambda client_id, error: errors.append(error))
+            writer.start()
+            
+            frame = b'shared frame'
+            client.outbound.put(frame)
+            client.outbound.put(frame)
+            
+            received = b''
+            right.settimeout(5)
+            while len(received) < 2 * len(frame):
+                received += right.recv(4096)
+                
+            self.assertEqual(received, frame * 2)
+            client.outbound.close()
+            writer.join(timeout=5)
+            self.assertFalse(writer.is_alive())
+            self.assertEqual(errors, [])
+        finally:
+            left.close()
+            right.close()
+            
+    def test_send_frames_handles_partial_writes(self):
+        left, right = socket.socketpair()
+        try:
+            frames = [bytes([i % 256]) * (i % 7) for i in range(IOV_MAX + 50)] + [b'x' * 1024 * 1024]
+            expected = b''.join(frames)
+            received = bytearray()
+            
+            def read_all():
+                right.settimeout(5)
+                while len(received) < len(expected):
+                    received.extend(right.recv(65536))
+                    
+            reader = threading.Thread(target=read_all)
+            reader.start()
+            send_frames(left, frames)
+            reader.join(timeout=5)
+            self.assertEqual(bytes(received), expected)
+        finally:
+            left.close()
+            right.close()
+            
+    def test_fanout_stats(self):
+        stats = FanoutStats()
+        stats.record(10, 0.002)
+        stats.record(20, 0.004)
+        
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["fanouts"], 2)
+        self.assertEqual(snapshot["recipients"], 30)
+        self.assertAlmostEqual(snapshot["avg_ms"], 3.0)
+        self.assertAlmostEqual(snapshot["max_ms"], 4.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import threading
+import time
+from client import TCPClient
+from ratelimit import DELAY, GcraLimiter, RateLimiter, RateLimitExceeded
+from server import TCPServer
+
+class TestRateLimiter(unittest.TestCase):
+    def test_gcra_burst_and_refill(self):
+        limiter = GcraLimiter(rate=2, burst=3)
+        for _ in range(3):
+            self.assertLessEqual(limiter.wait("a", 0.0), 0)
+            limiter.commit("a", 0.0)
+        self.assertAlmostEqual(limiter.wait("a", 0.0), 0.5)
+        self.assertLessEqual(limiter.wait("a", 0.5), 0)
+        self.assertLessEqual(limiter.wait("b", 0.0), 0)
+
+        limiter.release("a", 0.5)
+        self.assertIn("a", limiter.arrivals)
+        limiter.release("a", 2.0)
+        self.assertNotIn("a", limiter.arrivals)
+
+    def test_reject_does_not_charge_other_scopes(self):
+        limiter = RateLimiter(client=(100, 100), types={"broadcast": (1, 1)})
+        self.assertEqual(limiter.acquire("c1", None, "broadcast", now=0.0), 0.0)
+        with self.assertRaises(RateLimitExceeded) as raised:
+            limiter.acquire("c1", None, "broadcast", now=0.0)
+        self.assertEqual(raised.exception.scope, "broadcast")
+        self.assertAlmostEqual(raised.exception.retry_after, 1.0)
+
+        self.assertEqual(limiter.client.arrivals["c1"], 0.01)
+        self.assertEqual(limiter.acquire("c1", None, "ping", now=0.0), 0.0)
+        self.assertEqual(limiter.acquire("c2", None, "broadcast", now=0.0), 0.0)
+        self.assertEqual(limiter.snapshot()["rejected"], 1)
+
+    def test_user_limit_spans_sessions(self):
+        limiter = RateLimiter(username=(1, 2))
+        limiter.acquire("c1", "alice", "ping", now=0.0)
+        limiter.acquire("c2", "alice", "ping", now=0.0)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire("c3", "alice", "ping", now=0.0)
+        self.assertEqual(limiter.acquire("c3", "bob", "ping", now=0.0), 0.0)
+
+    def test_delay_action(self):
+        limiter = RateLimiter(client=(10, 1), action=DELAY, max_delay=0.25)
+        self.assertEqual(limiter.acquire("c1", None, "ping", now=0.0), 0.0)
+        self.assertAlmostEqual(limiter.acquire("c1", None, "ping", now=0.0), 0.1)
+        self.assertAlmostEqual(limiter.acquire("c1", None, "ping", now=0.0), 0.2)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire("c1", None, "ping", now=0.0)
+
+class TestServerRateLimit(unittest.TestCase):
+    def setUp(self):
+        self.server = TCPServer(host="127.0.0.1", port=8092, max_clients=10,
+                                type_rate_limits={"broadcast": [0.5, 2]}, admin_password="admin123")
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1)
+
+    def tearDown(self):
+        self.server.stop()
+        time.sleep(0.5)
+
+    def test_broadcast_flood_rejected(self):
+        client = TCPClient(host="127.0.0.1", port=8092, timeout=5)
+        try:
+            self.assertTrue(client.connect())
+            self.assertTrue(client.authenticate("admin", "admin123"))
+            self.assertTrue(client.send_broadcast_message("one"))
+            self.assertTrue(client.send_broadcast_message("two"))
+
+            response = client.send_message({"type": "message", "target": "broadcast", "content": "three"})
+            self.assertEqual(response['type'], 'error')
+            self.assertEqual(response['scope'], 'broadcast')
+            self.assertGreater(response['retry_after'], 0)
+            self.assertTrue(client.ping_server())
+        finally:
+            client.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
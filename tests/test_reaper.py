@@ -0,0 +1,117 @@
+import unittest
+import socket
+import threading
+import time
+from types import SimpleNamespace
+from client import TCPClient
+from reaper import IdleReaper, TimerWheel, configure_keepalive
+from server import TCPServer
+
+class TestTimerWheel(unittest.TestCase):
+    def test_timers_fire_across_levels(self):
+        wheel = TimerWheel(tick=1.0, slots=4, levels=3, now=0)
+        deadlines = {"a": 1, "b": 3, "c": 5, "d": 17, "e": 20, "f": 21, "g": 63, "h": 200}
+        for key, deadline in deadlines.items():
+            wheel.schedule(key, deadline)
+
+        fired = {}
+        for now in range(1, 201):
+            for key in wheel.advance(now):
+                fired[key] = now
+        self.assertEqual(fired, deadlines)
+        self.assertEqual(len(wheel), 0)
+
+    def test_cancel_and_reschedule(self):
+        wheel = TimerWheel(tick=0.5, now=0)
+        wheel.schedule("a", 2.0)
+        wheel.schedule("b", 2.0)
+        self.assertTrue(wheel.cancel("b"))
+        self.assertFalse(wheel.cancel("b"))
+        wheel.schedule("a", 10.0)
+
+        self.assertEqual(wheel.advance(5.0), [])
+        self.assertEqual(wheel.advance(10.0), ["a"])
+        self.assertNotIn("a", wheel)
+
+class TestIdleReaper(unittest.TestCase):
+    def test_pings_then_evicts(self):
+        activity = {"client_1": 0.0}
+        now = [0.0]
+        pinged, evicted = [], []
+        reaper = IdleReaper(
+            idle_timeout=10, ping_interval=4,
+            idle_seconds=lambda client: now[0] - activity[client.id],
+            on_idle=evicted.append, on_ping=pinged.append
+        )
+        client = SimpleNamespace(id="client_1")
+        start = time.monotonic()
+        reaper.track(client)
+
+        def poll(at: float):
+            now[0] = at
+            reaper.poll(start + at)
+
+        poll(5)
+        self.assertEqual(pinged, [client])
+        activity["client_1"] = 6.0
+        poll(9)
+        self.assertEqual(len(pinged), 1)
+        poll(11)
+        self.assertEqual(len(pinged), 2)
+        self.assertEqual(evicted, [])
+        poll(17)
+        self.assertEqual(evicted, [client])
+        self.assertEqual(reaper.snapshot()["tracked"], 0)
+
+    def test_keepalive_options(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            configure_keepalive(sock, idle=30)
+            self.assertEqual(sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE), 1)
+            if hasattr(socket, "TCP_KEEPIDLE"):
+                self.assertEqual(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE), 30)
+        finally:
+            sock.close()
+
+class TestServerIdleTimeout(unittest.TestCase):
+    def setUp(self):
+        self.server = TCPServer(host="127.0.0.1", port=8091, max_clients=10, idle_timeout=2.5, ping_interval=1,
+                                admin_password="admin123")
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1)
+
+    def tearDown(self):
+        self.server.stop()
+        time.sleep(0.5)
+
+    def test_idle_client_evicted_and_active_client_kept(self):
+        silent = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        client = TCPClient(host="127.0.0.1", port=8091, timeout=5)
+        try:
+            silent.settimeout(10)
+            silent.connect(("127.0.0.1", 8091))
+            silent.sendall(b'{"type": "ping"}\n')
+            self.assertTrue(client.connect())
+            self.assertTrue(client.ping_server())
+
+            data = b''
+            while True:
+                chunk = silent.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+            self.assertIn(b'keepalive', data)
+
+            time.sleep(1)
+            self.assertTrue(client.connected)
+            self.assertTrue(client.ping_server())
+            self.assertEqual(len(self.server.clients), 1)
+            self.assertEqual(self.server.reaper.evicted, 1)
+        finally:
+            silent.close()
+            client.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+import threading
+from types import SimpleNamespace
+from registry import ClientRegistry, SnapshotSet
+
+def make_client(client_id: str):
+    return SimpleNamespace(id=client_id, username=None, authenticated=False)
+
+class TestClientRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ClientRegistry(shard_count=4)
+        
+    def test_add_get_remove(self):
+        client = make_client("client_1")
+        self.registry.add(client)
+        
+        self.assertIn("client_1", self.registry)
+        self.assertIs(self.registry["client_1"], client)
+        self.assertEqual(len(self.registry), 1)
+        
+        self.assertIs(self.registry.remove("client_1"), client)
+        self.assertIsNone(self.registry.remove("client_1"))
+        self.assertNotIn("client_1", self.registry)
+        with self.assertRaises(KeyError):
+            self.registry["client_1"]
+            
+    def test_authenticate_indexes_sessions(self):
+        first = make_client("client_1")
+        second = make_client("client_2")
+        for client in (first, second):
+            self.registry.add(client)
+            self.registry.authenticate(client, "alice")
+            
+        self.assertEqual(self.registry.sessions("alice"), (first, second))
+        self.assertEqual(self.registry.authenticated_count(), 2)
+        
+        self.registry.authenticate(second, "bob")
+        self.assertEqual(self.registry.sessions("alice"), (first,))
+        self.assertEqual(self.registry.sessions("bob"), (second,))
+        self.assertEqual(self.registry.authenticated_count(), 2)
+        
+        self.registry.remove("client_1")
+        self.assertEqual(self.registry.sessions("alice"), ())
+        self.assertEqual(list(self.registry.iter_authenticated()), [second])
+        
+    def test_snapshot_set_rebuilds_once_per_batch(self):
+        members = SnapshotSet(threading.Lock())
+        clients = [make_client(f"client_{index}") for index in range(1000)]
+        for client in clients:
+            self.assertTrue(members.add(client))
+        self.assertFalse(members.add(clients[0]))
+        
+        snapshot = members.snapshot()
+        self.assertEqual(snapshot, tuple(clients))
+        self.assertIs(members.snapshot(), snapshot)
+        
+        self.assertTrue(members.discard(clients[0]))
+        self.assertFalse(members.discard(clients[0]))
+        self.assertEqual(members.snapshot(), tuple(clients[1:]))
+        self.assertEqual(len(snapshot), 1000)
+        
+    def test_iteration_survives_concurrent_removal(self):
+        clients = [make_client(f"client_{i}") for i in range(100)]
+        for client in clients:
+            self.registry.add(client)
+            self.registry.authenticate(client, "alice")
+            
+        seen = 0
+        for client in self.registry.iter_authenticated():
+            self.registry.remove(client.id)
+            seen += 1
+            
+        self.assertEqual(seen, 100)
+        self.assertEqual(len(self.registry), 0)
+        
+    def test_concurrent_ids_are_unique(self):
+        ids = []
+        lock = threading.Lock()
+        
+        def allocate():
+            allocated = [self.registry.next_id() for _ in range(1000)]
+            with lock:
+                ids.extend(allocated)
+                
+        threads = [threading.Thread(target=allocate) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+            
+        self.assertEqual(len(set(ids)), 8000)
+        
+    def test_concurrent_churn(self):
+        def churn(worker: int):
+            for i in range(500):
+                client = make_client(f"client_{worker}_{i}")
+                self.registry.add(client)
+                self.registry.authenticate(client, f"user_{i % 5}")
+                self.registry.remove(client.id)
+                
+        threads = [threading.Thread(target=churn, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+            
+        self.assertEqual(len(self.registry), 0)
+        self.assertEqual(self.registry.authenticated_count(), 0)
+        self.assertEqual(self.registry.sessions_by_username, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import socket
+import json
+import threading
+import time
+from selector_server import SelectorTCPServer
+from framing import FrameDecoder, LengthPrefixFraming
+
+class TestSelectorTCPServer(unittest.TestCase):
+    def setUp(self):
+        self.server = SelectorTCPServer(host="127.0.0.1", port=8085, max_clients=10, worker_threads=2,
+                                        admin_password="admin123")
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1)
+        
+    def tearDown(self):
+        self.server.stop()
+        self.server_thread.join(timeout=5)
+        
+    def connect(self) -> socket.socket:
+        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        client_socket.settimeout(5)
+        client_socket.connect(("127.0.0.1", 8085))
+        return client_socket
+        
+    def test_ping(self):
+        client_socket = self.connect()
+        try:
+            client_socket.send(json.dumps({"type": "ping"}).encode('utf-8'))
+            response_data = json.loads(client_socket.recv(4096).decode('utf-8'))
+            self.assertEqual(response_data.get('type'), 'pong')
+        finally:
+            client_socket.close()
+            
+    def test_pipelined_messages_keep_order(self):
+        client_socket = self.connect()
+        try:
+            framing = LengthPrefixFraming()
+            messages = [{"type": "ping"}, {"type": "bogus"}] * 50
+            client_socket.sendall(b''.join(framing.encode(json.dumps(m).encode('utf-8')) for m in messages))
+            
+            decoder = FrameDecoder()
+            frames = []
+            while len(frames) < len(messages):
+                frames.extend(decoder.recv_from(client_socket))
+                
+            types = [json.loads(frame)['type'] for frame in frames]
+            self.assertEqual(types, ['pong', 'error'] * 50)
+        finally:
+            client_socket.close()
+            
+    def test_broadcast_and_disconnect(self):
+        sender = self.connect()
+        receiver = self.connect()
+        try:
+            auth_message = {"type": "auth", "credentials": {"username": "admin", "password": "admin123"}}
+            for client_socket in (sender, receiver):
+                client_socket.send(json.dumps(auth_message).encode('utf-8'))
+                self.assertTrue(json.loads(client_socket.recv(4096).decode('utf-8'))['success'])
+                
+            sender.send(json.dumps({"type": "message", "target": "broadcast", "content": "hi"}).encode('utf-8'))
+            self.assertTrue(json.loads(sender.recv(4096).decode('utf-8'))['success'])
+            broadcast = json.loads(receiver.recv(4096).decode('utf-8'))
+            self.assertEqual(broadcast['content'], 'hi')
+            
+            receiver.close()
+            time.sleep(0.5)
+            self.assertEqual(len(self.server.clients), 1)
+            self.assertEqual(len(self.server.connections), 1)
+        finally:
+            sender.close()
+            receiver.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,11 +3,15 @@ import socket
 import json
 import threading
 import time
+from datetime import datetime
 from server import TCPServer
+from framing import FrameDecoder, LengthPrefixFraming
+from client import TCPClient
+from codec import BINARY_CODEC
 
 class TestTCPServer(unittest.TestCase):
     def setUp(self):
-        self.server = TCPServer(host="127.0.0.1", port=8081, max_clients=10)
+        self.server = TCPServer(host="127.0.0.1", port=8081, max_clients=10, admin_password="admin123")
         self.server_thread = threading.Thread(target=self.server.start)
         self.server_thread.daemon = True
         self.server_thread.start()
@@ -74,6 +78,194 @@ class TestTCPServer(unittest.TestCase):
             self.fail(f"Ping test failed: {e}")
         finally:
             client_socket.close()
+            
+    def test_length_prefixed_pipelining(self):
+        client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            client_socket.connect(("127.0.0.1", 8081))
+            framing = LengthPrefixFraming()
+            
+            ping = framing.encode(json.dumps({"type": "ping"}).encode('utf-8'))
+            client_socket.sendall(ping * 3)
+            
+            decoder = FrameDecoder()
+            frames = []
+            while len(frames) < 3:
+                frames.extend(decoder.recv_from(client_socket))
+                
+            self.assertIsInstance(decoder.framing, LengthPrefixFraming)
+            for frame in frames:
+                self.assertEqual(json.loads(frame).get('type'), 'pong')
+                
+        except Exception as e:
+            self.fail(f"Pipelining test failed: {e}")
+        finally:
+            client_socket.close()
+            
+    def test_broadcast_fanout(self):
+        sockets = []
+        try:
+            framing = LengthPrefixFraming()
+            decoders = []
+            auth_message = {
+                "type": "auth",
+                "credentials": {"username": "admin", "password": "admin123"}
+            }
+            
+            for _ in range(3):
+                client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                client_socket.settimeout(5)
+                client_socket.connect(("127.0.0.1", 8081))
+                client_socket.sendall(framing.encode(json.dumps(auth_message).encode('utf-8')))
+                decoder = FrameDecoder()
+                self.assertTrue(json.loads(decoder.recv_from(client_socket)[0])['success'])
+                sockets.append(client_socket)
+                decoders.append(decoder)
+                
+            broadcast = {"type": "message", "target": "broadcast", "content": "hello"}
+            sockets[0].sendall(framing.encode(json.dumps(broadcast).encode('utf-8')))
+            response = json.loads(decoders[0].recv_from(sockets[0])[0])
+            self.assertEqual(response['message'], "Broadcast sent to 2 clients")
+            
+            for client_socket, decoder in zip(sockets[1:], decoders[1:]):
+                message = json.loads(decoder.recv_from(client_socket)[0])
+                self.assertEqual(message['type'], 'broadcast')
+                self.assertEqual(message['content'], 'hello')
+                
+            self.assertEqual(self.server.fanout_stats.snapshot()['recipients'], 2)
+        finally:
+            for client_socket in sockets:
+                client_socket.close()
+            
+    def test_private_message_to_all_sessions(self):
+        sockets = []
+        try:
+            framing = LengthPrefixFraming()
+            decoders = []
+            auth_message = {
+                "type": "auth",
+                "credentials": {"username": "admin", "password": "admin123"}
+            }
+            
+            for _ in range(3):
+                client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                client_socket.settimeout(5)
+                client_socket.connect(("127.0.0.1", 8081))
+                client_socket.sendall(framing.encode(json.dumps(auth_message).encode('utf-8')))
+                decoder = FrameDecoder()
+                self.assertTrue(json.loads(decoder.recv_from(client_socket)[0])['success'])
+                sockets.append(client_socket)
+                decoders.append(decoder)
+                
+            self.assertEqual(len(self.server.get_sessions("admin")), 3)
+            
+            private = {"type": "message", "target": "admin", "content": "psst"}
+            sockets[0].sendall(framing.encode(json.dumps(private).encode('utf-8')))
+            self.assertTrue(json.loads(decoders[0].recv_from(sockets[0])[0])['success'])
+            
+            for client_socket, decoder in zip(sockets[1:], decoders[1:]):
+                message = json.loads(decoder.recv_from(client_socket)[0])
+                self.assertEqual(message['type'], 'private_message')
+                self.assertEqual(message['content'], 'psst')
+                
+            missing = {"type": "message", "target": "nobody", "content": "psst"}
+            sockets[0].sendall(framing.encode(json.dumps(missing).encode('utf-8')))
+            self.assertFalse(json.loads(decoders[0].recv_from(sockets[0])[0])['success'])
+            
+            sockets.pop().close()
+            time.sleep(0.5)
+            self.assertEqual(len(self.server.get_sessions("admin")), 2)
+            self.assertEqual(len(self.server.get_authenticated_clients()), 2)
+        finally:
+            for client_socket in sockets:
+                client_socket.close()
+            
+    def test_binary_codec_negotiation(self):
+        client = TCPClient(host="127.0.0.1", port=8081, timeout=5, codec="binary")
+        try:
+            self.assertTrue(client.connect())
+            self.assertTrue(client.authenticate("admin", "admin123"))
+            self.assertIs(client.codec, BINARY_CODEC)
+            self.assertTrue(client.ping_server())
+            
+            data = client.execute_command('list_clients')
+            self.assertEqual(data[0]['username'], 'admin')
+            
+            server_client = self.server.get_authenticated_clients()[0]
+            self.assertIs(server_client.codec, BINARY_CODEC)
+        finally:
+            client.disconnect()
 
+    def test_pipelined_requests_with_pushes(self):
+        sender = TCPClient(host="127.0.0.1", port=8081, timeout=5)
+        receiver = TCPClient(host="127.0.0.1", port=8081, timeout=5)
+        try:
+            self.assertTrue(sender.connect() and receiver.connect())
+            self.assertTrue(sender.authenticate("admin", "admin123"))
+            self.assertTrue(receiver.authenticate("admin", "admin123"))
+            
+            futures = [receiver.send_request({"type": "ping"}) for _ in range(200)]
+            self.assertTrue(sender.send_broadcast_message("hello"))
+            responses = [future.result(timeout=5) for future in futures]
+            
+            self.assertTrue(all(response['type'] == 'pong' for response in responses))
+            self.assertEqual(len({response['id'] for response in responses}), 200)
+            push = receiver.receive_push(timeout=5)
+            self.assertEqual(push['type'], 'broadcast')
+            self.assertEqual(push['content'], 'hello')
+            
+            responses = receiver.pipeline([{"type": "ping"}, {"type": "bogus"}, {"type": "ping"}])
+            self.assertEqual([r['type'] for r in responses], ['pong', 'error', 'pong'])
+        finally:
+            sender.disconnect()
+            receiver.disconnect()
+            
+    def test_batch_messages(self):
+        sender = TCPClient(host="127.0.0.1", port=8081, timeout=5)
+        receiver = TCPClient(host="127.0.0.1", port=8081, timeout=5)
+        try:
+            self.assertTrue(sender.connect() and receiver.connect())
+            self.assertTrue(receiver.authenticate("admin", "admin123"))
+            
+            responses = sender.send_batch([
+                {"type": "auth", "credentials": {"username": "admin", "password": "admin123"}},
+                {"type": "message", "target": "broadcast", "content": "one", "id": "a"},
+                {"type": "message", "target": "broadcast", "content": "two"},
+                {"type": "batch", "messages": []},
+                {"type": "ping"}
+            ])
+            
+            self.assertEqual([r['type'] for r in responses],
+                             ['auth_response', 'message_response', 'message_response', 'error', 'pong'])
+            self.assertEqual(responses[1]['id'], 'a')
+            self.assertEqual(receiver.receive_push(timeout=5)['content'], 'one')
+            self.assertEqual(receiver.receive_push(timeout=5)['content'], 'two')
+            
+            self.server.max_batch_size = 2
+            self.assertIsNone(sender.send_batch([{"type": "ping"}] * 3))
+        finally:
+            sender.disconnect()
+            receiver.disconnect()
+            
+    def test_list_clients_reports_counters(self):
+        client = TCPClient(host="127.0.0.1", port=8081, timeout=5)
+        try:
+            self.assertTrue(client.connect())
+            self.assertTrue(client.authenticate("admin", "admin123"))
+            self.assertTrue(client.ping_server())
+            
+            entries = client.execute_command('list_clients')
+            self.assertEqual(len(entries), 1)
+            self.assertEqual(entries[0]['messages_received'], 3)
+            self.assertEqual(entries[0]['messages_sent'], 2)
+            self.assertGreater(entries[0]['bytes_received'], 0)
+            self.assertLess(entries[0]['idle_seconds'], 5)
+            self.assertAlmostEqual(datetime.fromisoformat(entries[0]['connected_at']).timestamp(), time.time(), delta=10)
+            
+            server_client = next(iter(self.server.clients.values()))
+            self.assertFalse(hasattr(server_client, '__dict__'))
+        finally:
+            client.disconnect()
+            
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
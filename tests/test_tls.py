@@ -0,0 +1,76 @@
+import unittest
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from client import TCPClient
+from server import TCPServer
+from tls import client_context
+
+class TestTLS(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        if shutil.which("openssl") is None:
+            raise unittest.SkipTest("openssl is not available")
+        cls.cert_dir = tempfile.mkdtemp()
+        cls.cert_file = os.path.join(cls.cert_dir, "cert.pem")
+        cls.key_file = os.path.join(cls.cert_dir, "key.pem")
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=localhost",
+             "-keyout", cls.key_file, "-out", cls.cert_file],
+            check=True, capture_output=True
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.cert_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.server = TCPServer(host="127.0.0.1", port=8094, max_clients=10, enable_ssl=True,
+                                cert_file=self.cert_file, key_file=self.key_file, handshake_timeout=1,
+                                admin_password="admin123")
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1)
+
+    def tearDown(self):
+        self.server.stop()
+        time.sleep(0.5)
+
+    def test_stalled_handshake_does_not_block_accept(self):
+        stalled = socket.create_connection(("127.0.0.1", 8094))
+        client = TCPClient(host="127.0.0.1", port=8094, enable_ssl=True, verify_ssl=False, timeout=5)
+        try:
+            self.assertTrue(client.connect())
+            self.assertTrue(client.authenticate("admin", "admin123"))
+            self.assertTrue(client.ping_server())
+            time.sleep(1.5)
+            self.assertEqual(self.server.tls_stats.snapshot()["failed"], 1)
+        finally:
+            stalled.close()
+            client.disconnect()
+
+    def test_reconnect_resumes_tls_session(self):
+        client = TCPClient(host="127.0.0.1", port=8094, enable_ssl=True, verify_ssl=False, timeout=5)
+        try:
+            self.assertTrue(client.connect())
+            self.assertTrue(client.ping_server())
+            client.disconnect()
+            self.assertIsNotNone(client.tls_session)
+
+            self.assertTrue(client.connect())
+            self.assertTrue(client.ping_server())
+            self.assertTrue(client.socket.session_reused)
+            self.assertEqual(client.tls_stats.snapshot()["resumed"], 1)
+        finally:
+            client.disconnect()
+
+        self.assertIs(client_context(False), client_context(False))
+        self.assertIs(self.server.create_ssl_context(), self.server.create_ssl_context())
+
+if __name__ == '__main__':
+    unittest.main()
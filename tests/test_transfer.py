@@ -0,0 +1,182 @@
+import unittest
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from client import TCPClient
+from server import TCPServer
+from transfer import ChecksumCache, FileRegion, IncomingFile, chunk_header, is_chunk, parse_chunk, valid_name
+from framing import FrameDecoder, FRAMINGS
+from utils import calculate_checksum, format_checksum
+
+class TestTransfer(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def test_chunk_frames(self):
+        decoder = FrameDecoder(FRAMINGS["length"])
+        frames = decoder.feed(chunk_header(7, 4096, 5) + b"hello")
+        self.assertTrue(is_chunk(frames[0]))
+        transfer_id, offset, data = parse_chunk(frames[0])
+        self.assertEqual((transfer_id, offset, bytes(data)), (7, 4096, b"hello"))
+
+    def test_valid_name(self):
+        self.assertTrue(valid_name("report.pdf"))
+        self.assertFalse(valid_name("../etc/passwd"))
+        self.assertFalse(valid_name(".hidden"))
+        self.assertFalse(valid_name("data.part"))
+        self.assertFalse(valid_name(""))
+
+    def test_incoming_file_resumes(self):
+        path = os.path.join(self.work_dir, "data.bin")
+        content = os.urandom(10000)
+        incoming = IncomingFile(path, len(content))
+        incoming.write(0, memoryview(content[:4000]))
+        incoming.close()
+
+        incoming = IncomingFile(path, len(content))
+        self.assertEqual(incoming.offset, 4000)
+        incoming.write(4000, memoryview(content[4000:]))
+        self.assertIsNone(incoming.finish(len(content), calculate_checksum(content)))
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), content)
+        self.assertFalse(os.path.exists(path + ".part"))
+
+    def test_incoming_file_rejects_gaps_and_bad_checksums(self):
+        incoming = IncomingFile(os.path.join(self.work_dir, "gap.bin"), 10)
+        incoming.write(5, memoryview(b"12345"))
+        self.assertIn("Expected chunk at offset 0", incoming.finish(10, "00000000"))
+
+        incoming = IncomingFile(os.path.join(self.work_dir, "bad.bin"), 5)
+        incoming.write(0, memoryview(b"12345"))
+        self.assertIn("Checksum mismatch", incoming.finish(5, "00000000"))
+        self.assertEqual(os.path.getsize(os.path.join(self.work_dir, "bad.bin.part")), 0)
+
+    def test_discard_removes_only_unused_partial_files(self):
+        path = os.path.join(self.work_dir, "refused.bin")
+        IncomingFile(path).discard()
+        self.assertFalse(os.path.exists(path + ".part"))
+
+        incoming = IncomingFile(path)
+        incoming.write(0, memoryview(b"12345"))
+        incoming.discard()
+        self.assertEqual(os.path.getsize(path + ".part"), 5)
+        IncomingFile(path).discard()
+        self.assertEqual(os.path.getsize(path + ".part"), 5)
+
+    def test_checksum_cache(self):
+        path = os.path.join(self.work_dir, "cached.bin")
+        with open(path, 'wb') as f:
+            f.write(b"first")
+        cache = ChecksumCache()
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.assertEqual(format_checksum(cache.get(path, f.fileno(), stat)), calculate_checksum(b"first"))
+            self.assertEqual(format_checksum(cache.get(path, f.fileno(), stat)), calculate_checksum(b"first"))
+        self.assertEqual(len(cache), 1)
+
+        with open(path, 'wb') as f:
+            f.write(b"second")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        with open(path, 'rb') as f:
+            self.assertEqual(format_checksum(cache.get(path, f.fileno(), os.fstat(f.fileno()))), calculate_checksum(b"second"))
+
+    def test_file_region_sends_the_file_it_opened(self):
+        path = os.path.join(self.work_dir, "replaced.bin")
+        content = os.urandom(100000)
+        with open(path, 'wb') as f:
+            f.write(content)
+        region = FileRegion(open(path, 'rb'), 3, 0, len(content), chunk_size=30000)
+        replacement = path + ".new"
+        with open(replacement, 'wb') as f:
+            f.write(b"short")
+        os.replace(replacement, path)
+
+        sender, receiver = socket.socketpair()
+        received = []
+        reader = threading.Thread(target=lambda: received.extend(iter(lambda: receiver.recv(65536), b"")))
+        reader.start()
+        try:
+            while region.send_next(sender):
+                pass
+        finally:
+            sender.close()
+            reader.join(timeout=5)
+            receiver.close()
+        self.assertTrue(region.file.closed)
+
+        frames = FrameDecoder(FRAMINGS["length"]).feed(b"".join(received))
+        self.assertEqual(b"".join(bytes(parse_chunk(frame)[2]) for frame in frames), content)
+
+class TestServerTransfer(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.server_dir = os.path.join(self.work_dir, "server")
+        self.server = TCPServer(host="127.0.0.1", port=8100, max_clients=10, transfer_dir=self.server_dir,
+                                transfer_chunk_size=256 * 1024, admin_password="admin123")
+        self.server_thread = threading.Thread(target=self.server.start)
+        self.server_thread.daemon = True
+        self.server_thread.start()
+        time.sleep(1)
+        self.content = os.urandom(3 * 1024 * 1024 + 123)
+        self.source = os.path.join(self.work_dir, "source.bin")
+        with open(self.source, 'wb') as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        self.server.stop()
+        time.sleep(0.5)
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def read(self, path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_upload_and_download(self):
+        client = TCPClient(host="127.0.0.1", port=8100, timeout=10)
+        try:
+            self.assertTrue(client.connect())
+            self.assertTrue(client.authenticate("admin", "admin123"))
+            self.assertTrue(client.upload_file(self.source, "upload.bin", chunk_size=256 * 1024))
+            self.assertEqual(self.read(os.path.join(self.server_dir, "upload.bin")), self.content)
+
+            target = os.path.join(self.work_dir, "download.bin")
+            self.assertTrue(client.download_file("upload.bin", target, timeout=10))
+            self.assertEqual(self.read(target), self.content)
+            stats = self.server.client_stats(next(iter(self.server.clients.values())))
+            self.assertGreaterEqual(stats["bytes_sent"], len(self.content))
+            self.assertLess(stats["bytes_sent"], 2 * len(self.content))
+            self.assertTrue(client.ping_server())
+            self.assertFalse(client.download_file("missing.bin", target, timeout=10))
+            self.assertFalse(os.path.exists(target + ".part"))
+        finally:
+            client.disconnect()
+
+    def test_resume_from_partial_files(self):
+        with open(os.path.join(self.server_dir, "resumed.bin.part"), 'wb') as f:
+            f.write(self.content[:1024 * 1024])
+        target = os.path.join(self.work_dir, "resumed.bin")
+        with open(target + ".part", 'wb') as f:
+            f.write(self.content[:2 * 1024 * 1024])
+
+        client = TCPClient(host="127.0.0.1", port=8100, timeout=10)
+        try:
+            self.assertTrue(client.connect())
+            self.assertTrue(client.authenticate("admin", "admin123"))
+            self.assertTrue(client.upload_file(self.source, "resumed.bin"))
+            self.assertTrue(client.download_file("resumed.bin", target, timeout=10))
+            self.assertEqual(self.read(target), self.content)
+
+            data = client.execute_command('metrics')
+            self.assertEqual(data["transfer_bytes_total"]["upload"], len(self.content) - 1024 * 1024)
+            self.assertEqual(data["transfer_bytes_total"]["download"], len(self.content) - 2 * 1024 * 1024)
+        finally:
+            client.disconnect()
+
+if __name__ == '__main__':
+    unittest.main()
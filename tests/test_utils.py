@@ -85,8 +85,10 @@ class TestUtils(unittest.TestCase):
         data = b"test data"
         checksum = calculate_checksum(data)
         
-        self.assertEqual(len(checksum), 32)
+        self.assertEqual(len(checksum), 8)
         self.assertIsInstance(checksum, str)
+        self.assertEqual(checksum, calculate_checksum(data))
+        self.assertNotEqual(checksum, calculate_checksum(b"test datb"))
         
     def test_is_valid_username(self):
         self.assertTrue(is_valid_username("testuser"))
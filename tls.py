@@ -0,0 +1,54 @@
+import functools
+import ssl
+import threading
+from typing import Any, Dict
+
+@functools.lru_cache(maxsize=None)
+def server_context(cert_file: str, key_file: str) -> ssl.SSLContext:
+    # Building a context parses the certificate chain, so it is done once and
+    # shared; sharing also keeps one session ticket key, which is what lets
+    # returning clients resume instead of running a full handshake.
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(certfile=cert_file, keyfile=key_file)
+    return context
+
+@functools.lru_cache(maxsize=None)
+def client_context(verify: bool = True) -> ssl.SSLContext:
+    context = ssl.create_default_context()
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+class HandshakeStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.handshakes = 0
+        self.resumed = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float, resumed: bool = False):
+        with self.lock:
+            self.handshakes += 1
+            if resumed:
+                self.resumed += 1
+            self.total_seconds += seconds
+            if seconds > self.max_seconds:
+                self.max_seconds = seconds
+
+    def record_failure(self):
+        with self.lock:
+            self.failed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            mean = self.total_seconds / self.handshakes if self.handshakes else 0.0
+            return {
+                "handshakes": self.handshakes,
+                "resumed": self.resumed,
+                "failed": self.failed,
+                "mean_ms": round(mean * 1000, 3),
+                "max_ms": round(self.max_seconds * 1000, 3)
+            }
@@ -0,0 +1,197 @@
+import os
+import socket
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, BinaryIO, Optional, Tuple
+from framing import LENGTH_PREFIX
+from utils import file_checksum, format_checksum, update_checksum
+
+# File data travels in length-prefixed frames whose payload starts with this
+# marker and a binary header instead of a codec payload: the transfer id the
+# requester chose, and the file offset of the chunk. The header is written
+# with send(); the data itself goes straight from the page cache with sendfile.
+CHUNK_MARKER = 0x03
+CHUNK_HEADER = struct.Struct("!BIQ")
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+PARTIAL_SUFFIX = ".part"
+MAX_NAME_LENGTH = 255
+
+class TransferError(Exception):
+    pass
+
+def is_chunk(frame: bytes) -> bool:
+    return bool(frame) and frame[0] == CHUNK_MARKER
+
+def chunk_header(transfer_id: int, offset: int, size: int) -> bytes:
+    return LENGTH_PREFIX.pack(CHUNK_HEADER.size + size) + CHUNK_HEADER.pack(CHUNK_MARKER, transfer_id, offset)
+
+def parse_chunk(frame: bytes) -> Tuple[int, int, memoryview]:
+    if len(frame) < CHUNK_HEADER.size:
+        raise TransferError("Truncated chunk header")
+    _, transfer_id, offset = CHUNK_HEADER.unpack_from(frame)
+    return transfer_id, offset, memoryview(frame)[CHUNK_HEADER.size:]
+
+def valid_name(name: Any) -> bool:
+    # Transfers are addressed by bare file names inside the transfer directory.
+    return (isinstance(name, str) and 0 < len(name) <= MAX_NAME_LENGTH and os.path.basename(name) == name
+            and not name.startswith('.') and not name.endswith(PARTIAL_SUFFIX))
+
+def send_chunk(sock: socket.socket, file, transfer_id: int, offset: int, size: int):
+    sock.sendall(chunk_header(transfer_id, offset, size))
+    # socket.sendfile uses os.sendfile where it can and falls back to plain
+    # sends for TLS sockets.
+    sent = sock.sendfile(file, offset, size)
+    if sent != size:
+        raise TransferError(f"File ended after {sent} of {size} bytes at offset {offset}")
+
+class FileRegion:
+    # Outbound queue entry standing for part of an open file. The writer
+    # thread sends it one chunk frame per turn and puts the rest back at the
+    # end of the queue, so other frames are not held up behind a large
+    # download. The region owns the descriptor the size and checksum were
+    # taken from, so a concurrent upload renaming a new file into place cannot
+    # change what is sent. The bytes stay on disk until then, so the region
+    # counts as nothing toward the queue's watermarks.
+    def __init__(self, file: BinaryIO, transfer_id: int, offset: int, size: int,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.file = file
+        self.transfer_id = transfer_id
+        self.offset = offset
+        self.size = size
+        self.chunk_size = chunk_size
+        self.position = offset
+
+    def __len__(self) -> int:
+        return 0
+
+    def send_next(self, sock: socket.socket) -> bool:
+        # Sends the next chunk and returns whether any are left; the file is
+        # closed after the last one or on failure.
+        try:
+            end = self.offset + self.size
+            if self.position < end:
+                size = min(self.chunk_size, end - self.position)
+                send_chunk(sock, self.file, self.transfer_id, self.position, size)
+                self.position += size
+        except BaseException:
+            self.close()
+            raise
+        if self.position < self.offset + self.size:
+            return True
+        self.close()
+        return False
+
+    def close(self):
+        self.file.close()
+
+class ChecksumCache:
+    # Download checksums keyed by (path, mtime, size), so serving the same
+    # file again, or resuming it, does not read the whole file back in. The
+    # least recently used entries are dropped first.
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.checksums: "OrderedDict[Tuple[str, int, int], int]" = OrderedDict()
+
+    def get(self, path: str, fd: int, stat: os.stat_result) -> int:
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            checksum = self.checksums.get(key)
+            if checksum is not None:
+                self.checksums.move_to_end(key)
+                return checksum
+        checksum = file_checksum(fd, stat.st_size)
+        with self.lock:
+            self.checksums[key] = checksum
+            while len(self.checksums) > self.max_size:
+                self.checksums.popitem(last=False)
+        return checksum
+
+    def __len__(self) -> int:
+        return len(self.checksums)
+
+class IncomingFile:
+    # Chunks are written to `<path>.part`, which is renamed into place once
+    # the size and checksum match. A partial file left by an interrupted
+    # transfer is kept and its length is the offset to resume from.
+    def __init__(self, path: str, size: Optional[int] = None):
+        self.path = path
+        self.partial_path = path + PARTIAL_SUFFIX
+        self.size = size
+        self.progress = threading.Condition()
+        try:
+            self.fd = os.open(self.partial_path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+            self.created = True
+        except FileExistsError:
+            self.fd = os.open(self.partial_path, os.O_RDWR)
+            self.created = False
+        self.offset = os.fstat(self.fd).st_size
+        if size is not None and self.offset > size:
+            os.ftruncate(self.fd, 0)
+            self.offset = 0
+        self.checksum = file_checksum(self.fd, self.offset)
+        self.error: Optional[str] = None
+
+    def write(self, offset: int, data: memoryview):
+        if self.error or self.fd is None:
+            return
+        if offset != self.offset:
+            self.fail(f"Expected chunk at offset {self.offset}, got {offset}")
+            return
+        if self.size is not None and offset + len(data) > self.size:
+            self.fail(f"Chunk at offset {offset} runs past the declared size of {self.size} bytes")
+            return
+        written = 0
+        while written < len(data):
+            written += os.pwrite(self.fd, data[written:], offset + written)
+        self.checksum = update_checksum(data, self.checksum)
+        with self.progress:
+            self.offset += len(data)
+            self.progress.notify_all()
+
+    def fail(self, error: str):
+        with self.progress:
+            if not self.error:
+                self.error = error
+            self.progress.notify_all()
+
+    def wait(self, size: int, timeout: Optional[float] = None) -> bool:
+        # For a receiver on another thread: blocks until `size` bytes are in,
+        # the transfer has failed or the timeout passes.
+        with self.progress:
+            return self.progress.wait_for(lambda: self.offset >= size or self.error is not None, timeout)
+
+    def finish(self, size: int, checksum: str) -> Optional[str]:
+        # Returns an error message, or None once the file is in place.
+        try:
+            if self.error:
+                return self.error
+            if self.offset != size:
+                return f"Received {self.offset} of {size} bytes"
+            if format_checksum(self.checksum) != checksum:
+                # The partial data is unusable, so the next attempt starts over.
+                os.ftruncate(self.fd, 0)
+                return f"Checksum mismatch: expected {checksum}, got {format_checksum(self.checksum)}"
+            os.fsync(self.fd)
+            os.replace(self.partial_path, self.path)
+            return None
+        finally:
+            self.close()
+
+    def discard(self):
+        # For a transfer that was refused or failed: a `.part` file this
+        # attempt created and never wrote to is removed again, while one with
+        # data in it is kept to resume from.
+        unused = self.created and self.offset == 0
+        self.close()
+        if unused:
+            try:
+                os.unlink(self.partial_path)
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
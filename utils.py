@@ -1,34 +1,66 @@
 import hashlib
+import hmac
+import os
 import secrets
 import time
 import json
+import zlib
 from typing import Dict, Any, Optional
 from datetime import datetime
+from codec import JSON_CODEC, CodecError
+
+PBKDF2_ITERATIONS = 600000
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
 
 def generate_token(length: int = 32) -> str:
     return secrets.token_hex(length)
 
+def hash_secret(password: str, salt: Optional[bytes] = None) -> str:
+    # The encoded hash carries its own parameters, so they can be raised later
+    # without invalidating stored users.
+    salt = salt or secrets.token_bytes(16)
+    if hasattr(hashlib, "scrypt"):
+        digest = hashlib.scrypt(password.encode('utf-8'), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=32)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${digest.hex()}"
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${salt.hex()}${digest.hex()}"
+
+def verify_secret(password: str, encoded: str) -> bool:
+    try:
+        scheme, *params = encoded.split('$')
+        if scheme == "scrypt":
+            n, r, p, salt, expected = params
+            n, r, p = int(n), int(r), int(p)
+            digest = hashlib.scrypt(password.encode('utf-8'), salt=bytes.fromhex(salt), n=n, r=r, p=p,
+                                    maxmem=256 * n * r * p, dklen=len(expected) // 2)
+        elif scheme == "pbkdf2_sha256":
+            iterations, salt, expected = params
+            digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), bytes.fromhex(salt), int(iterations))
+        else:
+            return False
+        return hmac.compare_digest(digest, bytes.fromhex(expected))
+    except (ValueError, TypeError, AttributeError):
+        return False
+
 def hash_password(password: str, salt: Optional[str] = None) -> tuple[str, str]:
     if salt is None:
         salt = secrets.token_hex(16)
-    
-    hash_obj = hashlib.sha256()
-    hash_obj.update((password + salt).encode('utf-8'))
-    hashed = hash_obj.hexdigest()
-    
-    return hashed, salt
+    return hash_secret(password, salt.encode('utf-8')), salt
 
 def verify_password(password: str, hashed: str, salt: str) -> bool:
-    computed_hash, _ = hash_password(password, salt)
-    return computed_hash == hashed
+    # The salt is also encoded in the hash itself.
+    return verify_secret(password, hashed)
 
 def format_timestamp(timestamp: float) -> str:
     return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
 
 def validate_json_message(message: str) -> Optional[Dict[str, Any]]:
     try:
-        return json.loads(message)
-    except json.JSONDecodeError:
+        return JSON_CODEC.decode(message)
+    except CodecError:
         return None
 
 def create_response(success: bool, message: str, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -70,8 +102,33 @@ def format_bytes(bytes_value: int) -> str:
         bytes_value /= 1024.0
     return f"{bytes_value:.1f} TB"
 
+def update_checksum(data: bytes, checksum: int = 0) -> int:
+    # CRC-32 is an integrity check, not a MAC: it catches corruption several
+    # times faster than MD5 and can be carried forward chunk by chunk.
+    return zlib.crc32(data, checksum)
+
+def format_checksum(checksum: int) -> str:
+    return f"{checksum:08x}"
+
 def calculate_checksum(data: bytes) -> str:
-    return hashlib.md5(data).hexdigest()
+    return format_checksum(update_checksum(data))
+
+def file_checksum(fd: int, length: Optional[int] = None, block_size: int = CHECKSUM_BLOCK_SIZE) -> int:
+    # Reads the first `length` bytes (the whole file by default) through one
+    # reused buffer, so files of any size are checked in constant memory.
+    if length is None:
+        length = os.fstat(fd).st_size
+    buffer = bytearray(block_size)
+    checksum = 0
+    position = 0
+    with memoryview(buffer) as view:
+        while position < length:
+            size = os.preadv(fd, [view[:min(block_size, length - position)]], position)
+            if not size:
+                break
+            checksum = zlib.crc32(view[:size], checksum)
+            position += size
+    return checksum
 
 def is_valid_username(username: str) -> bool:
     if not username or len(username) > 50:
@@ -80,19 +137,15 @@ def is_valid_username(username: str) -> bool:
     allowed_chars = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-')
     return all(c in allowed_chars for c in username)
 
-def rate_limit_check(client_id: str, rate_limits: Dict[str, list], max_requests: int = 10, window_seconds: int = 60) -> bool:
-    current_time = time.time()
-    
-    if client_id not in rate_limits:
-        rate_limits[client_id] = []
-    
-    requests = rate_limits[client_id]
-    
-    requests = [req_time for req_time in requests if current_time - req_time < window_seconds]
-    rate_limits[client_id] = requests
+def rate_limit_check(client_id: str, rate_limits: Dict[str, float], max_requests: int = 10, window_seconds: int = 60) -> bool:
+    # Token bucket kept as a single GCRA arrival time per client; see ratelimit.py
+    # for the limiter the server uses.
+    interval = window_seconds / max_requests
+    current_time = time.monotonic()
+    arrival = max(rate_limits.get(client_id, current_time), current_time)
     
-    if len(requests) >= max_requests:
+    if arrival + interval - current_time > window_seconds:
         return False
     
-    requests.append(current_time)
-    return True 
\ No newline at end of file
+    rate_limits[client_id] = arrival + interval
+    return True